@@ -36,6 +36,79 @@ class Settings(BaseSettings):
     # --- Directories ---
     DATA_MIDIA: str = "/data_midia"
 
+    # --- Video Engine ---
+    RENDER_BACKEND: str = "moviepy"  # "moviepy", "ffmpeg" (filter_complex) ou "segmented" (paralelo)
+    RENDER_SEGMENT_WORKERS: int = 0  # processos ffmpeg simultâneos no "segmented" (0 = nº de CPUs)
+    WATERMARK_THRESHOLD: float = 0.35  # fração de pixels claros na faixa inferior acima da qual a imagem é rejeitada
+    BLUR_BG_QUALITY: str = "fast"  # "fast" (blur em resolução reduzida) ou "full" (GaussianBlur em 1080x1920)
+    BLUR_BG_DOWNSCALE: int = 4  # fator de redução do fundo no modo "fast"
+    ASSET_DEADLINE_S: float = 45.0  # deadline global da aquisição de assets (downloads + buscas)
+    ASSET_MAX_CONCURRENCY: int = 8  # downloads/buscas simultâneos por job
+    ASSET_PER_HOST_LIMIT: int = 2  # conexões simultâneas por host
+    MEZZANINE_ENABLED: bool = True  # loops/B-roll pré-transcodificados em 1080x1920 e 1920x1080
+    MEZZANINE_GOP: int = 12  # GOP curto (frames) para subclips baratos
+    MEZZANINE_CRF: int = 18  # qualidade do transcode (libx264)
+    MEZZANINE_SCAN_S: float = 300  # intervalo da varredura incremental da biblioteca (app.worker)
+    MEDIA_LIBRARY_ENABLED: bool = True  # índice SQLite de música/B-roll/loops/fontes (sem listdir por job)
+    MEDIA_LIBRARY_REFRESH_S: float = 30  # intervalo mínimo entre checagens de mudança nos diretórios
+    AUDIO_MIX_ENABLED: bool = True  # estágio "mix": narração + trilha mixadas em NumPy antes do render
+    MIX_NARRATION_DB: float = -18  # nível alvo da narração (dBFS médio)
+    MIX_BED_DB: float = -20  # nível dos beds normalizados da media_library
+    MIX_MUSIC_DB: float = -30  # trilha nas pausas da narração
+    MIX_DUCK_DB: float = 8  # atenuação extra da trilha durante a fala (ducking)
+    PREVIEW_SCALE: float = 1 / 3  # preview (config.preview): 1080x1920 → 360x640
+    PREVIEW_FPS: int = 12  # frame rate do preview (sem crossfade/Ken Burns, libx264 ultrafast)
+    RENDER_CACHE_ENABLED: bool = True  # job com as mesmas entradas reaproveita o MP4 (hardlink) em vez de renderizar
+    RENDER_POOL_SIZE: int = 2  # processos do pool do POST /video/render (um render por vez cada)
+    RENDER_POOL_MAX_QUEUE: int = 4  # renders aguardando slot; acima disso a requisição é recusada
+    RENDER_POOL_QUEUE_TIMEOUT_S: float = 300  # espera máxima na fila antes de recusar
+    RENDER_POOL_TIMEOUT_S: float = 300  # render mais longo que isso: processo + ffmpeg mortos (SIGKILL)
+    RENDER_POOL_MAX_TASKS: int = 20  # renders por processo antes de reciclar (0 = nunca)
+    RENDER_BATCH_CONCURRENCY: int = 2  # variantes renderizadas em paralelo no POST /video/render/batch
+    RENDER_STATS_WINDOW: int = 200  # renders medidos por backend usados pelo estimador (render_plan)
+
+    # --- Cache de mídia (downloads endereçados por conteúdo) ---
+    MEDIA_CACHE_ENABLED: bool = True
+    MEDIA_CACHE_DIR: Optional[str] = None  # default: {DATA_MIDIA}/cache/media
+    MEDIA_CACHE_MAX_MB: int = 5120  # limite do cache em disco (evicção LRU)
+    MEDIA_CACHE_FRESH_S: float = 86400  # hit servido sem rede; depois revalida (ETag/Last-Modified)
+    DERIVED_CACHE_ENABLED: bool = True  # vereditos de watermark e frames BlurBG por hash de origem
+    DERIVED_CACHE_MAX_MB: int = 2048  # {DATA_MIDIA}/cache/derived (evicção LRU)
+
+    # --- Fila de render (python -m app.worker) ---
+    RENDER_WORKER_SLOTS: int = 1  # processos de render por worker (escale subindo mais workers/hosts)
+    QUEUE_LEASE_S: int = 120  # lease do job; sem heartbeat por esse tempo, outro worker assume
+    QUEUE_HEARTBEAT_S: int = 30  # intervalo de renovação do lease
+    QUEUE_MAX_ATTEMPTS: int = 3  # claims por job (retry_count) antes de marcar 'error'
+    QUEUE_POLL_S: float = 2.0  # espera entre consultas com a fila vazia
+    QUEUE_AGING: float = 0.5  # segundos de custo descontados por segundo na fila (SJF sem inanição)
+    QUEUE_DEFAULT_COST_S: float = 60.0  # custo de jobs sem predicted_s (enfileirados antes da previsão)
+    PREDICT_HISTORY: int = 500  # jobs processados do zero usados no ajuste do job_predict
+    PREDICT_MIN_SAMPLES: int = 20  # abaixo disso, pesos padrão
+    PREDICT_REFIT_S: float = 600  # intervalo entre reajustes do modelo
+    PIPELINE_RESUME: bool = True  # retentativas pulam estágios já concluídos (metadata["pipeline"])
+    PIPELINE_PARALLEL: bool = True  # estágios independentes em paralelo (TTS + assets, alinhamento logo após o TTS)
+
+    # --- Webhooks de status (outbox entregue pelo app.worker) ---
+    WEBHOOK_DISPATCH_ENABLED: bool = True
+    WEBHOOK_TIMEOUT_S: float = 10.0  # timeout de cada POST
+    WEBHOOK_MAX_ATTEMPTS: int = 8  # tentativas por evento antes de descartar
+    WEBHOOK_BACKOFF_BASE_S: float = 5.0  # 5s, 10s, 20s... (com jitter)
+    WEBHOOK_BACKOFF_MAX_S: float = 600.0  # teto do backoff
+    WEBHOOK_POLL_S: float = 1.0  # espera do dispatcher com o outbox vazio
+
+    # --- Transcrição (Whisper residente, um por host) ---
+    WHISPER_SERVER_ENABLED: bool = True
+    WHISPER_SOCKET: Optional[str] = None  # default: {tempdir}/whisper.sock (local do host, nunca no /data_midia)
+    WHISPER_MODEL_SIZE: str = "tiny"  # tiny, base, small, medium, large-v2
+    WHISPER_DEVICE: str = "cpu"
+    WHISPER_COMPUTE_TYPE: str = "int8"
+    WHISPER_BATCH_SIZE: int = 4  # trechos de um mesmo áudio por batch do BatchedInferencePipeline (<= 1 desliga)
+
+    # --- Legendas ---
+    SUBTITLE_FORCED_ALIGNMENT: bool = True  # alinha o roteiro conhecido ao áudio antes de cair no Whisper
+    SUBTITLE_RENDERER: str = "atlas"  # "atlas" (Pillow, in-process) ou "textclip" (ImageMagick)
+
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 settings = Settings()
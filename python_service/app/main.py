@@ -72,6 +72,34 @@ async def startup_event():
         asyncio.create_task(download_assets_background())
     except Exception as e:
         print(f"Erro ao iniciar download de assets: {e}")
+    try:
+        # Sobe/aquece o Whisper residente sem bloquear o startup
+        from app.services.transcription import transcription_client
+        import asyncio
+        asyncio.get_running_loop().run_in_executor(None, transcription_client.warmup)
+    except Exception as e:
+        print(f"Erro ao iniciar warmup do Whisper: {e}")
+    try:
+        # Índice da biblioteca de mídia (música/B-roll/loops/fontes) em background
+        from app.services.media_library import warmup as library_warmup
+        import asyncio
+        asyncio.get_running_loop().run_in_executor(None, library_warmup)
+    except Exception as e:
+        print(f"Erro ao indexar a biblioteca de mídia: {e}")
+    try:
+        # Processos do pool do POST /video/render (spawn fora do event loop)
+        from app.services.render_pool import get_render_pool
+        import asyncio
+        asyncio.get_running_loop().run_in_executor(None, get_render_pool().start)
+    except Exception as e:
+        print(f"Erro ao iniciar o pool de render: {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Mata os processos de render (e ffmpeg filhos) junto com a API
+    from app.services.render_pool import get_render_pool
+    get_render_pool().shutdown()
 
 # ---------------------------------------------------------------------------
 # Health Check — usado pelo Docker e pelo n8n para verificar se está vivo
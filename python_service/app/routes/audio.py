@@ -7,11 +7,11 @@ import asyncio
 from typing import Optional, List
 from fastapi import APIRouter
 from pydantic import BaseModel
-import edge_tts
 import httpx
 from pydub import AudioSegment
 from app.config import settings
 from app.utils.errors import ServicoExterno
+from app.services.audio import save_with_word_timings
 from io import BytesIO
 
 router = APIRouter(prefix="/audio", tags=["áudio"])
@@ -146,8 +146,8 @@ async def tts_edge(text: str, lang: str, voice: Optional[str] = None, style: str
         # Ajuste de rate para shorts
         rate = "+20%" if style == "shorts" else "+0%"
         
-        communicate = edge_tts.Communicate(text, voice, rate=rate)
-        await communicate.save(filepath)
+        # Grava também o sidecar .words.json (timings WordBoundary)
+        await save_with_word_timings({"text": text, "voice": voice, "rate": rate}, filepath)
         return filepath
     except Exception as e:
         print(f"[Audio] edge-tts Error: {e}")
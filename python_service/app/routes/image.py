@@ -13,6 +13,7 @@ from PIL import Image, ImageDraw, ImageFont
 from io import BytesIO
 from app.config import settings
 from app.utils.errors import ServicoExterno
+from app.services.media_cache import get_media_cache
 # Import Stability SDK se necessário, mas HTTP requests costumam ser mais leves.
 # Vamos usar requests simples para APIs REST para reduzir dependências pesadas runtime,
 # exceto se stability-sdk for estritamente necessário. O user pediu SDK.
@@ -63,8 +64,11 @@ class ImageResponse(BaseModel):
 # ---------------------------------------------------------------------------
 
 async def download_image(url: str) -> Optional[str]:
-    """Baixa imagem de URL e salva localmente."""
+    """Baixa imagem de URL e salva localmente (via cache de mídia compartilhado)."""
     try:
+        cache = get_media_cache()
+        if cache:
+            return await asyncio.to_thread(cache.fetch, url, OUTPUT_DIR, ext="jpg", prefix="stock", timeout=20.0)
         async with httpx.AsyncClient(timeout=20.0) as client:
             resp = await client.get(url)
             if resp.status_code == 200:
@@ -1,11 +1,12 @@
 # =============================================================================
 # app/routes/jobs.py — Gestão de Estado e Fila de Produção
 # =============================================================================
-from fastapi import APIRouter, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel, HttpUrl
-from typing import Optional, List, Union, Any
+from typing import Optional, List, Union, Any, Literal
 from app.utils.database import get_db_connection
-from app.services import video_engine
+from app.services.job_queue import STATUS_PREVIEW_READY, STATUS_QUEUED, queue_order
+from app.services import job_events, job_predict, pipeline
 from psycopg2.errors import UniqueViolation
 import uuid
 
@@ -16,10 +17,23 @@ class AssetsModel(BaseModel):
     all_videos: List[str] = []
     all_news: List[dict] = []
 
+class OutputRung(BaseModel):
+    height: int  # largura segue o aspecto (ex.: 720 → 1280x720 no 16:9)
+    kbps: Optional[int] = None  # bitrate alvo; None = perfil padrão do encoder
+
+class OutputTarget(BaseModel):
+    name: str  # sufixo dos arquivos: video_{id}_{name}_{altura}p.mp4 / _poster{k}.jpg
+    aspect: Literal["9:16", "16:9"] = "9:16"
+    ladder: List[OutputRung] = []  # vazio → uma saída em 1080x1920 / 1920x1080
+    posters: List[float] = []  # timestamps (s) dos poster frames (JPG)
+
 class ConfigModel(BaseModel):
     slide1: Optional[str] = "cutout"
     slide2: Optional[str] = "video_4s_zoom"
     slide3: Optional[str] = "static"
+    render_backend: Optional[str] = None  # "moviepy" | "ffmpeg" | "segmented" (default: settings.RENDER_BACKEND)
+    preview: Optional[bool] = False  # render reduzido para revisão; POST /jobs/{id}/promote gera o completo
+    outputs: Optional[List[OutputTarget]] = None  # saídas extras do mesmo render (ffmpeg split): 16:9, escada de bitrate, posters
 
 class JobCreate(BaseModel):
     title: str
@@ -33,6 +47,11 @@ class JobCreate(BaseModel):
     agregacao: Optional[str] = None
     pub_date: Optional[str] = None # ISO format str
     source_url: Optional[str] = None # Para idempotência (URL do RSS)
+    # Ordem da fila: SJF pelo tempo previsto, dividido pelo peso da prioridade (job_queue)
+    priority: Optional[Literal["urgent", "high", "normal", "medium", "low"]] = "normal"
+    # Webhook de status (substitui o polling de GET /jobs/{id})
+    callback_url: Optional[str] = None # ex.: $execution.resumeUrl do n8n
+    callback_events: Optional[List[Literal["processing", "preview_ready", "completed", "error"]]] = None # default: todos
 
 class JobUpdate(BaseModel):
     status: Optional[str] = None
@@ -53,8 +72,8 @@ class JobUpdate(BaseModel):
 # ---------------------------------------------------------------------------
 
 @router.post("/", status_code=201)
-async def create_job(job: JobCreate, background_tasks: BackgroundTasks):
-    """Cria um novo job de vídeo e inicia o processamento híbrido."""
+async def create_job(job: JobCreate):
+    """Cria um novo job de vídeo e o enfileira para os workers de render."""
     conn = get_db_connection()
     if not conn:
         raise HTTPException(status_code=500, detail="Erro de conexão com o banco.")
@@ -86,32 +105,37 @@ async def create_job(job: JobCreate, background_tasks: BackgroundTasks):
     except Exception as e:
         print(f"[Jobs] Erro ao checar existência: {e}")
 
+    # 3. Previsão do tempo de processamento (ordem SJF da fila)
+    prediction = job_predict.predict(dict(job.model_dump(), formato=job.formato or "shorts"))
+
     try:
         with conn.cursor() as cur:
             cur.execute("""
                 INSERT INTO video_jobs (
                     source_url, title, status, metadata, 
-                    formato, regiao, agregacao, pub_date
+                    formato, regiao, agregacao, pub_date,
+                    priority, predicted_s
                 )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 RETURNING id
             """, (
                 final_source_url, 
                 job.title, 
-                "processing", 
+                STATUS_QUEUED,
                 job.model_dump_json(),
                 job.formato or "shorts", # Default to shorts if None
                 job.regiao,
                 job.agregacao,
                 job.pub_date,
+                job.priority or "normal",
+                prediction["predicted_s"],
             ))
             new_id = cur.fetchone()['id']
             conn.commit()
-            
-            # Inicia o motor de vídeo em background (passa ID como string)
-            background_tasks.add_task(video_engine.generate_video, str(new_id), job.model_dump())
-            
-            return {"status": "created", "job_id": str(new_id)}
+
+            # O render roda nos workers (python -m app.worker), não no uvicorn
+            return {"status": "created", "job_id": str(new_id), "job_status": STATUS_QUEUED,
+                    "predicted_s": prediction["predicted_s"]}
     except UniqueViolation:
         # Race condition catch
         conn.rollback()
@@ -156,11 +180,87 @@ async def update_job(job_id: str, update: JobUpdate):
             values.append(job_id)
             
             cur.execute(query, tuple(values))
+            if update.status in job_events.EVENTS:
+                job_events.record_event(cur, job_id, update.status)
             conn.commit()
             return {"status": "updated"}
     finally:
         conn.close()
 
+@router.post("/{job_id}/retry")
+async def retry_job(job_id: str, from_stage: Optional[str] = None):
+    """
+    Reenfileira um job. Estágios já concluídos (metadata["pipeline"]) são
+    pulados pelo worker; `from_stage` (ex.: "render") força refazer a partir dele.
+    """
+    try:
+        invalidate = pipeline.stages_from(from_stage) if from_stage else []
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"{e}. Estágios: {', '.join(pipeline.STAGES)}")
+
+    conn = get_db_connection()
+    if not conn:
+        raise HTTPException(status_code=500, detail="Erro de conexão com o banco.")
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                UPDATE video_jobs
+                   SET status = %s,
+                       metadata = {pipeline.invalidate_sql(invalidate)},
+                       error_message = NULL,
+                       retry_count = 0,
+                       lease_owner = NULL,
+                       lease_expires_at = NULL,
+                       updated_at = CURRENT_TIMESTAMP
+                 WHERE id = %s AND status NOT IN ('queued', 'processing')
+                RETURNING id
+            """, (STATUS_QUEUED, job_id))
+            row = cur.fetchone()
+            conn.commit()
+        if not row:
+            raise HTTPException(status_code=409, detail="Job inexistente ou ainda na fila/em processamento.")
+        return {"status": "queued", "job_id": job_id, "invalidated": invalidate}
+    finally:
+        conn.close()
+
+@router.post("/{job_id}/promote")
+async def promote_job(job_id: str):
+    """
+    Promove um preview (status preview_ready) para o render completo.
+    Áudio, assets, alinhamento, timeline e mixagem gravados em
+    metadata["pipeline"] são reaproveitados — só render e finalize rodam.
+    """
+    conn = get_db_connection()
+    if not conn:
+        raise HTTPException(status_code=500, detail="Erro de conexão com o banco.")
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT metadata FROM video_jobs WHERE id = %s AND status = %s",
+                        (job_id, STATUS_PREVIEW_READY))
+            current = cur.fetchone()
+            # Só render + finalize rodam: previsão pela estimativa do render completo (estágio "plan")
+            predicted_s = job_predict.predict_promote(current["metadata"]) if current else None
+            cur.execute("""
+                UPDATE video_jobs
+                   SET status = %s,
+                       metadata = jsonb_set(COALESCE(metadata, '{}'::jsonb), '{config,preview}', 'false'::jsonb),
+                       predicted_s = COALESCE(%s, predicted_s),
+                       error_message = NULL,
+                       retry_count = 0,
+                       lease_owner = NULL,
+                       lease_expires_at = NULL,
+                       updated_at = CURRENT_TIMESTAMP
+                 WHERE id = %s AND status = %s
+                RETURNING id
+            """, (STATUS_QUEUED, predicted_s, job_id, STATUS_PREVIEW_READY))
+            row = cur.fetchone()
+            conn.commit()
+        if not row:
+            raise HTTPException(status_code=409, detail="Job inexistente ou sem preview pronto.")
+        return {"status": "queued", "job_id": job_id, "predicted_s": predicted_s}
+    finally:
+        conn.close()
+
 @router.get("/")
 async def list_jobs(status: Optional[str] = None, limit: int = 20):
     """Lista os jobs recentes."""
@@ -181,6 +281,11 @@ async def list_jobs(status: Optional[str] = None, limit: int = 20):
     finally:
         conn.close()
 
+@router.get("/queue")
+async def get_queue(limit: int = 50):
+    """Jobs na fila na ordem do claim (score = previsto / peso da prioridade - envelhecimento)."""
+    return queue_order(limit)
+
 @router.get("/check")
 async def check_url(url: str):
     """Verifica se uma URL já foi processada/está em processamento."""
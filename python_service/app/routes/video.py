@@ -2,16 +2,20 @@
 # app/routes/video.py — Motor de Renderização de Vídeo (Fase 5 - B-roll & SEO)
 # =============================================================================
 import os
+import time
 import uuid
+import zlib
+import dataclasses
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from typing import Optional, List
 from fastapi import APIRouter
 from pydantic import BaseModel
-from moviepy.editor import ImageClip, AudioFileClip, VideoFileClip, CompositeVideoClip, TextClip, concatenate_videoclips, ColorClip
+from moviepy.editor import ImageClip, VideoFileClip, CompositeVideoClip, TextClip, concatenate_videoclips, ColorClip
 import moviepy.video.fx.all as vfx
-import asyncio
-from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from moviepy.audio.AudioClip import AudioArrayClip
 from PIL import Image
 try:
     if not hasattr(Image, 'ANTIALIAS'):
@@ -19,7 +23,11 @@ try:
 except:
     pass # Pillow 10+ fixes
 from app.config import settings
-from app.utils.errors import ServicoExterno
+from app.utils.errors import DadosInvalidos, ServicoExterno
+from app.services.subtitle_renderer import SubtitleStyle, subtitle_image_clips
+from app.services import audio_mix, mezzanine, render_plan
+from app.services.media_library import get_media_library
+from app.services.render_pool import RenderQueueFull, RenderTimeout, RenderWorkerDied, get_render_pool
 
 router = APIRouter(prefix="/video", tags=["vídeo"])
 
@@ -49,12 +57,46 @@ class VideoRenderRequest(BaseModel):
     title: Optional[str] = "Video Gerado"
     format: str = "16:9" # "16:9" (Youtube) ou "9:16" (Shorts/TikTok)
     style: str = "news" # "news", "shorts_viral", "documentary"
+    preview: bool = False # Render reduzido (PREVIEW_SCALE/PREVIEW_FPS, sem Ken Burns/fade) para revisão
 
 class VideoResponse(BaseModel):
     status: str
     video_path: str
     duration_seconds: float
     file_size_mb: float
+    plan_hash: Optional[str] = None # plano do render (render_plan): planos iguais → mesmo hash
+    estimate: Optional[dict] = None # {"render_s", "peak_mb", "basis", ...} previsto antes do render
+    render_s: Optional[float] = None
+    peak_mb: Optional[float] = None
+
+class VideoVariant(BaseModel):
+    format: str = "16:9"
+    style: str = "news"
+    preview: bool = False
+
+class VideoBatchRequest(BaseModel):
+    audio_path: str
+    assets: List[Asset]
+    subtitles: Optional[List[Subtitle]] = None
+    title: Optional[str] = "Video Gerado"
+    variants: List[VideoVariant] # Ex.: 16:9 + 9:16 da mesma notícia
+
+class VariantResult(BaseModel):
+    format: str
+    style: str
+    preview: bool
+    status: str
+    video_path: Optional[str] = None
+    duration_seconds: Optional[float] = None
+    file_size_mb: Optional[float] = None
+    render_s: float
+    erro: Optional[str] = None
+
+class VideoBatchResponse(BaseModel):
+    status: str # "sucesso" ou "parcial" (alguma variante falhou)
+    prepare_s: float # decodificação/preparo das entradas compartilhadas
+    total_s: float
+    variants: List[VariantResult]
 
 # ---------------------------------------------------------------------------
 # Helpers de Composição
@@ -66,23 +108,35 @@ def apply_zoom_pan(clip, duration, zoom_ratio=0.15):
         return 1 + zoom_ratio * (t / duration)
     return clip.resize(zoom)
 
-def get_local_broll(category: str, duration: float, target_res: tuple) -> VideoFileClip:
-    """Busca um clipe de vídeo aleatório na pasta da categoria."""
-    # Busca recursiva ou direta
-    search_paths = [os.path.join(BROLL_DIR, category), BROLL_DIR]
-    files = []
-    
+def get_local_broll(category: str, duration: float, target_res: tuple,
+                    rng: Optional[random.Random] = None) -> VideoFileClip:
+    """
+    Busca um clipe de vídeo aleatório na pasta da categoria.
+    rng com semente: variantes de um batch sorteiam o mesmo clipe/trecho.
+    """
+    rng = rng or random
+    # Índice da biblioteca: sorteio direto, preferindo clipes que cobrem a duração
+    library = get_media_library()
+    asset = library.pick("broll", category, min_duration=duration, rng=rng) if library else None
+    files = [asset["path"]] if asset else []
+
+    # Sem índice: busca recursiva ou direta
+    search_paths = [os.path.join(BROLL_DIR, category), BROLL_DIR] if not library else []
     for p in search_paths:
         if os.path.exists(p):
-            files.extend([os.path.join(p, f) for f in os.listdir(p) if f.lower().endswith(('.mp4', '.mov', '.avi'))])
+            files.extend([os.path.join(p, f) for f in sorted(os.listdir(p)) if f.lower().endswith(('.mp4', '.mov', '.avi'))])
     
     if not files:
         # Fallback para cor sólida se não achar
         return ColorClip(size=target_res, color=(20, 20, 25), duration=duration)
     
-    chosen = random.choice(files)
+    chosen = rng.choice(files)
     try:
-        clip = VideoFileClip(chosen).without_audio()
+        # Mezzanine já no tamanho de saída: só decode (sem resize/crop por frame)
+        aspect = "9:16" if target_res[0] < target_res[1] else "16:9"
+        mezz = mezzanine.lookup(chosen, aspect)
+        prescaled = bool(mezz) and (mezz["width"], mezz["height"]) == tuple(target_res)
+        clip = VideoFileClip(mezz["path"] if prescaled else chosen).without_audio()
         
         # Lógica de loop ou corte
         if clip.duration < duration:
@@ -90,9 +144,12 @@ def get_local_broll(category: str, duration: float, target_res: tuple) -> VideoF
         else:
             # Pega trecho aleatório
             max_start = max(0, clip.duration - duration)
-            start_t = random.uniform(0, max_start)
+            start_t = rng.uniform(0, max_start)
             clip = clip.subclip(start_t, start_t + duration)
             
+        if prescaled:
+            return clip
+
         # Resize e Crop central (Fill)
         # Calcula ratio
         clip_ratio = clip.w / clip.h
@@ -120,6 +177,7 @@ def create_impact_text(text: str, duration: float, resolution: tuple) -> TextCli
         font = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
         
     fontsize = 90 if resolution[0] < resolution[1] else 110 # Maior em vertical
+    fontsize = int(fontsize * min(resolution) / 1080) # Proporcional no preview
     
     txt_clip = TextClip(
         text.upper(),
@@ -136,148 +194,272 @@ def create_impact_text(text: str, duration: float, resolution: tuple) -> TextCli
     return txt_clip
 
 # ---------------------------------------------------------------------------
-# Helper de Timeout
+# Entradas compartilhadas (render único e variantes do batch)
 # ---------------------------------------------------------------------------
 
-async def render_with_timeout(func, *args):
-    """Executa função bloqueante em thread separada com timeout."""
-    loop = asyncio.get_running_loop()
-    with ThreadPoolExecutor() as pool:
-        return await loop.run_in_executor(pool, func, *args)
+def _cover_frame(path: str, resolution: tuple) -> np.ndarray:
+    """Imagem decodificada e redimensionada/cortada (fill) para a resolução de saída."""
+    with Image.open(path) as img:
+        img = img.convert("RGB")
+        scale = max(resolution[0] / img.width, resolution[1] / img.height)
+        size = (max(resolution[0], round(img.width * scale)), max(resolution[1], round(img.height * scale)))
+        img = img.resize(size, Image.LANCZOS)
+        left, top = (size[0] - resolution[0]) // 2, (size[1] - resolution[1]) // 2
+        return np.asarray(img.crop((left, top, left + resolution[0], top + resolution[1])))
+
+
+class SharedInputs:
+    """
+    Entradas decodificadas uma vez e reaproveitadas por todas as variantes:
+    narração em PCM, imagens já no tamanho de cada resolução e textos de
+    impacto rasterizados (um `convert` por texto/resolução, não por variante).
+    Thread-safe: as variantes de um batch renderizam em paralelo.
+    """
+
+    def __init__(self, audio_path: str, seed: Optional[int] = None):
+        self.audio_path = audio_path
+        self.seed = random.randrange(1 << 30) if seed is None else seed
+        self._lock = threading.Lock()
+        self._pcm = None
+        self._frames = {}
+        self._texts = {}
+
+    def audio_clip(self) -> AudioArrayClip:
+        with self._lock:
+            if self._pcm is None:
+                self._pcm = audio_mix.decode_pcm(self.audio_path)
+        return AudioArrayClip(self._pcm, fps=audio_mix.SAMPLE_RATE)
+
+    def image_frame(self, path: str, resolution: tuple) -> np.ndarray:
+        key = (path, tuple(resolution))
+        with self._lock:
+            if key not in self._frames:
+                self._frames[key] = _cover_frame(path, resolution)
+            return self._frames[key]
+
+    def impact_text(self, text: str, duration: float, resolution: tuple):
+        key = (text, tuple(resolution))
+        with self._lock:
+            if key not in self._texts:
+                txt = create_impact_text(text, 1.0, resolution)
+                self._texts[key] = (txt.get_frame(0), txt.mask.get_frame(0))
+                txt.close()
+            rgb, alpha = self._texts[key]
+        mask = ImageClip(alpha, ismask=True).set_duration(duration)
+        return ImageClip(rgb).set_mask(mask).set_duration(duration).set_position(('center', 'center'))
+
+    def rng(self, index: int) -> random.Random:
+        """Sorteios do asset `index` (B-roll): iguais em todas as variantes."""
+        return random.Random(self.seed * 1000 + index)
+
+    def prepare(self, req: "VideoBatchRequest"):
+        """
+        Decodifica tudo que as variantes vão usar (antes do render paralelo).
+        Falha em um item só é registrada: a variante que o usar tenta de novo
+        e reporta o próprio erro.
+        """
+        self.audio_clip()
+        for res in {_resolution(v.format, v.preview) for v in req.variants}:
+            for asset in req.assets:
+                try:
+                    if asset.type == "image" and asset.path and os.path.exists(asset.path):
+                        self.image_frame(asset.path, res)
+                    if asset.text_overlay:
+                        self.impact_text(asset.text_overlay, 1.0, res)
+                except Exception as e:
+                    print(f"[Batch] Falha preparando {asset.path or asset.text_overlay} em {res}: {e}")
+
+
+def _resolution(fmt: str, preview: bool) -> tuple:
+    width, height = (1080, 1920) if fmt == "9:16" else (1920, 1080)
+    if preview:
+        # Preview: resolução reduzida (dimensões pares) — B-roll/imagens já entram no tamanho final
+        width = int(width * settings.PREVIEW_SCALE) // 2 * 2
+        height = int(height * settings.PREVIEW_SCALE) // 2 * 2
+    return width, height
 
 
 # ---------------------------------------------------------------------------
 # Endpoint Principal
 # ---------------------------------------------------------------------------
 
+def request_plan(req: VideoRenderRequest) -> dict:
+    """Plano declarativo (render_plan) do que _render_variant vai montar."""
+    width, height = _resolution(req.format, req.preview)
+    timeline = []
+    for asset in req.assets:
+        duration = asset.duration if asset.duration > 0 else 3.0
+        if req.style == "shorts_viral" and duration > 3.0 and asset.type == "broll":
+            duration = 2.0
+        kind = asset.type if asset.type in ("image", "video") and asset.path and os.path.exists(asset.path) else "broll"
+        timeline.append({
+            "type": kind, "path": asset.path if kind != "broll" else None, "duration": duration,
+            "ken_burns": 0.15 if kind == "image" and not req.preview else None,
+            "category": (asset.category or "futebol") if kind == "broll" else None,
+            "text": asset.text_overlay,
+        })
+    return render_plan.build_plan(
+        timeline, duration=sum(seg["duration"] for seg in timeline),
+        width=width, height=height, fps=settings.PREVIEW_FPS if req.preview else 30, crossfade=0.0,
+        backend="route", preview=req.preview,
+        narration={"src": render_plan.content_id(req.audio_path)},
+        subtitle_groups=[{"text": s.text, "start": s.start, "duration": s.end - s.start, "highlight": s.highlight}
+                         for s in req.subtitles or []],
+        subtitle_renderer="atlas",
+    )
+
+
 def _render_logic_internal(req: VideoRenderRequest):
     try:
         if not os.path.exists(req.audio_path):
             raise ServicoExterno(f"Áudio não encontrado: {req.audio_path}", url="/video/render")
-            raise ServicoExterno(f"Áudio não encontrado: {req.audio_path}", url="/video/render")
+        plan = request_plan(req)
+        estimate = render_plan.estimate(plan)
+        print(f"[Plan] {len(plan['tracks']['video'])} assets → estimativa {estimate['render_s']}s / "
+              f"{estimate['peak_mb']} MB ({estimate['basis']})")
+        t0 = time.perf_counter()
+        with render_plan.PeakMemory() as memory:
+            result = _render_variant(req, SharedInputs(req.audio_path))
+        render_s = round(time.perf_counter() - t0, 2)
+        render_plan.record(plan, "route", render_s, memory.peak_mb)
+        result.update(plan_hash=render_plan.plan_hash(plan), estimate=estimate,
+                      render_s=render_s, peak_mb=memory.peak_mb)
+        return result
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise ServicoExterno(f"Erro renderização: {str(e)}", url="/video/render")
 
-        filename = f"video_{req.style}_{uuid.uuid4().hex[:8]}.mp4"
-        filepath = os.path.join(OUTPUT_DIR, filename)
 
-        audio_clip = AudioFileClip(req.audio_path)
+def _render_variant(req: VideoRenderRequest, shared: SharedInputs) -> dict:
+    """Monta e exporta um vídeo a partir das entradas (compartilhadas) já decodificadas."""
+    filename = f"video_{req.style}_{uuid.uuid4().hex[:8]}{'_preview' if req.preview else ''}.mp4"
+    filepath = os.path.join(OUTPUT_DIR, filename)
+
+    audio_clip = shared.audio_clip()
+    
+    # Definição de Resolução
+    width, height = resolution = _resolution(req.format, req.preview)
+    
+    # SEO Shorts: Cortes mais rápidos? 
+    # A request já traz assets com durações. Se style="shorts_viral", poderiamos forçar max duration.
+    # Mas vamos respeitar o request do n8n/planner.
+
+    # 1. Processa a lista de Assets (Video Track)
+    clips = []
+    current_time = 0.0
+    
+    # Ordenação inteligente (Ensemble simples de Thumb/Intro)
+    # Se tiver style="shorts", garantir que o primeiro clip seja impactante (ex: imagem com texto ou broll forte)
+    # Por enquanto, confiamos na ordem da request.
+
+    for i, asset in enumerate(req.assets):
+        # Se duração não definida, calcula baseada no audio full / num assets (fallback)
+        duration = asset.duration if asset.duration > 0 else 3.0
         
-        # Definição de Resolução
-        width, height = (1080, 1920) if req.format == "9:16" else (1920, 1080)
-        resolution = (width, height)
+        # Limita duração apenas se for excessiva e o estilo for shorts
+        if req.style == "shorts_viral" and duration > 3.0 and asset.type == "broll":
+             duration = 2.0 # Cortes rápidos em B-roll
         
-        # SEO Shorts: Cortes mais rápidos? 
-        # A request já traz assets com durações. Se style="shorts_viral", poderiamos forçar max duration.
-        # Mas vamos respeitar o request do n8n/planner.
-
-        # 1. Processa a lista de Assets (Video Track)
-        clips = []
-        current_time = 0.0
+        clip = None
         
-        # Ordenação inteligente (Ensemble simples de Thumb/Intro)
-        # Se tiver style="shorts", garantir que o primeiro clip seja impactante (ex: imagem com texto ou broll forte)
-        # Por enquanto, confiamos na ordem da request.
-
-        for i, asset in enumerate(req.assets):
-            # Se duração não definida, calcula baseada no audio full / num assets (fallback)
-            duration = asset.duration if asset.duration > 0 else 3.0
-            
-            # Limita duração apenas se for excessiva e o estilo for shorts
-            if req.style == "shorts_viral" and duration > 3.0 and asset.type == "broll":
-                 duration = 2.0 # Cortes rápidos em B-roll
-            
-            clip = None
-            
-            # TIPO: VÍDEO PRÓPRIO
-            if asset.type == "video" and asset.path and os.path.exists(asset.path):
-                clip = VideoFileClip(asset.path).without_audio()
-                # Ajuste de tempo
-                if clip.duration < duration:
-                    clip = vfx.loop(clip, duration=duration)
-                else:
-                    clip = clip.subclip(0, duration)
-                
-                # Resize/Crop to fill
-                clip_ratio = clip.w / clip.h
-                target_ratio = width / height
-                if clip_ratio > target_ratio:
-                    clip = clip.resize(height=height).crop(x_center=clip.w/2, width=width)
-                else:
-                    clip = clip.resize(width=width).crop(y_center=clip.h/2, height=height)
-
-            # TIPO: IMAGEM
-            elif asset.type == "image" and asset.path and os.path.exists(asset.path):
-                clip = ImageClip(asset.path).set_duration(duration)
-                # Resize/Crop
-                clip_ratio = clip.w / clip.h
-                target_ratio = width / height
-                if clip_ratio > target_ratio:
-                    clip = clip.resize(height=height).crop(x_center=clip.w/2, width=width)
-                else:
-                    clip = clip.resize(width=width).crop(y_center=clip.h/2, height=height)
-                
-                # Ken Burns Effect (Zoom lento)
-                clip = apply_zoom_pan(clip, duration)
-            
-            # TIPO: BROLL / FALLBACK
+        # TIPO: VÍDEO PRÓPRIO
+        if asset.type == "video" and asset.path and os.path.exists(asset.path):
+            clip = VideoFileClip(asset.path).without_audio()
+            # Ajuste de tempo
+            if clip.duration < duration:
+                clip = vfx.loop(clip, duration=duration)
             else:
-                cat = asset.category or "futebol"
-                clip = get_local_broll(cat, duration, resolution)
+                clip = clip.subclip(0, duration)
             
-            # TEXT OVERLAY (Para cada clip individual - HOOK VISUAL)
-            if asset.text_overlay:
-                txt = create_impact_text(asset.text_overlay, duration, resolution)
-                clip = CompositeVideoClip([clip, txt]).set_duration(duration)
+            # Resize/Crop to fill
+            clip_ratio = clip.w / clip.h
+            target_ratio = width / height
+            if clip_ratio > target_ratio:
+                clip = clip.resize(height=height).crop(x_center=clip.w/2, width=width)
+            else:
+                clip = clip.resize(width=width).crop(y_center=clip.h/2, height=height)
 
-            clips.append(clip)
-            current_time += duration
+        # TIPO: IMAGEM
+        elif asset.type == "image" and asset.path and os.path.exists(asset.path):
+            # Decodificada e cortada (fill) uma vez por resolução
+            clip = ImageClip(shared.image_frame(asset.path, resolution)).set_duration(duration)
             
-            # Se já passamos do áudio, paramos (opcional, ou fazemos loop audio)
-            if current_time >= audio_clip.duration + 2: 
-                break 
-
-        # 2. Concatena base visual
-        if not clips:
-             raise ServicoExterno("Nenhum clip válido gerado.", url="/video/render")
-             
-        visual_track = concatenate_videoclips(clips, method="compose")
-        
-        # Ajusta duração exata ao áudio (Fade out no final se vídeo for maior)
-        if visual_track.duration > audio_clip.duration:
-            visual_track = visual_track.subclip(0, audio_clip.duration)
-            visual_track = visual_track.fadeout(0.5)
-        # Se vídeo for menor, loopa ou não (deixa tela preta? Melhor não. User garante assets suficientes)
+            # Ken Burns Effect (Zoom lento) — fora do preview
+            if not req.preview:
+                clip = apply_zoom_pan(clip, duration)
         
-        # 3. Legendas Globais (Sync com Áudio)
-        final_layers = [visual_track]
+        # TIPO: BROLL / FALLBACK
+        else:
+            cat = asset.category or "futebol"
+            clip = get_local_broll(cat, duration, resolution, rng=shared.rng(i))
         
-        if req.subtitles:
-            for sub in req.subtitles:
-                # Estilo de legenda SEO (Palavra por palavra seria ideal, mas frase é ok)
-                # Fundo semi-transparente para legibilidade
-                font_size = 60 if req.format == "9:16" else 50
-                
-                # Check for highlight
-                color = 'yellow' if sub.highlight else 'white'
-                
-                txt_c = TextClip(
-                    sub.text,
-                    fontsize=font_size,
-                    color=color,
-                    font='Arial-Bold', # Tenta usar fonte padrão do imagemagick
-                    stroke_color='black',
-                    stroke_width=2,
-                    size=(width*0.8, None),
-                    method='caption',
-                    align='center'
-                ).set_start(sub.start).set_end(sub.end).set_position(('center', height*0.75 if req.format == "9:16" else height*0.85))
-                
-                final_layers.append(txt_c)
-
-        final_comp = CompositeVideoClip(final_layers)
-
-        # 4. Exportação
-        final_video = final_comp.set_audio(audio_clip)
+        # TEXT OVERLAY (Para cada clip individual - HOOK VISUAL)
+        if asset.text_overlay:
+            txt = shared.impact_text(asset.text_overlay, duration, resolution)
+            clip = CompositeVideoClip([clip, txt]).set_duration(duration)
+
+        clips.append(clip)
+        current_time += duration
         
+        # Se já passamos do áudio, paramos (opcional, ou fazemos loop audio)
+        if current_time >= audio_clip.duration + 2: 
+            break 
+
+    # 2. Concatena base visual
+    if not clips:
+         raise ServicoExterno("Nenhum clip válido gerado.", url="/video/render")
+         
+    visual_track = concatenate_videoclips(clips, method="compose")
+    
+    # Ajusta duração exata ao áudio (Fade out no final se vídeo for maior)
+    if visual_track.duration > audio_clip.duration:
+        visual_track = visual_track.subclip(0, audio_clip.duration)
+        if not req.preview:
+            visual_track = visual_track.fadeout(0.5)
+    # Se vídeo for menor, loopa ou não (deixa tela preta? Melhor não. User garante assets suficientes)
+    
+    # 3. Legendas Globais (Sync com Áudio)
+    final_layers = [visual_track]
+    
+    if req.subtitles:
+        # Estilo de legenda SEO (Palavra por palavra seria ideal, mas frase é ok)
+        # Renderizadas pelo atlas de glifos (Pillow) — sem um `convert` por legenda
+        font_size = 60 if req.format == "9:16" else 50
+        base_style = SubtitleStyle(
+            font_path="/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+            font_size=max(12, int(font_size * min(resolution) / 1080)),
+            color="white",
+            stroke_width=1 if req.preview else 2,
+            max_width_ratio=0.8,
+            y_ratio=0.75 if req.format == "9:16" else 0.85,
+        )
+        # Check for highlight
+        highlight_style = dataclasses.replace(base_style, color="yellow")
+
+        for sub in req.subtitles:
+            style = highlight_style if sub.highlight else base_style
+            group = {"text": sub.text, "start": sub.start, "duration": sub.end - sub.start}
+            final_layers.extend(subtitle_image_clips([group], style, resolution))
+
+    final_comp = CompositeVideoClip(final_layers)
+
+    # 4. Exportação
+    final_video = final_comp.set_audio(audio_clip)
+    
+    if req.preview:
+        # Preview: encoder mais barato possível, direto na CPU
+        final_video.write_videofile(
+            filepath,
+            fps=settings.PREVIEW_FPS,
+            codec="libx264",
+            audio_codec="aac",
+            threads=4,
+            preset="ultrafast",
+            ffmpeg_params=["-crf", "32", "-pix_fmt", "yuv420p"],
+            logger=None
+        )
+    else:
         # Parametros otimizados com fallback automatico para CPU.
         try:
             final_video.write_videofile(
@@ -317,34 +499,112 @@ def _render_logic_internal(req: VideoRenderRequest):
                 logger='bar'
             )
 
-        # Cleanup
-        audio_clip.close()
-        for c in clips: 
-            try: c.close()
-            except: pass
+    # Cleanup
+    audio_clip.close()
+    for c in clips: 
+        try: c.close()
+        except: pass
+
+    file_size = os.path.getsize(filepath) / (1024 * 1024)
 
-        file_size = os.path.getsize(filepath) / (1024 * 1024)
+    return {
+        "status": "sucesso",
+        "video_path": filepath,
+        "duration_seconds": audio_clip.duration,
+        "file_size_mb": round(file_size, 2)
+    }
 
-        return {
-            "status": "sucesso",
-            "video_path": filepath,
-            "duration_seconds": audio_clip.duration,
-            "file_size_mb": round(file_size, 2)
-        }
 
+def _render_batch_internal(req: VideoBatchRequest) -> dict:
+    """
+    Prepara as entradas compartilhadas uma vez e renderiza as variantes em
+    paralelo (RENDER_BATCH_CONCURRENCY threads no processo do pool).
+    Falha de uma variante não derruba as outras.
+    """
+    t0 = time.perf_counter()
+    if not os.path.exists(req.audio_path):
+        raise ServicoExterno(f"Áudio não encontrado: {req.audio_path}", url="/video/render/batch")
+    # Semente do batch: B-roll sorteado igual em todas as variantes
+    shared = SharedInputs(req.audio_path, seed=zlib.crc32(f"{req.audio_path}|{req.title}".encode()))
+    try:
+        shared.prepare(req)
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        raise ServicoExterno(f"Erro renderização: {str(e)}", url="/video/render")
+        raise ServicoExterno(f"Erro preparando entradas: {e}", url="/video/render/batch")
+    prepare_s = time.perf_counter() - t0
+    print(f"[Batch] Entradas compartilhadas prontas em {prepare_s:.1f}s ({len(req.variants)} variantes)")
+
+    base = req.model_dump(exclude={"variants"})
+
+    def render_one(variant: VideoVariant) -> dict:
+        t = time.perf_counter()
+        result = variant.model_dump()
+        try:
+            out = _render_variant(VideoRenderRequest(**base, **variant.model_dump()), shared)
+            result.update(out)
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            result.update(status="erro", erro=str(e))
+        result["render_s"] = round(time.perf_counter() - t, 2)
+        print(f"[Batch] {variant.format}/{variant.style}: {result['status']} em {result['render_s']}s")
+        return result
+
+    workers = max(1, min(settings.RENDER_BATCH_CONCURRENCY, len(req.variants)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render-batch") as pool:
+        results = list(pool.map(render_one, req.variants))
+
+    if all(r["status"] == "erro" for r in results):
+        raise ServicoExterno(f"Erro renderização: {results[0]['erro']}", url="/video/render/batch")
+    return {
+        "status": "sucesso" if all(r["status"] == "sucesso" for r in results) else "parcial",
+        "prepare_s": round(prepare_s, 2),
+        "total_s": round(time.perf_counter() - t0, 2),
+        "variants": results,
+    }
 
 @router.post("/render", response_model=VideoResponse)
 async def renderizar_video(req: VideoRenderRequest):
-    """Endpoint Wrapper com Timeout."""
+    """
+    Render em um processo do pool compartilhado (app/services/render_pool.py).
+    No timeout o processo e o ffmpeg filho são mortos de verdade.
+    """
+    timeout = settings.RENDER_POOL_TIMEOUT_S
     try:
-        return await asyncio.wait_for(
-            render_with_timeout(_render_logic_internal, req), 
-            timeout=300.0
-        )
-    except asyncio.TimeoutError:
-        print(f"[Timeout] Renderização abortada após 300s: {req.title}")
-        raise ServicoExterno("Render timeout após 300s (limite de segurança)", timeout=True)
+        return await get_render_pool().submit(_render_logic_internal, req, timeout=timeout, label=req.title)
+    except RenderTimeout:
+        print(f"[Timeout] Renderização abortada após {timeout:.0f}s: {req.title}")
+        raise ServicoExterno(f"Render timeout após {timeout:.0f}s (limite de segurança)", url="/video/render")
+    except RenderQueueFull as e:
+        raise ServicoExterno(f"Render recusado: {e}", url="/video/render")
+    except RenderWorkerDied as e:
+        raise ServicoExterno(f"Erro renderização: {e}", url="/video/render")
+
+
+@router.post("/render/batch", response_model=VideoBatchResponse)
+async def renderizar_batch(req: VideoBatchRequest):
+    """
+    Várias variantes (formato/estilo/preview) do mesmo conjunto de assets:
+    áudio, imagens e textos decodificados uma vez, variantes em paralelo,
+    tudo em um slot do pool de render.
+    """
+    if not req.variants:
+        raise DadosInvalidos("Informe ao menos uma variante.", campo="variants")
+    # Timeout cresce com as "rodadas" de variantes em paralelo
+    rounds = -(-len(req.variants) // max(1, settings.RENDER_BATCH_CONCURRENCY))
+    timeout = settings.RENDER_POOL_TIMEOUT_S * rounds
+    try:
+        return await get_render_pool().submit(_render_batch_internal, req, timeout=timeout,
+                                              label=f"batch x{len(req.variants)}: {req.title}")
+    except RenderTimeout:
+        print(f"[Timeout] Batch abortado após {timeout:.0f}s: {req.title}")
+        raise ServicoExterno(f"Render timeout após {timeout:.0f}s (limite de segurança)", url="/video/render/batch")
+    except RenderQueueFull as e:
+        raise ServicoExterno(f"Render recusado: {e}", url="/video/render/batch")
+    except RenderWorkerDied as e:
+        raise ServicoExterno(f"Erro renderização: {e}", url="/video/render/batch")
+
+
+@router.get("/render/status")
+async def status_render():
+    """Slots do pool de render: ativos (com tempo decorrido), fila e contadores."""
+    return get_render_pool().status()
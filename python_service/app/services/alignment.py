@@ -0,0 +1,244 @@
+# =============================================================================
+# app/services/alignment.py — Alinhamento forçado do roteiro com a narração
+# =============================================================================
+# Quando o texto falado já é conhecido (script_text do job) não precisamos
+# de ASR: basta descobrir ONDE cada palavra cai no áudio. Este módulo faz um
+# alinhamento por energia sobre o PCM decodificado:
+#
+#   1. ffmpeg decodifica o áudio para PCM mono 16 kHz
+#   2. RMS por frame (25 ms / hop 10 ms) → regiões de fala e pausas
+#   3. Quebras de frase do roteiro (pontuação) são casadas com as pausas do
+#      áudio por programação dinâmica (monotônica, permite pular dos dois
+#      lados: vírgula sem pausa, respiração sem pontuação)
+#   4. Entre âncoras, as palavras são distribuídas pelo tempo de FALA
+#      proporcionalmente ao nº estimado de sílabas
+#
+# Resultado: mesma lista {"word", "start", "end"} do Whisper/edge-tts, com a
+# grafia exata do roteiro (nomes de jogadores corretos) e custo de CPU de
+# milissegundos. Se o áudio não parecer a leitura do roteiro, retorna None
+# e o chamador cai para o Whisper.
+# =============================================================================
+import re
+import bisect
+import logging
+import subprocess
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.services.audio import AudioService
+from app.services.ffmpeg_render import FFMPEG_BIN
+
+logger = logging.getLogger("alignment")
+
+SAMPLE_RATE = 16000
+FRAME_S = 0.025
+HOP_S = 0.010
+
+# Pausa mínima para separar regiões de fala / fala mínima para contar
+MIN_PAUSE_S = 0.12
+MIN_SPEECH_S = 0.06
+
+# Faixa plausível de sílabas por segundo de fala (pt-BR lido por TTS)
+MIN_SYLLABLE_RATE = 2.0
+MAX_SYLLABLE_RATE = 12.0
+
+# Custos da programação dinâmica (posições normalizadas 0..1)
+MATCH_TOLERANCE = 0.12
+SKIP_BREAK_COST = 0.04
+SKIP_PAUSE_COST = 0.02
+
+_VOWEL_GROUPS = re.compile(r"[aeiouyáéíóúâêôãõàü]+", re.IGNORECASE)
+_BREAK_PUNCT = re.compile(r"[.,;:!?…)\]\"”]$")
+
+
+# ---------------------------------------------------------------------------
+# ÁUDIO → REGIÕES DE FALA
+# ---------------------------------------------------------------------------
+
+def decode_pcm(audio_path: str) -> np.ndarray:
+    """Decodifica qualquer formato para PCM float32 mono 16 kHz via ffmpeg."""
+    result = subprocess.run(
+        [FFMPEG_BIN, "-hide_banner", "-loglevel", "error", "-i", audio_path,
+         "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "-"],
+        capture_output=True, timeout=120,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode(errors="ignore").strip()[-300:])
+    return np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def speech_regions(samples: np.ndarray) -> List[Tuple[float, float]]:
+    """
+    Detecta regiões de fala por energia. O limiar é adaptativo: entre o
+    piso de ruído (percentil 10) e o nível típico de fala (percentil 90),
+    em dB, para funcionar com narração com ou sem trilha por baixo.
+    """
+    frame = int(FRAME_S * SAMPLE_RATE)
+    hop = int(HOP_S * SAMPLE_RATE)
+    if len(samples) < frame:
+        return []
+
+    n_frames = 1 + (len(samples) - frame) // hop
+    idx = np.arange(frame)[None, :] + hop * np.arange(n_frames)[:, None]
+    rms = np.sqrt(np.mean(samples[idx] ** 2, axis=1) + 1e-10)
+    db = 20 * np.log10(rms)
+
+    floor, loud = np.percentile(db, 10), np.percentile(db, 90)
+    if loud - floor < 6:
+        return []  # sem contraste (silêncio ou ruído constante)
+    voiced = db > floor + 0.35 * (loud - floor)
+
+    # Bordas das regiões: transições do vetor booleano
+    padded = np.concatenate(([False], voiced, [False]))
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    raw = [(s * HOP_S, e * HOP_S + FRAME_S) for s, e in zip(edges[::2], edges[1::2])]
+
+    # Une regiões separadas por pausas curtas; descarta cliques
+    regions: List[List[float]] = []
+    for start, end in raw:
+        if regions and start - regions[-1][1] < MIN_PAUSE_S:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+    return [(float(s), float(e)) for s, e in regions if e - s >= MIN_SPEECH_S]
+
+
+# ---------------------------------------------------------------------------
+# ROTEIRO → PALAVRAS PONDERADAS
+# ---------------------------------------------------------------------------
+
+def _syllables(word: str) -> float:
+    """Estimativa grosseira de duração falada (grupos vocálicos / dígitos)."""
+    digits = sum(ch.isdigit() for ch in word)
+    return max(1, len(_VOWEL_GROUPS.findall(word))) + 1.5 * digits
+
+
+def script_words(script_text: str) -> List[str]:
+    """Palavras do roteiro como o TTS leu (mesma limpeza do AudioService)."""
+    return AudioService.clean_text(script_text).split()
+
+
+# ---------------------------------------------------------------------------
+# ALINHAMENTO
+# ---------------------------------------------------------------------------
+
+def _match_breaks_to_pauses(breaks: List[float], pauses: List[float]) -> List[Tuple[int, int]]:
+    """
+    DP monotônica casando quebras do roteiro (posição esperada 0..1) com
+    pausas do áudio (posição observada 0..1). Retorna pares (i_break, i_pause).
+    """
+    nb, np_ = len(breaks), len(pauses)
+    inf = float("inf")
+    cost = np.full((nb + 1, np_ + 1), inf)
+    move = np.zeros((nb + 1, np_ + 1), dtype=np.int8)  # 1=match 2=skip break 3=skip pause
+    cost[0, 0] = 0.0
+    for i in range(nb + 1):
+        for j in range(np_ + 1):
+            if i == 0 and j == 0:
+                continue
+            best, how = inf, 0
+            if i and j:
+                diff = abs(breaks[i - 1] - pauses[j - 1])
+                if diff <= MATCH_TOLERANCE and cost[i - 1, j - 1] + diff < best:
+                    best, how = cost[i - 1, j - 1] + diff, 1
+            if i and cost[i - 1, j] + SKIP_BREAK_COST < best:
+                best, how = cost[i - 1, j] + SKIP_BREAK_COST, 2
+            if j and cost[i, j - 1] + SKIP_PAUSE_COST < best:
+                best, how = cost[i, j - 1] + SKIP_PAUSE_COST, 3
+            cost[i, j], move[i, j] = best, how
+
+    pairs = []
+    i, j = nb, np_
+    while i or j:
+        how = move[i, j]
+        if how == 1:
+            pairs.append((i - 1, j - 1))
+            i, j = i - 1, j - 1
+        elif how == 2:
+            i -= 1
+        else:
+            j -= 1
+    return pairs[::-1]
+
+
+class _SpeechClock:
+    """Converte tempo de fala acumulado ↔ tempo real, pulando as pausas."""
+
+    def __init__(self, regions: List[Tuple[float, float]]):
+        self.regions = regions
+        self.cum = [0.0]
+        for start, end in regions:
+            self.cum.append(self.cum[-1] + (end - start))
+
+    @property
+    def total(self) -> float:
+        return self.cum[-1]
+
+    def to_real(self, t: float, side: str = "start") -> float:
+        # "start" num limite cai no início da próxima região; "end" no fim da anterior
+        if side == "start":
+            k = min(bisect.bisect_right(self.cum, t) - 1, len(self.regions) - 1)
+        else:
+            k = max(bisect.bisect_left(self.cum, t) - 1, 0)
+        start, end = self.regions[k]
+        return min(end, max(start, start + t - self.cum[k]))
+
+
+def align_script(audio_path: str, script_text: str) -> Optional[List[dict]]:
+    """
+    Alinha o roteiro conhecido com a narração.
+
+    Returns:
+        Lista de {"word", "start", "end"} (segundos) ou None se o áudio
+        não puder ser alinhado com confiança (o chamador usa o Whisper).
+    """
+    words = script_words(script_text or "")
+    if not words:
+        return None
+
+    try:
+        regions = speech_regions(decode_pcm(audio_path))
+    except Exception as e:
+        logger.warning("[Align] Falha ao decodificar '%s': %s", audio_path, e)
+        return None
+    if not regions:
+        logger.warning("[Align] Nenhuma região de fala detectada.")
+        return None
+
+    clock = _SpeechClock(regions)
+    weights = [_syllables(w) + 0.3 for w in words]  # +0.3: transição entre palavras
+    rate = sum(_syllables(w) for w in words) / clock.total
+    if not MIN_SYLLABLE_RATE <= rate <= MAX_SYLLABLE_RATE:
+        logger.warning("[Align] Roteiro não bate com o áudio (%.1f sílabas/s) — usando Whisper.", rate)
+        return None
+
+    cum_w = np.cumsum([0.0] + weights).tolist()
+    total_w = cum_w[-1]
+
+    # Quebras do roteiro (após palavra com pontuação) e pausas do áudio,
+    # ambas em posição normalizada de fala
+    break_words = [i for i, w in enumerate(words[:-1]) if _BREAK_PUNCT.search(w)]
+    breaks = [cum_w[i + 1] / total_w for i in break_words]
+    pauses = [clock.cum[k] / clock.total for k in range(1, len(regions))]
+    pairs = _match_breaks_to_pauses(breaks, pauses)
+
+    # Âncoras: (índice da 1ª palavra do trecho, tempo de fala onde começa)
+    anchors = [(0, 0.0)] + [(break_words[b] + 1, clock.cum[p + 1]) for b, p in pairs]
+    anchors.append((len(words), clock.total))
+
+    aligned = []
+    for (w0, t0), (w1, t1) in zip(anchors, anchors[1:]):
+        span_w = cum_w[w1] - cum_w[w0]
+        for i in range(w0, w1):
+            a = t0 + (t1 - t0) * (cum_w[i] - cum_w[w0]) / span_w
+            b = t0 + (t1 - t0) * (cum_w[i + 1] - cum_w[w0]) / span_w
+            aligned.append({
+                "word": words[i],
+                "start": round(clock.to_real(a, "start"), 3),
+                "end": round(clock.to_real(b, "end"), 3),
+            })
+
+    logger.info("[Align] %d palavras alinhadas (%d regiões de fala, %d/%d quebras ancoradas).",
+                len(aligned), len(regions), len(pairs), len(breaks))
+    return aligned
@@ -0,0 +1,115 @@
+# =============================================================================
+# app/services/asset_acquisition.py — Aquisição concorrente de assets
+# =============================================================================
+# Executor das etapas de rede do generate_video (downloads de imagens,
+# highlights via yt-dlp e buscas do Panic Search) com:
+#
+#   - concorrência limitada (ASSET_MAX_CONCURRENCY threads)
+#   - limite de conexões simultâneas por host (ASSET_PER_HOST_LIMIT)
+#   - deadline global (ASSET_DEADLINE_S): o que não chegou a tempo é
+#     descartado; tarefas que ainda não começaram são canceladas
+#
+# Cada tarefa tem uma chave; collect() devolve {chave: resultado} só das
+# que terminaram com sucesso — o chamador remonta a ordem de prioridade.
+# =============================================================================
+import time
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Hashable, Optional
+from urllib.parse import urlparse
+
+from app.config import settings
+
+logger = logging.getLogger("asset_acquisition")
+
+
+def host_of(url: str) -> str:
+    return (urlparse(url).hostname or "").lower()
+
+
+class AcquisitionRun:
+    """Um lote de tarefas de rede com deadline global e limite por host."""
+
+    def __init__(self, deadline_s: Optional[float] = None, max_workers: Optional[int] = None,
+                 per_host: Optional[int] = None):
+        self.deadline = time.monotonic() + (deadline_s or settings.ASSET_DEADLINE_S)
+        self.per_host = per_host or settings.ASSET_PER_HOST_LIMIT
+        self.pool = ThreadPoolExecutor(max_workers=max_workers or settings.ASSET_MAX_CONCURRENCY,
+                                       thread_name_prefix="asset")
+        self.futures: Dict[Hashable, Future] = {}
+        self._hosts: Dict[str, threading.BoundedSemaphore] = {}
+        self._hosts_lock = threading.Lock()
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+    def _host_slot(self, host: str) -> threading.BoundedSemaphore:
+        with self._hosts_lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+            return self._hosts[host]
+
+    def _run(self, key, host: Optional[str], fn: Callable, args: tuple):
+        slot = self._host_slot(host) if host else None
+        if slot is not None and not slot.acquire(timeout=self.remaining()):
+            raise TimeoutError(f"deadline esgotado aguardando conexão com {host}")
+        try:
+            if self.remaining() <= 0:
+                raise TimeoutError("deadline esgotado antes de iniciar")
+            return fn(*args)
+        finally:
+            if slot is not None:
+                slot.release()
+
+    def submit(self, key: Hashable, fn: Callable, *args, url: Optional[str] = None) -> Future:
+        """Agenda fn(*args). Com `url`, respeita o limite de conexões do host."""
+        future = self.pool.submit(self._run, key, host_of(url) if url else None, fn, args)
+        self.futures[key] = future
+        return future
+
+    def wait_for(self, keys) -> None:
+        """Bloqueia até as chaves terminarem ou o deadline estourar."""
+        pending = {self.futures[k] for k in keys if k in self.futures}
+        while pending and self.remaining() > 0:
+            _, pending = wait(pending, timeout=self.remaining(), return_when=FIRST_COMPLETED)
+
+    def wait_first(self, keys) -> Optional[Hashable]:
+        """
+        Chave de maior prioridade (ordem de `keys`) que terminou com
+        resultado (não-None). Espera cada chave na ordem e só passa para a
+        seguinte se ela falhar; com o deadline estourado, fica a primeira
+        que já tiver chegado. Achada a vencedora, as de menor prioridade que
+        ainda não começaram são canceladas (as em voo terminam em
+        background e são ignoradas). Retorna a chave (ou None).
+        """
+        keys = [k for k in keys if k in self.futures]
+        for i, key in enumerate(keys):
+            future = self.futures[key]
+            wait([future], timeout=self.remaining())
+            if future.done() and not future.cancelled() and future.exception() is None and future.result():
+                for later in keys[i + 1:]:
+                    self.futures[later].cancel()
+                return key
+        return None
+
+    def results(self, keys=None) -> Dict[Hashable, object]:
+        """{chave: resultado} das tarefas concluídas com sucesso (não-None)."""
+        out = {}
+        for key, future in self.futures.items():
+            if keys is not None and key not in keys:
+                continue
+            if future.done() and not future.cancelled() and future.exception() is None:
+                result = future.result()
+                if result:
+                    out[key] = result
+            elif future.done() and not future.cancelled():
+                logger.warning("[Assets] Tarefa %s falhou: %s", key, future.exception())
+        return out
+
+    def close(self) -> None:
+        """Cancela o que não começou; downloads em voo terminam em background."""
+        late = [k for k, f in self.futures.items() if not f.done()]
+        if late:
+            logger.warning("[Assets] Deadline: %d tarefas descartadas (%s...)", len(late), late[:3])
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -1,9 +1,75 @@
 
 import os
 import re
+import json
 import edge_tts
+from typing import List, Optional
 from app.config import settings
 
+# edge-tts reporta offset/duração em unidades de 100ns
+_TICKS_PER_SECOND = 10_000_000
+
+
+def word_timings_path(audio_path: str) -> str:
+    """Sidecar de timings por palavra: /data_midia/audios/{job_id}.words.json"""
+    return os.path.splitext(audio_path)[0] + ".words.json"
+
+
+def load_word_timings(audio_path: str) -> Optional[List[dict]]:
+    """
+    Lê o sidecar gerado junto com o áudio. Retorna None se não existir,
+    estiver corrompido ou for mais antigo que o áudio (áudio regenerado
+    por outro provider, ex. Kokoro/Unreal, que não fornece timings).
+    """
+    path = word_timings_path(audio_path)
+    try:
+        if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(audio_path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            words = json.load(f).get("words", [])
+        return words or None
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+async def save_with_word_timings(communicate_kwargs: dict, output_path: str) -> List[dict]:
+    """
+    Sintetiza com edge-tts gravando o MP3 e coletando os eventos
+    WordBoundary no mesmo stream; grava o sidecar .words.json ao lado.
+
+    Returns:
+        Lista de {"word", "start", "end"} em segundos ([] se o serviço não
+        mandou boundaries).
+    """
+    try:
+        communicate = edge_tts.Communicate(boundary="WordBoundary", **communicate_kwargs)
+    except TypeError:
+        # edge-tts < 7: WordBoundary já é o padrão e não existe o parâmetro
+        communicate = edge_tts.Communicate(**communicate_kwargs)
+
+    words = []
+    with open(output_path, "wb") as audio_file:
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                audio_file.write(chunk["data"])
+            elif chunk["type"] == "WordBoundary":
+                start = chunk["offset"] / _TICKS_PER_SECOND
+                words.append({
+                    "word": chunk["text"],
+                    "start": round(start, 3),
+                    "end": round(start + chunk["duration"] / _TICKS_PER_SECOND, 3),
+                })
+
+    # Sidecar escrito DEPOIS do MP3 → mtime >= áudio (ver load_word_timings)
+    sidecar = word_timings_path(output_path)
+    if words:
+        with open(sidecar, "w", encoding="utf-8") as f:
+            json.dump({"source": "edge-tts", "words": words}, f, ensure_ascii=False)
+    elif os.path.exists(sidecar):
+        os.remove(sidecar)
+    return words
+
+
 class AudioService:
     def __init__(self):
         # Voz masculina brasileira, boa para notícias
@@ -11,7 +77,8 @@ class AudioService:
         self.output_dir = os.path.join(settings.DATA_MIDIA, "audios")
         os.makedirs(self.output_dir, exist_ok=True)
 
-    def clean_text(self, text: str) -> str:
+    @staticmethod
+    def clean_text(text: str) -> str:
         """Remove markdown, URLs e caracteres especiais que atrapalham o TTS."""
         if not text: return ""
         # Remove URLs
@@ -25,7 +92,13 @@ class AudioService:
         return text
 
     async def generate(self, text: str, job_id: str) -> str:
-        """Gera áudio MP3 a partir do texto usando Edge TTS."""
+        """
+        Gera áudio MP3 a partir do texto usando Edge TTS.
+
+        Os timings por palavra (WordBoundary) vão para
+        {job_id}.words.json — a etapa de legendas usa esse arquivo e não
+        precisa rodar o Whisper sobre a narração.
+        """
         clean_text = self.clean_text(text)
         if not clean_text:
             print(f"[AudioService] Texto vazio para job {job_id}")
@@ -34,11 +107,10 @@ class AudioService:
         output_path = os.path.join(self.output_dir, f"{job_id}.mp3")
         
         try:
-            communicate = edge_tts.Communicate(clean_text, self.voice)
-            await communicate.save(output_path)
+            words = await save_with_word_timings({"text": clean_text, "voice": self.voice}, output_path)
             
             if os.path.exists(output_path):
-                 print(f"[AudioService] Áudio gerado com sucesso: {output_path}")
+                 print(f"[AudioService] Áudio gerado com sucesso: {output_path} ({len(words)} word timings)")
                  return output_path
             else:
                  raise RuntimeError("Arquivo de áudio não encontrado após geração.")
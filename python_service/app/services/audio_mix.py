@@ -0,0 +1,160 @@
+# =============================================================================
+# app/services/audio_mix.py — Mixagem narração + trilha em NumPy
+# =============================================================================
+# A mixagem era feita dentro do render do MoviePy: a trilha era repetida com
+# concatenate_audioclips, e volumex(0.10)/audio_fadeout(2.0) eram avaliados
+# de forma preguiçosa, bloco a bloco, durante a escrita do vídeo.
+#
+# Agora o estágio "mix" do pipeline faz tudo uma vez, sobre arrays PCM:
+#
+#   1. Narração decodificada (44.1 kHz estéreo) e normalizada para
+#      MIX_NARRATION_DB (ganho limitado a ±12 dB)
+#   2. Trilha: "bed" já normalizado para MIX_BED_DB e guardado pela
+#      media_library (.npy int16, lido por mmap). Se for mais curta que o
+#      vídeo, é repetida por índice modular
+#   3. Ducking tipo sidechain: envelope RMS da narração (10 ms) → máscara
+#      de fala com hold → ganho da trilha em MIX_MUSIC_DB nas pausas e
+#      MIX_DUCK_DB abaixo disso durante a fala, suavizado por média móvel
+#   4. Fade out da trilha e proteção de pico (escala global, sem clipping)
+#   5. Um WAV único que os dois backends de render usam como trilha pronta
+#
+# Níveis em dBFS de potência média dos blocos não silenciosos (level_db) —
+# mesma medida do loudness_db do índice da biblioteca.
+# =============================================================================
+import os
+import wave
+import logging
+import subprocess
+from typing import Optional
+
+import numpy as np
+
+from app.config import settings
+from app.services.ffmpeg_render import FFMPEG_BIN
+
+logger = logging.getLogger("audio_mix")
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+FADE_OUT_S = 2.0      # igual ao audio_fadeout(2.0) anterior
+ENVELOPE_HOP_S = 0.01
+DUCK_HOLD_S = 0.25    # mantém a trilha abaixada entre palavras próximas
+DUCK_SMOOTH_S = 0.3   # janela da média móvel do ganho (ataque/release)
+MAX_GAIN_DB = 12.0
+PEAK_LIMIT = 0.98
+
+
+def decode_pcm(path: str, rate: int = SAMPLE_RATE, channels: int = CHANNELS,
+               duration: Optional[float] = None) -> np.ndarray:
+    """Decodifica via ffmpeg para float32 (amostras, canais) em [-1, 1]."""
+    args = [FFMPEG_BIN, "-hide_banner", "-loglevel", "error", "-i", path]
+    if duration:
+        args += ["-t", f"{duration:.3f}"]
+    args += ["-ac", str(channels), "-ar", str(rate), "-f", "s16le", "-"]
+    result = subprocess.run(args, capture_output=True, timeout=300)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode(errors="ignore").strip()[-300:])
+    pcm = np.frombuffer(result.stdout, dtype=np.int16)
+    return (pcm[: len(pcm) // channels * channels].reshape(-1, channels).astype(np.float32) / 32768.0)
+
+
+def level_db(samples: np.ndarray, rate: int = SAMPLE_RATE) -> Optional[float]:
+    """Potência média (dBFS) dos blocos de 400 ms acima de -70 dBFS."""
+    mono = samples.mean(axis=1) if samples.ndim == 2 else samples
+    block = int(0.4 * rate)
+    if len(mono) < block:
+        return None
+    power = np.mean(np.square(mono[: len(mono) // block * block].reshape(-1, block), dtype=np.float32), axis=1)
+    power = power[power > 1e-7]
+    if not len(power):
+        return None
+    return round(float(10 * np.log10(np.mean(power))), 2)
+
+
+def gain_to(level: Optional[float], target_db: float) -> float:
+    """Ganho linear que leva `level` a `target_db` (limitado a ±MAX_GAIN_DB)."""
+    if level is None:
+        return 1.0
+    return float(10 ** (np.clip(target_db - level, -MAX_GAIN_DB, MAX_GAIN_DB) / 20))
+
+
+def fit_length(samples: np.ndarray, n: int) -> np.ndarray:
+    """Corta ou repete (índice modular) até n amostras."""
+    if len(samples) >= n:
+        return np.asarray(samples[:n], dtype=np.float32)
+    return np.take(np.asarray(samples, dtype=np.float32), np.arange(n) % len(samples), axis=0)
+
+
+def _moving_average(x: np.ndarray, width: int) -> np.ndarray:
+    if width <= 1:
+        return x
+    padded = np.pad(x, (width // 2, width - 1 - width // 2), mode="edge")
+    return np.convolve(padded, np.ones(width, dtype=np.float32) / width, mode="valid")
+
+
+def duck_envelope(narration: np.ndarray, n: int, rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Ganho (linear, por amostra) da trilha: MIX_MUSIC_DB nas pausas e
+    MIX_DUCK_DB a menos enquanto há fala na narração.
+    """
+    hop = int(ENVELOPE_HOP_S * rate)
+    mono = narration.mean(axis=1) if narration.ndim == 2 else narration
+    frames = max(1, len(mono) // hop)
+    rms_db = 10 * np.log10(np.mean(np.square(mono[: frames * hop].reshape(frames, hop)), axis=1) + 1e-10)
+
+    voice_level = level_db(narration, rate)
+    threshold = max(-50.0, (voice_level if voice_level is not None else -20.0) - 20.0)
+    speech = rms_db > threshold
+    hold = int(DUCK_HOLD_S / ENVELOPE_HOP_S)
+    speech = np.convolve(speech.astype(np.float32), np.ones(2 * hold + 1), mode="same") > 0
+
+    pause_gain = 10 ** ((settings.MIX_MUSIC_DB - settings.MIX_BED_DB) / 20)
+    gain = np.where(speech, pause_gain * 10 ** (-settings.MIX_DUCK_DB / 20), pause_gain).astype(np.float32)
+    gain = _moving_average(gain, int(DUCK_SMOOTH_S / ENVELOPE_HOP_S))
+
+    # Depois do fim da narração a trilha fica no nível de pausa
+    t_frames = (np.arange(frames) + 0.5) * hop
+    return np.interp(np.arange(n), t_frames, gain, right=pause_gain).astype(np.float32)
+
+
+def write_wav(path: str, samples: np.ndarray, rate: int = SAMPLE_RATE) -> str:
+    """WAV PCM 16 bits (escrita atômica)."""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    tmp = f"{path}.{os.getpid()}.part"
+    with wave.open(tmp, "wb") as wav:
+        wav.setnchannels(pcm.shape[1] if pcm.ndim == 2 else 1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.tobytes())
+    os.replace(tmp, path)
+    return path
+
+
+def mix_tracks(narration_path: str, music_bed: Optional[np.ndarray], total_duration: float,
+               output_path: str, rate: int = SAMPLE_RATE) -> str:
+    """
+    Narração normalizada + trilha (bed já normalizado — float32 ou int16 —
+    ou None) com ducking e fade out → WAV de `total_duration` s em output_path.
+    """
+    n = int(round(total_duration * rate))
+    narration = decode_pcm(narration_path, rate)
+    narration *= gain_to(level_db(narration, rate), settings.MIX_NARRATION_DB)
+
+    mixed = np.zeros((n, CHANNELS), dtype=np.float32)
+    m = min(n, len(narration))
+    mixed[:m] = narration[:m]
+
+    if music_bed is not None and len(music_bed):
+        bed = fit_length(music_bed, n)
+        if music_bed.dtype == np.int16:
+            bed /= 32768.0
+        gain = duck_envelope(narration, n, rate)
+        fade = min(n, int(FADE_OUT_S * rate))
+        if fade:
+            gain[-fade:] *= np.linspace(1.0, 0.0, fade, dtype=np.float32)
+        mixed += bed * gain[:, None]
+
+    peak = float(np.abs(mixed).max()) if n else 0.0
+    if peak > PEAK_LIMIT:
+        mixed *= PEAK_LIMIT / peak
+    return write_wav(output_path, mixed, rate)
@@ -0,0 +1,147 @@
+# =============================================================================
+# app/services/derived_cache.py — Cache persistente de artefatos derivados
+# =============================================================================
+# As mesmas imagens de origem voltam em várias matérias sobre o mesmo clube;
+# o trabalho do Pillow sobre elas (veredito de watermark, frame 9:16 com
+# BlurBG) é determinístico. Este cache guarda o resultado por:
+#
+#   chave = sha256(hash do conteúdo de origem | transformação | parâmetros | resolução)
+#
+#   - Valores pequenos (ex.: veredito de watermark) ficam no próprio índice
+#     SQLite como JSON
+#   - Arquivos (ex.: blur_bg 1080x1920) ficam em blobs/ e são entregues ao
+#     job por hardlink (mesma estratégia do media_cache)
+#   - Evicção LRU por tamanho total (DERIVED_CACHE_MAX_MB), com o índice
+#     e a evicção do media_cache (LruIndex)
+#
+# Mudou o algoritmo? Mude os parâmetros (ou um campo "v") passados pelo
+# chamador — a chave muda e as entradas antigas saem por LRU.
+# =============================================================================
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from typing import Any, Optional, Tuple
+
+from app.config import settings
+from app.services.media_cache import LruIndex, MediaCache, sha256_file
+
+logger = logging.getLogger("derived_cache")
+
+
+def derived_key(source_sha: str, transform: str, params: dict,
+                resolution: Optional[Tuple[int, int]] = None) -> str:
+    """Chave estável da derivação (params serializados com chaves ordenadas)."""
+    res = f"{resolution[0]}x{resolution[1]}" if resolution else "-"
+    raw = f"{source_sha}|{transform}|{json.dumps(params, sort_keys=True)}|{res}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class DerivedCache(LruIndex):
+    """Vereditos e arquivos derivados de um conteúdo de origem."""
+
+    _table = "derived"
+    _key_column = "key"
+    _log_tag = "[DerivedCache]"
+
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.root = root or os.path.join(settings.DATA_MIDIA, "cache", "derived")
+        self.blob_dir = os.path.join(self.root, "blobs")
+        self.max_bytes = max_bytes if max_bytes is not None else settings.DERIVED_CACHE_MAX_MB * 1024 * 1024
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._open_index(self.root, """
+            CREATE TABLE IF NOT EXISTS derived (
+                key TEXT PRIMARY KEY,
+                transform TEXT NOT NULL,
+                value TEXT,
+                path TEXT,
+                size INTEGER NOT NULL DEFAULT 0,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_derived_access ON derived(last_access);
+        """)
+
+    def _touch(self, key: str):
+        self._execute("UPDATE derived SET last_access = ? WHERE key = ?", (time.time(), key))
+
+    # ------------------------------------------------------------------
+    # VALORES (JSON)
+    # ------------------------------------------------------------------
+
+    def get_value(self, key: str, default: Any = None) -> Any:
+        rows = self._execute("SELECT value FROM derived WHERE key = ? AND path IS NULL", (key,))
+        if not rows:
+            return default
+        self._touch(key)
+        return json.loads(rows[0][0])
+
+    def put_value(self, key: str, transform: str, value: Any):
+        payload = json.dumps(value)
+        self._execute(
+            "INSERT OR REPLACE INTO derived (key, transform, value, path, size, last_access) "
+            "VALUES (?, ?, ?, NULL, ?, ?)", (key, transform, payload, len(payload), time.time()))
+
+    # ------------------------------------------------------------------
+    # ARQUIVOS
+    # ------------------------------------------------------------------
+
+    def get_file(self, key: str, dest_dir: str, prefix: str = "derived") -> Optional[str]:
+        """Hardlink do artefato em dest_dir, ou None no miss (inclusive blob evictado no meio)."""
+        rows = self._execute("SELECT path FROM derived WHERE key = ? AND path IS NOT NULL", (key,))
+        if not rows:
+            return None
+        self._touch(key)
+        try:
+            return MediaCache.link_into(rows[0][0], dest_dir, prefix)
+        except OSError as e:
+            logger.info("[DerivedCache] Artefato %s sumiu do cache (%s); refazendo.", key[:12], e)
+            self._forget(key)
+            return None
+
+    def put_file(self, key: str, transform: str, src_path: str):
+        """Guarda uma cópia (hardlink) do artefato recém-gerado pelo job."""
+        if not self._fits(os.path.getsize(src_path)):
+            return
+        ext = os.path.splitext(src_path)[1]
+        blob_path = os.path.join(self.blob_dir, key[:2], f"{key}{ext}")
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        tmp_path = f"{blob_path}.{os.getpid()}.{threading.get_ident()}.part"
+        try:
+            os.link(src_path, tmp_path)
+        except OSError:
+            shutil.copy2(src_path, tmp_path)
+        os.replace(tmp_path, blob_path)
+        self._execute(
+            "INSERT OR REPLACE INTO derived (key, transform, value, path, size, last_access) "
+            "VALUES (?, ?, NULL, ?, ?, ?)", (key, transform, blob_path, os.path.getsize(blob_path), time.time()))
+        self._evict(keep=key)
+
+
+_cache: Optional[DerivedCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_derived_cache() -> Optional[DerivedCache]:
+    """Instância do processo (lazy). None se desabilitado ou indisponível."""
+    global _cache
+    if not settings.DERIVED_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = DerivedCache()
+            except Exception as e:
+                logger.warning("[DerivedCache] Cache indisponível, processando direto: %s", e)
+                return None
+        return _cache
+
+
+def source_hash(path: str) -> Optional[str]:
+    """Hash do conteúdo de origem (None se ilegível)."""
+    try:
+        return sha256_file(path)
+    except OSError:
+        return None
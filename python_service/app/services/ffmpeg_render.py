@@ -0,0 +1,724 @@
+# =============================================================================
+# app/services/ffmpeg_render.py — Backend de render nativo (ffmpeg filter_complex)
+# =============================================================================
+# Compila o timeline do video_engine (segmentos de imagem, highlights, loop
+# de fallback, crossfades, legendas, logo, trilha e narração) em UMA única
+# invocação do ffmpeg. Decodificação, scale, zoompan, xfade e overlay rodam
+# nativamente no ffmpeg — nada de frames passando pelo Python/MoviePy.
+#
+# Formato dos segmentos (dicts gerados por video_engine.generate_video):
+#   {"type": "image", "path": ..., "duration": 4.0, "ken_burns": 0.06}
+#   {"type": "video", "path": ..., "start": 12.0, "duration": 5.0, "mirror": True}
+#   {"type": "loop",  "path": ..., "duration": 7.3, "prescaled": True}
+#   {"type": "color", "color": [10, 10, 10], "duration": 7.3}
+#
+# Saídas extras (render_timeline(outputs=...)): o mesmo grafo decodificado
+# uma vez é dividido (split/asplit) em outros formatos, degraus de bitrate
+# e poster frames (JPG), todos escritos pela mesma invocação do ffmpeg.
+# =============================================================================
+import os
+import json
+import shutil
+import logging
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+logger = logging.getLogger("ffmpeg_render")
+
+# ffmpeg do sistema (o docker-compose exporta IMAGEIO_FFMPEG_EXE=/usr/bin/ffmpeg)
+FFMPEG_BIN = os.environ.get("IMAGEIO_FFMPEG_EXE") or shutil.which("ffmpeg") or "ffmpeg"
+FFPROBE_BIN = (
+    shutil.which("ffprobe")
+    or os.path.join(os.path.dirname(FFMPEG_BIN), "ffprobe")
+)
+
+# Parâmetros de encoder idênticos aos de video_engine._write_videofile_with_fallback.
+# A ordem define a cascata: NVENC (GPU) primeiro, libx264 (CPU) como fallback.
+ENCODER_PROFILES = [
+    ("h264_nvenc", [
+        "-c:v", "h264_nvenc", "-preset", "p5", "-threads", "4",
+        "-gpu", "0", "-rc:v", "vbr", "-cq", "23",
+        "-b:v", "6M", "-maxrate", "10M", "-bufsize", "12M",
+        "-pix_fmt", "yuv420p", "-profile:v", "high",
+    ]),
+    ("libx264", [
+        "-c:v", "libx264", "-preset", "ultrafast", "-threads", "4",
+        "-pix_fmt", "yuv420p",
+    ]),
+]
+AUDIO_ARGS = ["-c:a", "aac", "-ar", "44100"]
+
+# Preview (revisão editorial): só CPU, o mais barato possível — NVENC em
+# resolução baixa não compensa a subida do contexto da GPU
+PREVIEW_ENCODER_PROFILES = [
+    ("libx264", [
+        "-c:v", "libx264", "-preset", "ultrafast", "-tune", "fastdecode", "-threads", "4",
+        "-crf", "32", "-pix_fmt", "yuv420p",
+    ]),
+]
+PREVIEW_AUDIO_ARGS = ["-c:a", "aac", "-ar", "44100", "-b:a", "96k"]
+
+
+class FFmpegRenderError(RuntimeError):
+    """Falha ao compilar/executar o grafo do ffmpeg (o caller faz fallback)."""
+
+
+# ---------------------------------------------------------------------------
+# HELPERS
+# ---------------------------------------------------------------------------
+
+def probe_duration(path: str) -> Optional[float]:
+    """Duração (s) de um arquivo de mídia via ffprobe; None se falhar."""
+    try:
+        out = subprocess.run(
+            [FFPROBE_BIN, "-v", "error", "-show_entries", "format=duration",
+             "-of", "json", path],
+            capture_output=True, text=True, timeout=30
+        )
+        duration = float(json.loads(out.stdout)["format"]["duration"])
+        return duration if duration > 0 else None
+    except Exception as e:
+        logger.warning("[FFprobe] Não foi possível ler duração de '%s': %s", path, e)
+        return None
+
+
+def _fmt(value: float) -> str:
+    """Formata segundos para expressões do ffmpeg (sem notação científica)."""
+    return f"{value:.3f}"
+
+
+def _run_ffmpeg(args: List[str], timeout: Optional[float] = None):
+    """Executa o ffmpeg e converte falhas em FFmpegRenderError com o stderr."""
+    cmd = [FFMPEG_BIN, "-hide_banner", "-loglevel", "error", "-y"] + args
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired as e:
+        raise FFmpegRenderError(f"ffmpeg excedeu {timeout}s") from e
+    except OSError as e:
+        raise FFmpegRenderError(f"ffmpeg indisponível: {e}") from e
+    if proc.returncode != 0:
+        raise FFmpegRenderError(proc.stderr.strip()[-800:] or f"código {proc.returncode}")
+
+
+# ---------------------------------------------------------------------------
+# COMPILAÇÃO DO GRAFO
+# ---------------------------------------------------------------------------
+
+def _segment_input(seg: dict, width: int, height: int, fps: int,
+                   offset: float = 0.0, duration: Optional[float] = None) -> List[str]:
+    """
+    Argumentos de entrada (-i) de um segmento do timeline.
+
+    offset/duration permitem abrir só um trecho do segmento (render por
+    pedaços): offset é relativo ao início do segmento.
+    """
+    dur = _fmt(seg["duration"] if duration is None else duration)
+    kind = seg["type"]
+    if kind == "image":
+        return ["-loop", "1", "-framerate", str(fps), "-t", dur, "-i", seg["path"]]
+    if kind == "video":
+        return ["-ss", _fmt(seg.get("start", 0.0) + offset), "-t", dur, "-i", seg["path"]]
+    if kind == "loop":
+        # Seek em entrada com -stream_loop não atravessa voltas → o trecho
+        # [0, offset) é descartado no filtro (_segment_filter)
+        return ["-stream_loop", "-1", "-t", _fmt(offset + float(dur)), "-i", seg["path"]]
+    r, g, b = seg.get("color", [10, 10, 10])
+    return ["-f", "lavfi", "-t", dur,
+            "-i", f"color=c=0x{r:02x}{g:02x}{b:02x}:s={width}x{height}:r={fps}"]
+
+
+def _segment_filter(idx: int, seg: dict, width: int, height: int, fps: int,
+                    offset: float = 0.0, duration: Optional[float] = None,
+                    label: Optional[str] = None) -> str:
+    """
+    Cadeia de filtros que normaliza um segmento para WxH @ fps, yuv420p.
+
+    - image: já vem 1080x1920 do BlurBG → zoompan centralizado (Ken Burns).
+      O zoom é calculado no tempo do segmento inteiro, então um trecho que
+      começa em `offset` continua exatamente de onde o anterior parou.
+    - video/loop: scale "cover" + crop central (equivale a resize+crop do MoviePy);
+      segmentos "prescaled" (mezzanine) já vêm no tamanho final.
+    - color: já nasce no tamanho certo.
+    """
+    dur = seg["duration"] if duration is None else duration
+    frames = max(1, int(round(seg["duration"] * fps)))
+    offset_frames = int(round(offset * fps))
+    kind = seg["type"]
+    chain = []
+
+    if kind == "image":
+        chain.append(f"scale={width}:{height},setsar=1")
+        zoom = seg.get("ken_burns") or 0.0
+        if zoom:
+            chain.append(
+                f"zoompan=z='1+{zoom}*(on+{offset_frames})/{frames}'"
+                f":x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)'"
+                f":d=1:s={width}x{height}:fps={fps}"
+            )
+    elif kind in ("video", "loop"):
+        if kind == "loop" and offset > 0:
+            chain.append(f"trim=start={_fmt(offset)},setpts=PTS-STARTPTS")
+        if seg.get("mirror"):
+            chain.append("hflip")
+        if seg.get("prescaled"):
+            # Mezzanine: já está em WxH @ fps — só decode
+            chain.append("setsar=1")
+        else:
+            chain.append(f"scale={width}:{height}:force_original_aspect_ratio=increase")
+            chain.append(f"crop={width}:{height},setsar=1")
+
+    # Garante duração exata (segmentos curtos repetem o último frame) e
+    # frame rate/timebase constantes — pré-requisito do xfade
+    chain.append(f"tpad=stop_mode=clone:stop_duration={_fmt(dur)}")
+    chain.append(f"trim=duration={_fmt(dur)},setpts=PTS-STARTPTS,fps={fps},format=yuv420p")
+    return f"[{idx}:v]" + ",".join(chain) + (label or f"[s{idx}]")
+
+
+def _overlay_filters(
+    last: str,
+    next_input: int,
+    subtitle_overlays: Optional[List[dict]],
+    logo_path: Optional[str],
+    logo_width: int,
+    logo_opacity: float,
+    logo_margin_top: int,
+    window_start: float = 0.0,
+    window_end: Optional[float] = None,
+    scale: float = 1.0,
+):
+    """
+    Legendas (PNG RGBA com janela de exibição) + logo sobre `last`.
+
+    window_start/window_end recortam as legendas para um trecho do timeline
+    (render por pedaços): os tempos do enable ficam relativos ao trecho.
+    scale redimensiona PNGs e posições (legendas exportadas em 1080x1920
+    sobre um render de preview).
+
+    Returns:
+        (inputs, filters, last_label)
+    """
+    inputs: List[str] = []
+    filters: List[str] = []
+
+    for k, sub in enumerate(subtitle_overlays or []):
+        if window_end is not None and (sub["end"] <= window_start or sub["start"] >= window_end):
+            continue
+        inputs += ["-i", sub["path"]]
+        label = f"[sub{k}]"
+        src = f"[{next_input}:v]"
+        if scale != 1.0:
+            filters.append(f"{src}scale=iw*{scale:.4f}:-1[subimg{k}]")
+            src = f"[subimg{k}]"
+        filters.append(
+            f"{last}{src}overlay=x={int(sub['x'] * scale)}:y={int(sub['y'] * scale)}"
+            f":enable='between(t,{_fmt(sub['start'] - window_start)},"
+            f"{_fmt(sub['end'] - window_start)})'{label}"
+        )
+        last = label
+        next_input += 1
+
+    # ── Branding (logo no canto superior direito) ──────────────────────────
+    if logo_path:
+        inputs += ["-i", logo_path]
+        filters.append(
+            f"[{next_input}:v]scale={logo_width}:-1,format=rgba,"
+            f"colorchannelmixer=aa={logo_opacity}[logo]"
+        )
+        filters.append(f"{last}[logo]overlay=x=W-w:y={logo_margin_top}[branded]")
+        last = "[branded]"
+
+    return inputs, filters, last
+
+
+def _audio_filters(
+    next_input: int,
+    narration_path: str,
+    music_path: Optional[str],
+    total_duration: float,
+    music_volume: float,
+    music_fadeout: float,
+):
+    """
+    Narração + trilha (loop, ducking fixo, fade out) → label [aout].
+
+    Returns:
+        (inputs, filters)
+    """
+    inputs = ["-i", narration_path]
+    total = _fmt(total_duration)
+    filters = [f"[{next_input}:a]aresample=44100,apad=whole_dur={total},atrim=duration={total}[narr]"]
+    if music_path:
+        inputs += ["-stream_loop", "-1", "-i", music_path]
+        fade_start = _fmt(max(0.0, total_duration - music_fadeout))
+        filters.append(
+            f"[{next_input + 1}:a]aresample=44100,atrim=duration={total},asetpts=PTS-STARTPTS,"
+            f"volume={music_volume},afade=t=out:st={fade_start}:d={_fmt(music_fadeout)}[bg]"
+        )
+        # amix divide cada entrada por N → volume=2 restaura o ganho unitário
+        filters.append("[narr][bg]amix=inputs=2:duration=first:dropout_transition=0,volume=2[aout]")
+    else:
+        filters.append("[narr]anull[aout]")
+    return inputs, filters
+
+
+def _pad_short_segments(segments: List[dict], crossfade: float) -> List[dict]:
+    """Segmentos menores que o crossfade quebram o xfade → estica o mínimo."""
+    segments = [dict(s) for s in segments]
+    for seg in segments[1:]:
+        seg["duration"] = max(seg["duration"], crossfade * 2)
+    return segments
+
+
+def build_render_command(
+    segments: List[dict],
+    output_path: str,
+    *,
+    width: int,
+    height: int,
+    fps: int,
+    crossfade: float,
+    total_duration: float,
+    narration_path: str,
+    music_path: Optional[str] = None,
+    music_volume: float = 0.10,
+    music_fadeout: float = 2.0,
+    subtitle_overlays: Optional[List[dict]] = None,
+    logo_path: Optional[str] = None,
+    logo_width: int = 140,
+    logo_opacity: float = 0.88,
+    logo_margin_top: int = 48,
+    overlay_scale: float = 1.0,
+):
+    """
+    Monta (inputs, filter_graph, maps) para o timeline completo.
+
+    O crossfade replica concatenate_videoclips(padding=-crossfade) com
+    crossfadein: o clipe i+1 começa `crossfade` segundos antes do fim do i.
+    Offset do xfade k = soma(durações[:k]) - k * crossfade.
+    overlay_scale: legendas/logo pensados para 1080x1920 num render menor.
+    """
+    if not segments:
+        raise FFmpegRenderError("Timeline vazio.")
+
+    segments = _pad_short_segments(segments, crossfade)
+
+    inputs: List[str] = []
+    filters: List[str] = []
+    for idx, seg in enumerate(segments):
+        inputs += _segment_input(seg, width, height, fps)
+        filters.append(_segment_filter(idx, seg, width, height, fps))
+
+    # ── Crossfade encadeado ────────────────────────────────────────────────
+    last = "[s0]"
+    elapsed = segments[0]["duration"]
+    for idx in range(1, len(segments)):
+        offset = max(0.0, elapsed - crossfade)
+        label = f"[x{idx}]"
+        if crossfade > 0:
+            filters.append(
+                f"{last}[s{idx}]xfade=transition=fade:duration={_fmt(crossfade)}"
+                f":offset={_fmt(offset)}{label}"
+            )
+            elapsed = offset + segments[idx]["duration"]
+        else:
+            filters.append(f"{last}[s{idx}]concat=n=2:v=1:a=0{label}")
+            elapsed += segments[idx]["duration"]
+        last = label
+
+    filters.append(f"{last}trim=duration={_fmt(total_duration)},setpts=PTS-STARTPTS[base]")
+
+    # ── Legendas + branding ────────────────────────────────────────────────
+    ov_inputs, ov_filters, last = _overlay_filters(
+        "[base]", len(segments), subtitle_overlays, logo_path,
+        int(logo_width * overlay_scale), logo_opacity, int(logo_margin_top * overlay_scale),
+        scale=overlay_scale,
+    )
+    inputs += ov_inputs
+    filters += ov_filters
+    filters.append(f"{last}format=yuv420p[vout]")
+
+    # ── Áudio ──────────────────────────────────────────────────────────────
+    next_input = len(segments) + len(ov_inputs) // 2
+    au_inputs, au_filters = _audio_filters(
+        next_input, narration_path, music_path, total_duration, music_volume, music_fadeout
+    )
+    inputs += au_inputs
+    filters += au_filters
+
+    maps = ["-map", "[vout]", "-map", "[aout]", "-r", str(fps), "-t", _fmt(total_duration)]
+    return inputs, ";\n".join(filters), maps
+
+
+# ---------------------------------------------------------------------------
+# SAÍDAS EXTRAS (split do mesmo grafo)
+# ---------------------------------------------------------------------------
+
+# Flags de controle de taxa removidas quando um degrau define o bitrate
+_RATE_FLAGS = ("-b:v", "-maxrate", "-bufsize", "-cq", "-crf", "-rc:v")
+
+
+def _rung_encoder_args(encoder_args: List[str], kbps: Optional[int]) -> List[str]:
+    """Args do encoder com bitrate alvo do degrau (VBR limitado); sem kbps, o perfil como está."""
+    if not kbps:
+        return list(encoder_args)
+    args: List[str] = []
+    skip = False
+    for arg in encoder_args:
+        if skip:
+            skip = False
+        elif arg in _RATE_FLAGS:
+            skip = True
+        else:
+            args.append(arg)
+    if "h264_nvenc" in args:
+        args += ["-rc:v", "vbr"]
+    return args + ["-b:v", f"{kbps}k", "-maxrate", f"{int(kbps * 1.5)}k", "-bufsize", f"{kbps * 2}k"]
+
+
+def _fit_filters(src: str, label: str, src_w: int, src_h: int, width: int, height: int, tag: str) -> List[str]:
+    """
+    Encaixa o vídeo mestre (src_w x src_h) em width x height.
+
+    Mesmo aspecto → só scale. Aspecto diferente (9:16 num 16:9) → vídeo
+    inteiro centralizado sobre uma cópia "cover" desfocada, como o BlurBG
+    das imagens. O blur roda em 1/4 da resolução (modo "fast").
+    """
+    if src_w * height == src_h * width:
+        return [f"{src}scale={width}:{height},setsar=1{label}"]
+    bw, bh = max(2, width // 4 // 2 * 2), max(2, height // 4 // 2 * 2)
+    return [
+        f"{src}split[{tag}bgin][{tag}fgin]",
+        f"[{tag}bgin]scale={bw}:{bh}:force_original_aspect_ratio=increase,crop={bw}:{bh},"
+        f"boxblur=10:2,eq=brightness=-0.25,scale={width}:{height},setsar=1[{tag}bg]",
+        f"[{tag}fgin]scale='min({width},trunc(iw*{height}/ih/2)*2)':'min({height},trunc(ih*{width}/iw/2)*2)',setsar=1[{tag}fg]",
+        f"[{tag}bg][{tag}fg]overlay=x=(W-w)/2:y=(H-h)/2,format=yuv420p{label}",
+    ]
+
+
+def build_output_branches(outputs: List[dict], *, width: int, height: int, fps: int, total_duration: float):
+    """
+    Divide [vout]/[aout] do build_render_command entre a saída principal e
+    as saídas extras.
+
+    outputs: [{"name", "width", "height",
+               "videos": [{"path", "width", "height", "kbps"}],
+               "posters": [{"t", "path"}]}]
+    O alvo é composto uma vez na resolução do topo (width/height) e cada
+    degrau da escada é um scale desse resultado.
+
+    Returns:
+        (filters, main_maps, branches) — branches: [{"kind": "video"|"poster",
+        "maps": [...], "kbps", "path"}]; vídeos recebem encoder/áudio no render.
+    """
+    videos = sum(len(o["videos"]) for o in outputs)
+    filters = [
+        f"[vout]split={len(outputs) + 1}[vmain]" + "".join(f"[tg{i}]" for i in range(len(outputs))),
+        f"[aout]asplit={videos + 1}[amain]" + "".join(f"[a{k}]" for k in range(videos)),
+    ]
+    out_opts = ["-r", str(fps), "-t", _fmt(total_duration)]
+    branches = []
+    a = 0
+    for i, out in enumerate(outputs):
+        tag = f"t{i}"
+        filters += _fit_filters(f"[tg{i}]", f"[{tag}]", width, height, out["width"], out["height"], tag)
+        n = len(out["videos"]) + len(out["posters"])
+        filters.append(f"[{tag}]split={n}" + "".join(f"[{tag}o{k}]" for k in range(n)))
+        for k, video in enumerate(out["videos"]):
+            label = f"[{tag}v{k}]"
+            filters.append(f"[{tag}o{k}]scale={video['width']}:{video['height']},setsar=1{label}")
+            branches.append({"kind": "video", "path": video["path"], "kbps": video.get("kbps"),
+                             "maps": ["-map", label, "-map", f"[a{a}]"] + out_opts})
+            a += 1
+        for k, poster in enumerate(out["posters"], start=len(out["videos"])):
+            # Frames antes de t são descartados no trim (sem encode); 1 frame → JPG
+            t = min(max(0.0, poster["t"]), max(0.0, total_duration - 1.0 / fps))
+            label = f"[{tag}p{k}]"
+            filters.append(f"[{tag}o{k}]trim=start={_fmt(t)},setpts=PTS-STARTPTS{label}")
+            branches.append({"kind": "poster", "path": poster["path"],
+                             "maps": ["-map", label, "-frames:v", "1", "-q:v", "2", "-update", "1"]})
+    main_maps = ["-map", "[vmain]", "-map", "[amain]"] + out_opts
+    return filters, main_maps, branches
+
+
+def _branch_args(branches: List[dict], encoder_args: List[str], audio_args: List[str]) -> List[str]:
+    args: List[str] = []
+    for branch in branches:
+        if branch["kind"] == "video":
+            args += (branch["maps"] + _rung_encoder_args(encoder_args, branch["kbps"]) + audio_args
+                     + ["-movflags", "+faststart", branch["path"]])
+        else:
+            args += branch["maps"] + [branch["path"]]
+    return args
+
+
+def render_timeline(
+    segments: List[dict],
+    output_path: str,
+    work_dir: str,
+    timeout: Optional[float] = None,
+    encoder_profiles: Optional[list] = None,
+    audio_args: Optional[List[str]] = None,
+    outputs: Optional[List[dict]] = None,
+    **graph_kwargs,
+) -> str:
+    """
+    Renderiza o timeline inteiro em uma única chamada do ffmpeg.
+
+    Cascata de encoders igual à do MoviePy (NVENC → libx264). O grafo vai
+    para um arquivo (-filter_complex_script) para não estourar o limite de
+    tamanho da linha de comando com dezenas de legendas. O preview passa
+    PREVIEW_ENCODER_PROFILES / PREVIEW_AUDIO_ARGS. `outputs` (ver
+    build_output_branches) sai da mesma decodificação, na mesma chamada.
+
+    Raises:
+        FFmpegRenderError se todos os encoders falharem.
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    inputs, graph, maps = build_render_command(segments, output_path, **graph_kwargs)
+    branches = []
+    if outputs:
+        filters, maps, branches = build_output_branches(
+            outputs, width=graph_kwargs["width"], height=graph_kwargs["height"],
+            fps=graph_kwargs["fps"], total_duration=graph_kwargs["total_duration"])
+        graph = ";\n".join([graph] + filters)
+
+    graph_path = os.path.join(work_dir, "filter_complex.txt")
+    with open(graph_path, "w", encoding="utf-8") as f:
+        f.write(graph)
+
+    last_error = None
+    for name, encoder_args in encoder_profiles or ENCODER_PROFILES:
+        try:
+            logger.info("[FFmpegRender] Renderizando %d segmentos com %s%s...", len(segments), name,
+                        f" (+{len(branches)} saídas extras)" if branches else "")
+            _run_ffmpeg(
+                inputs + ["-filter_complex_script", graph_path] + maps
+                + encoder_args + (audio_args or AUDIO_ARGS) + ["-movflags", "+faststart", output_path]
+                + _branch_args(branches, encoder_args, audio_args or AUDIO_ARGS),
+                timeout=timeout,
+            )
+            logger.info("[FFmpegRender] Finalizado com %s → %s", name, output_path)
+            return output_path
+        except FFmpegRenderError as e:
+            last_error = e
+            logger.warning("[FFmpegRender] Encoder %s falhou: %s", name, e)
+
+    raise FFmpegRenderError(f"Todos os encoders falharam: {last_error}")
+
+
+# =============================================================================
+# RENDER PARALELO POR PEDAÇOS + CONCAT SEM RE-ENCODE
+# =============================================================================
+# O timeline é cortado em pedaços independentes no grid de frames:
+#   - "body":  miolo de um segmento (sem as bordas de crossfade);
+#   - "xfade": a sobreposição de `crossfade` s entre o segmento i e o i+1.
+# Cada pedaço vira um processo ffmpeg próprio (mesmo encoder, mesmos
+# parâmetros, sem áudio), rodando em paralelo. O áudio é mixado uma vez em
+# paralelo com o vídeo e no final o concat demuxer junta tudo com -c copy.
+# =============================================================================
+
+def plan_timeline_pieces(segments: List[dict], crossfade: float,
+                         total_duration: float, fps: int) -> List[dict]:
+    """
+    Divide o timeline em pedaços alinhados ao grid de frames.
+
+    Returns:
+        Lista ordenada de {"kind": "body"|"xfade", "seg": i, "offset",
+        "start", "frames"} — start é o tempo global do pedaço.
+    """
+    segments = _pad_short_segments(segments, crossfade)
+    total_frames = int(round(total_duration * fps))
+
+    # Início global de cada segmento (mesma conta dos offsets do xfade)
+    starts = [0.0]
+    for seg in segments[:-1]:
+        starts.append(starts[-1] + seg["duration"] - crossfade)
+
+    raw = []
+    last = len(segments) - 1
+    for i, seg in enumerate(segments):
+        body_start = starts[i] + (crossfade if i > 0 else 0.0)
+        body_end = starts[i] + seg["duration"] - (crossfade if i < last else 0.0)
+        raw.append({"kind": "body", "seg": i, "start": body_start, "end": body_end})
+        if i < last and crossfade > 0:
+            raw.append({"kind": "xfade", "seg": i, "start": starts[i + 1],
+                        "end": starts[i + 1] + crossfade})
+
+    pieces = []
+    for piece in raw:
+        f0 = int(round(piece["start"] * fps))
+        f1 = min(int(round(piece["end"] * fps)), total_frames)
+        if f1 <= f0:
+            continue
+        seg_start = starts[piece["seg"]] if piece["kind"] == "body" else starts[piece["seg"] + 1]
+        pieces.append({
+            "kind": piece["kind"],
+            "seg": piece["seg"],
+            "start": f0 / fps,
+            "frames": f1 - f0,
+            # Offset local do pedaço dentro do segmento (só usado em "body")
+            "offset": max(0.0, f0 / fps - seg_start),
+        })
+    return pieces
+
+
+def _encoder_args(name: str, threads: int) -> List[str]:
+    """Argumentos do encoder `name` com o número de threads ajustado."""
+    args = list(dict(ENCODER_PROFILES)[name])
+    args[args.index("-threads") + 1] = str(threads)
+    return args
+
+
+_ENCODER_CACHE: dict = {}
+
+
+def detect_encoder(width: int, height: int, fps: int) -> str:
+    """
+    Escolhe UM encoder para todos os pedaços (concat com -c copy exige
+    parâmetros idênticos). Testa a cascata com 1 frame e guarda o resultado.
+    """
+    if "name" not in _ENCODER_CACHE:
+        for name, args in ENCODER_PROFILES:
+            try:
+                _run_ffmpeg(
+                    ["-f", "lavfi", "-i", f"color=s={width}x{height}:r={fps}", "-frames:v", "1"]
+                    + args + ["-f", "null", "-"],
+                    timeout=30,
+                )
+                _ENCODER_CACHE["name"] = name
+                break
+            except FFmpegRenderError:
+                continue
+        else:
+            raise FFmpegRenderError("Nenhum encoder H.264 disponível.")
+        logger.info("[FFmpegRender] Encoder para render paralelo: %s", _ENCODER_CACHE["name"])
+    return _ENCODER_CACHE["name"]
+
+
+def _render_piece(piece: dict, segments: List[dict], out_path: str, encoder: List[str],
+                  width: int, height: int, fps: int, crossfade: float,
+                  subtitle_overlays, logo_path, logo_width, logo_opacity,
+                  logo_margin_top, timeout) -> str:
+    """Renderiza um pedaço do timeline em um arquivo só de vídeo."""
+    duration = piece["frames"] / fps
+    i = piece["seg"]
+    inputs: List[str] = []
+    filters: List[str] = []
+
+    if piece["kind"] == "body":
+        seg = segments[i]
+        inputs += _segment_input(seg, width, height, fps, piece["offset"], duration)
+        filters.append(_segment_filter(0, seg, width, height, fps,
+                                       piece["offset"], duration, "[base]"))
+        next_input = 1
+    else:
+        # Cauda do segmento i + cabeça do i+1, fundidos com xfade. Os dois
+        # lados abrem a janela inteira do crossfade e o trim corta no grid.
+        prev, nxt = segments[i], segments[i + 1]
+        tail_offset = prev["duration"] - crossfade
+        inputs += _segment_input(prev, width, height, fps, tail_offset, crossfade)
+        inputs += _segment_input(nxt, width, height, fps, 0.0, crossfade)
+        filters.append(_segment_filter(0, prev, width, height, fps, tail_offset, crossfade, "[a]"))
+        filters.append(_segment_filter(1, nxt, width, height, fps, 0.0, crossfade, "[b]"))
+        filters.append(
+            f"[a][b]xfade=transition=fade:duration={_fmt(crossfade)}:offset=0,"
+            f"trim=duration={_fmt(duration)},setpts=PTS-STARTPTS[base]"
+        )
+        next_input = 2
+
+    ov_inputs, ov_filters, last = _overlay_filters(
+        "[base]", next_input, subtitle_overlays, logo_path,
+        logo_width, logo_opacity, logo_margin_top,
+        window_start=piece["start"], window_end=piece["start"] + duration,
+    )
+    inputs += ov_inputs
+    filters += ov_filters
+    filters.append(f"{last}format=yuv420p[vout]")
+
+    _run_ffmpeg(
+        inputs + ["-filter_complex", ";".join(filters), "-map", "[vout]",
+                  "-frames:v", str(piece["frames"]), "-r", str(fps), "-an"]
+        + encoder + ["-video_track_timescale", "90000", out_path],
+        timeout=timeout,
+    )
+    return out_path
+
+
+def render_timeline_segmented(
+    segments: List[dict],
+    output_path: str,
+    work_dir: str,
+    *,
+    width: int,
+    height: int,
+    fps: int,
+    crossfade: float,
+    total_duration: float,
+    narration_path: str,
+    music_path: Optional[str] = None,
+    music_volume: float = 0.10,
+    music_fadeout: float = 2.0,
+    subtitle_overlays: Optional[List[dict]] = None,
+    logo_path: Optional[str] = None,
+    logo_width: int = 140,
+    logo_opacity: float = 0.88,
+    logo_margin_top: int = 48,
+    workers: int = 0,
+    timeout: Optional[float] = None,
+) -> str:
+    """
+    Render paralelo: pedaços independentes em N processos ffmpeg simultâneos,
+    áudio mixado à parte e junção final com o concat demuxer (-c copy).
+
+    Raises:
+        FFmpegRenderError se qualquer pedaço falhar (o caller faz fallback).
+    """
+    if not segments:
+        raise FFmpegRenderError("Timeline vazio.")
+    os.makedirs(work_dir, exist_ok=True)
+
+    padded = _pad_short_segments(segments, crossfade)
+    pieces = plan_timeline_pieces(segments, crossfade, total_duration, fps)
+    workers = workers or os.cpu_count() or 4
+    workers = max(1, min(workers, len(pieces) + 1))
+    threads = max(1, (os.cpu_count() or 4) // workers)
+
+    encoder_name = detect_encoder(width, height, fps)
+    encoder = _encoder_args(encoder_name, threads)
+
+    logger.info("[FFmpegRender] Render paralelo: %d pedaços, %d workers, %s (%d threads cada)",
+                len(pieces), workers, encoder_name, threads)
+
+    audio_path = os.path.join(work_dir, "audio.m4a")
+    au_inputs, au_filters = _audio_filters(
+        0, narration_path, music_path, total_duration, music_volume, music_fadeout
+    )
+    audio_cmd = au_inputs + ["-filter_complex", ";".join(au_filters), "-map", "[aout]",
+                             "-t", _fmt(total_duration)] + AUDIO_ARGS + [audio_path]
+
+    piece_paths = [os.path.join(work_dir, f"piece_{k:03d}.mp4") for k in range(len(pieces))]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run_ffmpeg, audio_cmd, timeout)]
+        for piece, path in zip(pieces, piece_paths):
+            futures.append(pool.submit(
+                _render_piece, piece, padded, path, encoder, width, height, fps,
+                crossfade, subtitle_overlays, logo_path, logo_width, logo_opacity,
+                logo_margin_top, timeout,
+            ))
+        for future in futures:
+            future.result()  # propaga a primeira FFmpegRenderError
+
+    list_path = os.path.join(work_dir, "concat.txt")
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in piece_paths:
+            f.write(f"file '{path}'\n")
+
+    _run_ffmpeg(
+        ["-f", "concat", "-safe", "0", "-i", list_path, "-i", audio_path,
+         "-map", "0:v", "-map", "1:a", "-c", "copy", "-t", _fmt(total_duration),
+         "-movflags", "+faststart", output_path],
+        timeout=timeout,
+    )
+    logger.info("[FFmpegRender] Render paralelo finalizado → %s", output_path)
+    return output_path
@@ -0,0 +1,150 @@
+# =============================================================================
+# app/services/job_events.py — Webhooks de status dos jobs (outbox)
+# =============================================================================
+# Quem cria o job pode mandar callback_url (+ callback_events) no POST
+# /jobs/. A cada transição (processing, preview_ready, completed, error) uma linha entra
+# em job_events_outbox NA MESMA TRANSAÇÃO que muda o status — evento e
+# status nunca divergem, mesmo se o processo morrer logo depois.
+#
+# O dispatcher (thread do app.worker) entrega o outbox:
+#   - pega lotes com FOR UPDATE SKIP LOCKED e "reserva" as linhas
+#     empurrando next_attempt_at (vários workers não duplicam a entrega)
+#   - POST JSON com X-Job-Event / X-Event-Id (id do outbox, para dedupe)
+#   - falha → backoff exponencial com jitter até WEBHOOK_MAX_ATTEMPTS;
+#     4xx (exceto 408/429) é definitivo
+#
+# No n8n, o POST /jobs/ envia callback_url = $execution.resumeUrl e o
+# "Wait for Job" retoma no webhook em vez de fazer polling.
+# =============================================================================
+import random
+import logging
+import threading
+from typing import Optional
+
+import requests
+
+from app.config import settings
+from app.utils.database import get_db_connection
+
+logger = logging.getLogger("job_events")
+
+EVENTS = ("processing", "preview_ready", "completed", "error")
+
+# Payload montado a partir da linha já atualizada (mesma transação)
+_RECORD_SQL = """
+    INSERT INTO job_events_outbox (job_id, event, url, payload)
+    SELECT id, %(event)s, metadata->>'callback_url',
+           jsonb_build_object(
+               'job_id', id, 'event', %(event)s, 'status', status, 'title', title,
+               'video_path', video_path, 'error_message', error_message,
+               'attempt', retry_count, 'at', NOW())
+      FROM video_jobs
+     WHERE id = %(job_id)s
+       AND COALESCE(metadata->>'callback_url', '') <> ''
+       AND (COALESCE(jsonb_typeof(metadata->'callback_events'), 'null') <> 'array'
+            OR metadata->'callback_events' ? %(event)s)
+"""
+
+_CLAIM_SQL = """
+    UPDATE job_events_outbox
+       SET next_attempt_at = NOW() + make_interval(secs => %(hold_s)s)
+     WHERE id IN (
+           SELECT id FROM job_events_outbox
+            WHERE delivered_at IS NULL AND failed_at IS NULL AND next_attempt_at <= NOW()
+            ORDER BY id
+            FOR UPDATE SKIP LOCKED
+            LIMIT %(limit)s)
+    RETURNING id, job_id, event, url, payload, attempts
+"""
+
+
+def record_event(cur, job_id: str, event: str) -> None:
+    """
+    Enfileira o webhook do evento (se o job tiver callback e o filtro aceitar).
+    Chamar com o cursor da transação que mudou o status, antes do commit.
+    """
+    if event not in EVENTS:
+        return
+    cur.execute(_RECORD_SQL, {"job_id": str(job_id), "event": event})
+
+
+def _backoff(attempts: int) -> float:
+    delay = settings.WEBHOOK_BACKOFF_BASE_S * (2 ** (attempts - 1)) * random.uniform(1.0, 1.25)
+    return min(settings.WEBHOOK_BACKOFF_MAX_S, delay)
+
+
+def _deliver(row: dict) -> tuple:
+    """POST do evento. Retorna (entregue, definitivo, erro)."""
+    try:
+        response = requests.post(
+            row["url"], json=row["payload"], timeout=settings.WEBHOOK_TIMEOUT_S,
+            headers={"X-Job-Event": row["event"], "X-Event-Id": str(row["id"])})
+    except requests.RequestException as e:
+        return False, False, str(e)[:500]
+    if 200 <= response.status_code < 300:
+        return True, False, None
+    permanent = 400 <= response.status_code < 500 and response.status_code not in (408, 429)
+    return False, permanent, f"HTTP {response.status_code}: {response.text[:200]}"
+
+
+def dispatch_due(limit: int = 20) -> int:
+    """Entrega um lote de eventos vencidos. Retorna quantos foram processados."""
+    conn = get_db_connection()
+    if not conn:
+        return 0
+    try:
+        with conn.cursor() as cur:
+            cur.execute(_CLAIM_SQL, {"hold_s": settings.WEBHOOK_TIMEOUT_S * 3, "limit": limit})
+            rows = cur.fetchall()
+        conn.commit()
+
+        for row in rows:
+            ok, permanent, error = _deliver(row)
+            attempts = row["attempts"] + 1
+            with conn.cursor() as cur:
+                if ok:
+                    cur.execute(
+                        "UPDATE job_events_outbox SET delivered_at = NOW(), attempts = %s, last_error = NULL WHERE id = %s",
+                        (attempts, row["id"]))
+                    logger.info("[Webhook] Job %s: evento '%s' entregue.", row["job_id"], row["event"])
+                elif permanent or attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+                    cur.execute(
+                        "UPDATE job_events_outbox SET failed_at = NOW(), attempts = %s, last_error = %s WHERE id = %s",
+                        (attempts, error, row["id"]))
+                    logger.error("[Webhook] Job %s: evento '%s' descartado após %d tentativas: %s",
+                                 row["job_id"], row["event"], attempts, error)
+                else:
+                    cur.execute(
+                        """UPDATE job_events_outbox
+                              SET attempts = %s, last_error = %s,
+                                  next_attempt_at = NOW() + make_interval(secs => %s)
+                            WHERE id = %s""",
+                        (attempts, error, _backoff(attempts), row["id"]))
+                    logger.warning("[Webhook] Job %s: evento '%s' falhou (tentativa %d): %s",
+                                   row["job_id"], row["event"], attempts, error)
+            conn.commit()
+        return len(rows)
+    except Exception as e:
+        conn.rollback()
+        logger.error("[Webhook] Erro no dispatcher: %s", e)
+        return 0
+    finally:
+        conn.close()
+
+
+def run_dispatcher(stop_event: threading.Event) -> None:
+    """Loop do dispatcher: drena o outbox e dorme WEBHOOK_POLL_S quando vazio."""
+    logger.info("[Webhook] Dispatcher iniciado.")
+    while not stop_event.is_set():
+        if dispatch_due() == 0:
+            stop_event.wait(settings.WEBHOOK_POLL_S)
+
+
+def start_dispatcher(stop_event: Optional[threading.Event] = None) -> Optional[threading.Thread]:
+    """Sobe o dispatcher em thread daemon (None se desabilitado)."""
+    if not settings.WEBHOOK_DISPATCH_ENABLED:
+        return None
+    thread = threading.Thread(target=run_dispatcher, args=(stop_event or threading.Event(),),
+                              name="webhook-dispatcher", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,174 @@
+# =============================================================================
+# app/services/job_predict.py — Previsão do tempo de processamento dos jobs
+# =============================================================================
+# A fila pegava o job mais antigo: um vídeo longo na frente segurava vários
+# Shorts de notícia quente. Para ordenar por custo (job_queue.claim_next),
+# cada job recebe no enfileiramento uma previsão de quanto tempo vai ocupar
+# um slot de worker (video_jobs.predicted_s), calculada só pelo payload:
+#
+#   audio_s    narração estimada pelo roteiro (NARRATION_WORDS_PER_S);
+#              no histórico, a duração real do TTS
+#   images     imagens do payload (download + BlurBG + segmento)
+#   videos     vídeos do payload (yt-dlp + decode)
+#   outputs    renditions extras de config.outputs (degraus da escada)
+#   long_s     audio_s quando formato = 'video_longo'
+#   preview_s  audio_s em preview (render reduzido)
+#
+# predicted_s = w0 + w·features, com w ajustado por mínimos quadrados
+# (ridge leve) sobre os últimos PREDICT_HISTORY jobs processados do zero:
+# o finalize grava o tempo de parede do claim até o fim (processing_s) e
+# as features reais em metadata["prediction"]. Sem histórico suficiente,
+# valem os pesos padrão. O modelo é reajustado a cada PREDICT_REFIT_S.
+#
+# Promote (preview → completo) só refaz render + finalize: a previsão vem
+# da estimativa do render completo que o estágio "plan" já calculou
+# (metadata["render_plan"]["estimate_full"], ver render_plan.py).
+# =============================================================================
+import time
+import logging
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.utils.database import get_db_connection
+
+logger = logging.getLogger("job_predict")
+
+FEATURES = ("audio_s", "images", "videos", "outputs", "long_s", "preview_s")
+# Pesos padrão (segundos), antes de haver histórico: intercepto + FEATURES
+DEFAULT_WEIGHTS = (20.0, 1.5, 2.0, 6.0, 8.0, 0.5, -1.0)
+RIDGE = 1.0
+MIN_PREDICTED_S = 5.0
+# Overhead do promote além do render (finalize, abertura das entradas)
+PROMOTE_OVERHEAD_S = 3.0
+
+# Ritmo médio da narração do edge-tts (pt-BR-AntonioNeural, rate padrão)
+NARRATION_WORDS_PER_S = 2.6
+
+
+def parse_script(payload: dict) -> Tuple[str, List[str]]:
+    """Texto do roteiro (str ou {"blocks": [...]}) e search_terms do payload."""
+    script = payload.get("script", "")
+    if isinstance(script, dict):
+        text = " ".join(b.get("text", "") for b in script.get("blocks", [])) or str(script)
+        return text, script.get("search_terms", [])
+    return script or "", []
+
+
+def estimate_narration_s(script_text: str) -> float:
+    """Duração estimada da narração a partir do roteiro (antes do TTS terminar)."""
+    words = len((script_text or "").split())
+    return max(5.0, words / NARRATION_WORDS_PER_S)
+
+
+def job_features(payload: dict, narration_s: Optional[float] = None) -> dict:
+    """Features do job; `narration_s` (duração real do TTS) substitui a estimativa pelo roteiro."""
+    audio_s = narration_s if narration_s else estimate_narration_s(parse_script(payload)[0])
+    assets = payload.get("assets") or {}
+    config = payload.get("config") or {}
+    preview = bool(config.get("preview"))
+    outputs = 0 if preview else sum(max(1, len(o.get("ladder") or [])) for o in config.get("outputs") or [])
+    return {
+        "audio_s": round(float(audio_s), 2),
+        "images": len(assets.get("all_images") or []),
+        "videos": len(assets.get("all_videos") or []),
+        "outputs": outputs,
+        "long_s": round(float(audio_s), 2) if payload.get("formato") == "video_longo" else 0.0,
+        "preview_s": round(float(audio_s), 2) if preview else 0.0,
+    }
+
+
+def _row(features: dict) -> List[float]:
+    return [1.0] + [float(features.get(k) or 0.0) for k in FEATURES]
+
+
+class DurationModel:
+    """Regressão linear do tempo de processamento sobre o histórico de video_jobs."""
+
+    def __init__(self):
+        self.weights = np.array(DEFAULT_WEIGHTS)
+        self.samples = 0
+        self.basis = "default"
+        self.fitted_at = 0.0
+        self._lock = threading.Lock()
+
+    def _history(self) -> list:
+        conn = get_db_connection()
+        if not conn:
+            return []
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """SELECT metadata#>'{prediction,features}' AS features, processing_s
+                         FROM video_jobs
+                        WHERE processing_s IS NOT NULL
+                          AND metadata#>'{prediction,features}' IS NOT NULL
+                        ORDER BY updated_at DESC
+                        LIMIT %s""",
+                    (settings.PREDICT_HISTORY,))
+                rows = cur.fetchall()
+            conn.commit()
+            return rows
+        except Exception as e:
+            conn.rollback()
+            logger.warning("[Predict] Histórico indisponível: %s", e)
+            return []
+        finally:
+            conn.close()
+
+    def fit(self, rows: list) -> None:
+        """Ajusta os pesos (ridge sem penalizar o intercepto); poucos dados → pesos padrão."""
+        if len(rows) < settings.PREDICT_MIN_SAMPLES:
+            self.weights, self.basis = np.array(DEFAULT_WEIGHTS), "default"
+        else:
+            X = np.array([_row(r["features"]) for r in rows])
+            y = np.array([float(r["processing_s"]) for r in rows])
+            penalty = np.sqrt(RIDGE) * np.eye(X.shape[1])[1:]
+            weights, *_ = np.linalg.lstsq(np.vstack([X, penalty]),
+                                         np.concatenate([y, np.zeros(len(penalty))]), rcond=None)
+            self.weights, self.basis = weights, "history"
+        self.samples = len(rows)
+        self.fitted_at = time.time()
+
+    def refresh(self) -> None:
+        with self._lock:
+            if time.time() - self.fitted_at < settings.PREDICT_REFIT_S:
+                return
+            self.fit(self._history())
+            logger.info("[Predict] Modelo ajustado com %d jobs (%s).", self.samples, self.basis)
+
+    def predict(self, features: dict) -> float:
+        self.refresh()
+        return round(max(MIN_PREDICTED_S, float(np.dot(self.weights, _row(features)))), 1)
+
+
+_model: Optional[DurationModel] = None
+_model_lock = threading.Lock()
+
+
+def get_model() -> DurationModel:
+    """Modelo compartilhado do processo (reajustado sob demanda)."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = DurationModel()
+        return _model
+
+
+def predict(payload: dict) -> dict:
+    """{"predicted_s", "features", "basis", "samples"} para um job recém-enfileirado."""
+    model = get_model()
+    features = job_features(payload)
+    predicted = model.predict(features)
+    return {"predicted_s": predicted, "features": features, "basis": model.basis, "samples": model.samples}
+
+
+def predict_promote(metadata: dict) -> float:
+    """Previsão do promote: estimativa do render completo (estágio "plan") + overhead."""
+    render = (metadata or {}).get("render_plan") or {}
+    estimate = render.get("estimate_full") or render.get("estimate")
+    if estimate and estimate.get("render_s") is not None:
+        return round(float(estimate["render_s"]) + PROMOTE_OVERHEAD_S, 1)
+    return get_model().predict(dict(job_features(metadata or {}), preview_s=0.0))
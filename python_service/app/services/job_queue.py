@@ -0,0 +1,226 @@
+# =============================================================================
+# app/services/job_queue.py — Fila durável de render sobre video_jobs
+# =============================================================================
+# A API só enfileira (status 'queued'); quem renderiza são os workers
+# (python -m app.worker), em quantos processos/hosts forem necessários —
+# basta enxergar o mesmo Postgres e o mesmo /data_midia.
+#
+#   - Claim: UPDATE ... WHERE id = (SELECT ... FOR UPDATE SKIP LOCKED) —
+#     dois workers nunca pegam o mesmo job e ninguém bloqueia ninguém
+#   - Lease: o dono renova lease_expires_at a cada QUEUE_HEARTBEAT_S; se o
+#     worker morrer (OOM, restart do container), o lease expira e o job
+#     volta a ser elegível para outro worker
+#   - Tentativas: retry_count é incrementado a cada claim; passou de
+#     QUEUE_MAX_ATTEMPTS, o job vai para 'error' em vez de voltar à fila
+#
+# Erros de render (exceção no generate_video) continuam finais — quem
+# marca 'error' é o próprio generate_video. Só leases perdidos reentram.
+#
+# Ordem do claim: shortest-job-first com prioridade e envelhecimento.
+#
+#   score = predicted_s / peso(priority) - QUEUE_AGING * segundos na fila
+#
+# predicted_s vem do job_predict (gravado no enfileiramento); menor score
+# sai primeiro. Um Short de 40s passa na frente de um vídeo longo de 10
+# min, mas cada segundo de espera desconta QUEUE_AGING do custo do longo:
+# ele não fica parado para sempre atrás de Shorts novos.
+# =============================================================================
+import os
+import socket
+import logging
+import threading
+from typing import List, Optional
+
+from app.config import settings
+from app.services import job_events
+from app.utils.database import get_db_connection
+
+logger = logging.getLogger("job_queue")
+
+STATUS_QUEUED = "queued"
+STATUS_PROCESSING = "processing"
+STATUS_PREVIEW_READY = "preview_ready"  # preview renderizado; POST /jobs/{id}/promote → render completo
+
+# Peso de video_jobs.priority no score (outros valores, ex.: 'medium', contam como 'normal')
+PRIORITY_WEIGHTS = {"urgent": 4.0, "high": 2.0, "normal": 1.0, "low": 0.5}
+
+_SCORE_SQL = (
+    "COALESCE(predicted_s, %(default_s)s) / (CASE priority "
+    + " ".join(f"WHEN '{name}' THEN {weight}" for name, weight in PRIORITY_WEIGHTS.items())
+    + " ELSE 1.0 END) - %(aging)s * EXTRACT(EPOCH FROM NOW() - created_at)"
+)
+
+_CLAIM_SQL = """
+    UPDATE video_jobs
+       SET status = 'processing',
+           lease_owner = %(owner)s,
+           lease_expires_at = NOW() + make_interval(secs => %(lease_s)s),
+           heartbeat_at = NOW(),
+           started_at = NOW(),
+           retry_count = retry_count + 1,
+           updated_at = CURRENT_TIMESTAMP
+     WHERE id = (
+           SELECT id FROM video_jobs
+            WHERE (status = 'queued'
+                   OR (status = 'processing' AND lease_expires_at < NOW()))
+              AND retry_count < %(max_attempts)s
+            ORDER BY """ + _SCORE_SQL + """, created_at
+            FOR UPDATE SKIP LOCKED
+            LIMIT 1)
+    RETURNING id, metadata, retry_count, priority, predicted_s,
+              EXTRACT(EPOCH FROM NOW() - created_at) AS waited_s
+"""
+
+# Leases expirados que já esgotaram as tentativas: não voltam para a fila
+_REAP_SQL = """
+    UPDATE video_jobs
+       SET status = 'error',
+           error_message = 'Worker perdeu o job (lease expirado) após ' || retry_count || ' tentativas',
+           lease_owner = NULL,
+           lease_expires_at = NULL,
+           updated_at = CURRENT_TIMESTAMP
+     WHERE status = 'processing'
+       AND lease_expires_at < NOW()
+       AND retry_count >= %(max_attempts)s
+    RETURNING id
+"""
+
+
+def worker_id(slot: int = 0) -> str:
+    """Identificador do dono do lease: host:pid:slot."""
+    return f"{socket.gethostname()}:{os.getpid()}:{slot}"
+
+
+def _score_params() -> dict:
+    return {"default_s": settings.QUEUE_DEFAULT_COST_S, "aging": settings.QUEUE_AGING}
+
+
+def claim_next(owner: str) -> Optional[dict]:
+    """
+    Pega o job de menor score disponível (fila ou lease expirado).
+    Retorna {"id", "metadata", "retry_count", "priority", "predicted_s",
+    "waited_s"} ou None se a fila estiver vazia.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+    params = {"owner": owner, "lease_s": settings.QUEUE_LEASE_S,
+              "max_attempts": settings.QUEUE_MAX_ATTEMPTS, **_score_params()}
+    try:
+        with conn.cursor() as cur:
+            cur.execute(_REAP_SQL, params)
+            for row in cur.fetchall():
+                logger.warning("[Queue] Job %s abandonado: tentativas esgotadas.", row["id"])
+                job_events.record_event(cur, row["id"], "error")
+            cur.execute(_CLAIM_SQL, params)
+            row = cur.fetchone()
+            if row:
+                job_events.record_event(cur, row["id"], "processing")
+        conn.commit()
+        return dict(row) if row else None
+    except Exception as e:
+        conn.rollback()
+        logger.error("[Queue] Erro no claim: %s", e)
+        return None
+    finally:
+        conn.close()
+
+
+def queue_order(limit: int = 50) -> List[dict]:
+    """Jobs na fila na ordem em que serão pegos (GET /jobs/queue)."""
+    conn = get_db_connection()
+    if not conn:
+        return []
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""SELECT id, title, formato, priority, predicted_s,
+                           EXTRACT(EPOCH FROM NOW() - created_at) AS waited_s,
+                           {_SCORE_SQL} AS score
+                      FROM video_jobs
+                     WHERE status = 'queued'
+                     ORDER BY score, created_at
+                     LIMIT %(limit)s""",
+                dict(_score_params(), limit=limit))
+            rows = cur.fetchall()
+        conn.commit()
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+
+def release(job_id: str, owner: str) -> None:
+    """Solta o lease após o generate_video (o status final já foi gravado por ele)."""
+    conn = get_db_connection()
+    if not conn:
+        return
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """UPDATE video_jobs
+                      SET lease_owner = NULL, lease_expires_at = NULL
+                    WHERE id = %s AND lease_owner = %s""",
+                (job_id, owner))
+        conn.commit()
+    except Exception as e:
+        logger.warning("[Queue] Erro ao liberar lease do job %s: %s", job_id, e)
+    finally:
+        conn.close()
+
+
+class Lease:
+    """
+    Heartbeat do job em andamento (thread daemon com conexão própria).
+
+    with Lease(job_id, owner) as lease:
+        generate_video(...)
+    lease.lost → outro worker assumiu (ou o job saiu de 'processing').
+    """
+
+    def __init__(self, job_id: str, owner: str):
+        self.job_id = job_id
+        self.owner = owner
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{job_id}", daemon=True)
+
+    def _beat(self, conn) -> bool:
+        with conn.cursor() as cur:
+            cur.execute(
+                """UPDATE video_jobs
+                      SET heartbeat_at = NOW(),
+                          lease_expires_at = NOW() + make_interval(secs => %s)
+                    WHERE id = %s AND lease_owner = %s AND status = 'processing'""",
+                (settings.QUEUE_LEASE_S, self.job_id, self.owner))
+            renewed = cur.rowcount == 1
+        conn.commit()
+        return renewed
+
+    def _run(self):
+        conn = None
+        while not self._stop.wait(settings.QUEUE_HEARTBEAT_S):
+            try:
+                if conn is None or conn.closed:
+                    conn = get_db_connection()
+                if conn and not self._beat(conn) and not self._stop.is_set():
+                    self.lost = True
+                    logger.warning("[Queue] Lease do job %s perdido (owner %s).", self.job_id, self.owner)
+                    break
+            except Exception as e:
+                # Banco fora por alguns segundos não mata o render; o lease
+                # só expira se o worker ficar sem heartbeat por QUEUE_LEASE_S
+                logger.warning("[Queue] Heartbeat do job %s falhou: %s", self.job_id, e)
+                if conn is not None:
+                    conn.close()
+                conn = None
+        if conn is not None:
+            conn.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join(timeout=5)
+        return False
@@ -0,0 +1,332 @@
+# =============================================================================
+# app/services/media_cache.py — Cache de mídia endereçado por conteúdo
+# =============================================================================
+# Escudos de times, thumbnails do ScoreBat e loops do Pexels se repetem em
+# dezenas de jobs por dia. Em vez de baixar de novo para um arquivo uuid4
+# a cada job, os downloads passam por este cache compartilhado:
+#
+#   - Índice SQLite: URL normalizada → sha256 do conteúdo (+ ETag /
+#     Last-Modified para revalidação condicional)
+#   - Blobs por hash em {DATA_MIDIA}/cache/media/blobs/ab/abcdef...ext —
+#     URLs diferentes com o mesmo conteúdo ocupam um só arquivo
+#   - Dentro de MEDIA_CACHE_FRESH_S o hit é servido sem nenhum I/O de rede;
+#     depois disso, GET condicional (If-None-Match / If-Modified-Since)
+#   - Evicção LRU por tamanho total (MEDIA_CACHE_MAX_MB); arquivos maiores
+#     que 90% do limite são entregues ao job sem entrar no cache
+#   - O job recebe um HARDLINK na sua área de trabalho: evictar o blob não
+#     invalida arquivos que um job em andamento ainda está usando
+#
+# Seguro para várias threads e vários processos (locks do SQLite + lock
+# local para a conexão).
+# =============================================================================
+import os
+import time
+import uuid
+import shutil
+import hashlib
+import sqlite3
+import logging
+import threading
+from typing import Callable, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+from app.config import settings
+
+logger = logging.getLogger("media_cache")
+
+# Parâmetros de rastreamento ignorados na chave da URL
+_TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "igshid")
+
+
+def normalize_url(url: str) -> str:
+    """Chave estável: esquema/host minúsculos, sem fragmento, query ordenada e sem tracking."""
+    parts = urlsplit(url.strip())
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(_TRACKING_PARAMS)
+    )
+    host = (parts.hostname or "").lower()
+    if parts.port and not (parts.scheme == "http" and parts.port == 80
+                           or parts.scheme == "https" and parts.port == 443):
+        host = f"{host}:{parts.port}"
+    return urlunsplit((parts.scheme.lower(), host, parts.path or "/", urlencode(query), ""))
+
+
+def sha256_file(path: str) -> str:
+    """sha256 hex do conteúdo do arquivo (leitura em blocos de 1 MB)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class LruIndex:
+    """
+    Índice SQLite + evicção LRU por tamanho, base de MediaCache e
+    DerivedCache. A subclasse define a tabela (chave, path, size,
+    last_access) e, se precisar, _forget() para limpar tabelas ligadas.
+    """
+
+    _table = ""
+    _key_column = ""
+    _log_tag = ""
+
+    def _open_index(self, root: str, schema: str):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite"), timeout=30,
+                                   check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(schema)
+
+    def _execute(self, sql: str, params: tuple = ()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def _fits(self, size: int) -> bool:
+        """Arquivos maiores que 90% do limite não entram (seriam evictados na hora)."""
+        if self.max_bytes > 0 and size > self.max_bytes * 0.9:
+            logger.info("%s %.0f MB não cabem no cache; entregue sem cachear.", self._log_tag, size / 1024 / 1024)
+            return False
+        return True
+
+    def _forget(self, key: str):
+        self._execute(f"DELETE FROM {self._table} WHERE {self._key_column} = ?", (key,))
+
+    def _evict(self, keep: Optional[str] = None):
+        """
+        LRU por tamanho: remove as entradas menos acessadas até 90% do limite.
+        `keep` (a entrada que está sendo entregue) nunca é removida.
+        """
+        if self.max_bytes <= 0:
+            return
+        total = self._execute(f"SELECT COALESCE(SUM(size), 0) FROM {self._table}")[0][0]
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for key, path, size in self._execute(
+                f"SELECT {self._key_column}, path, size FROM {self._table} ORDER BY last_access"):
+            if total <= target:
+                break
+            if key == keep:
+                continue
+            if path:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._forget(key)
+            total -= size
+            removed += 1
+        logger.info("%s Evicção LRU: %d entradas removidas (%.0f MB em cache).",
+                    self._log_tag, removed, total / 1024 / 1024)
+
+
+class MediaCache(LruIndex):
+    """Cache de downloads compartilhado entre jobs (e processos) do host."""
+
+    _table = "blobs"
+    _key_column = "sha256"
+    _log_tag = "[MediaCache]"
+
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None,
+                 fresh_s: Optional[float] = None):
+        self.root = root or settings.MEDIA_CACHE_DIR or os.path.join(settings.DATA_MIDIA, "cache", "media")
+        self.blob_dir = os.path.join(self.root, "blobs")
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        self.max_bytes = max_bytes if max_bytes is not None else settings.MEDIA_CACHE_MAX_MB * 1024 * 1024
+        self.fresh_s = fresh_s if fresh_s is not None else settings.MEDIA_CACHE_FRESH_S
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._open_index(self.root, """
+            CREATE TABLE IF NOT EXISTS urls (
+                url_key TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                checked_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                sha256 TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_blobs_access ON blobs(last_access);
+        """)
+
+    # ------------------------------------------------------------------
+    # ÍNDICE
+    # ------------------------------------------------------------------
+
+    def _lookup(self, url_key: str):
+        rows = self._execute(
+            "SELECT u.sha256, u.etag, u.last_modified, u.checked_at, b.path "
+            "FROM urls u JOIN blobs b ON b.sha256 = u.sha256 WHERE u.url_key = ?", (url_key,))
+        if not rows:
+            return None
+        sha, etag, last_modified, checked_at, path = rows[0]
+        if not os.path.exists(path):
+            self._execute("DELETE FROM blobs WHERE sha256 = ?", (sha,))
+            return None
+        return {"sha256": sha, "etag": etag, "last_modified": last_modified,
+                "checked_at": checked_at, "path": path}
+
+    def _touch(self, sha: str, url_key: Optional[str] = None):
+        now = time.time()
+        self._execute("UPDATE blobs SET last_access = ? WHERE sha256 = ?", (now, sha))
+        if url_key:
+            self._execute("UPDATE urls SET checked_at = ? WHERE url_key = ?", (now, url_key))
+
+    def _ingest(self, url_key: str, tmp_path: str, ext: str,
+                etag: Optional[str] = None, last_modified: Optional[str] = None) -> Optional[str]:
+        """
+        Move o arquivo baixado para o blob do seu hash e atualiza o índice.
+        Retorna None (tmp_path intacto) se o arquivo não cabe no cache.
+        """
+        size = os.path.getsize(tmp_path)
+        if not self._fits(size):
+            return None
+        sha = sha256_file(tmp_path)
+        # Mesmo conteúdo já em cache (outra URL, talvez outra extensão): um só blob
+        known = self._execute("SELECT path FROM blobs WHERE sha256 = ?", (sha,))
+        blob_path = known[0][0] if known and os.path.exists(known[0][0]) else \
+            os.path.join(self.blob_dir, sha[:2], f"{sha}.{ext}")
+        if os.path.exists(blob_path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            os.replace(tmp_path, blob_path)
+        now = time.time()
+        self._execute(
+            "INSERT INTO blobs (sha256, path, size, last_access) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(sha256) DO UPDATE SET last_access = excluded.last_access, path = excluded.path",
+            (sha, blob_path, size, now))
+        self._execute(
+            "INSERT OR REPLACE INTO urls (url_key, sha256, etag, last_modified, checked_at) "
+            "VALUES (?, ?, ?, ?, ?)", (url_key, sha, etag, last_modified, now))
+        self._evict(keep=sha)
+        return blob_path
+
+    def _deliver(self, url_key: str, tmp_path: str, ext: str, dest_dir: str, prefix: str,
+                 etag: Optional[str] = None, last_modified: Optional[str] = None) -> str:
+        """Ingere e entrega o hardlink; o que não cabe no cache vai direto para dest_dir."""
+        blob_path = self._ingest(url_key, tmp_path, ext, etag, last_modified)
+        if blob_path:
+            return self.link_into(blob_path, dest_dir, prefix)
+        os.makedirs(dest_dir, exist_ok=True)
+        dest = os.path.join(dest_dir, f"{prefix}_{uuid.uuid4().hex}.{ext}")
+        shutil.move(tmp_path, dest)
+        return dest
+
+    def _forget(self, sha: str):
+        self._execute("DELETE FROM blobs WHERE sha256 = ?", (sha,))
+        self._execute("DELETE FROM urls WHERE sha256 = ?", (sha,))
+
+    # ------------------------------------------------------------------
+    # ENTREGA NA ÁREA DO JOB
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def link_into(blob_path: str, dest_dir: str, prefix: str = "asset") -> str:
+        """Hardlink do blob em dest_dir (cópia se estiver em outro filesystem)."""
+        os.makedirs(dest_dir, exist_ok=True)
+        ext = os.path.splitext(blob_path)[1]
+        dest = os.path.join(dest_dir, f"{prefix}_{uuid.uuid4().hex}{ext}")
+        try:
+            os.link(blob_path, dest)
+        except OSError:
+            shutil.copy2(blob_path, dest)
+        return dest
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def fetch(self, url: str, dest_dir: str, ext: str = "jpg", prefix: str = "asset",
+              headers: Optional[dict] = None, timeout: float = 15, min_bytes: int = 0) -> Optional[str]:
+        """
+        Baixa `url` via cache e devolve um path (hardlink) em dest_dir.
+
+        Hit fresco → zero rede. Hit velho → GET condicional (304 reaproveita
+        o blob). Miss → GET normal e ingestão. Retorna None se o download
+        falhar ou tiver menos que min_bytes.
+        """
+        url_key = normalize_url(url)
+        entry = self._lookup(url_key)
+        if entry and time.time() - entry["checked_at"] < self.fresh_s:
+            self._touch(entry["sha256"])
+            return self.link_into(entry["path"], dest_dir, prefix)
+
+        req_headers = dict(headers or {})
+        if entry:
+            if entry["etag"]:
+                req_headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                req_headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = requests.get(url, headers=req_headers, timeout=timeout, stream=True)
+        try:
+            if entry and response.status_code == 304:
+                self._touch(entry["sha256"], url_key)
+                return self.link_into(entry["path"], dest_dir, prefix)
+            if response.status_code != 200:
+                return None
+
+            tmp_path = os.path.join(self.tmp_dir, f"dl_{uuid.uuid4().hex}.part")
+            size = 0
+            with open(tmp_path, "wb") as f:
+                for block in response.iter_content(1 << 16):
+                    f.write(block)
+                    size += len(block)
+        finally:
+            response.close()
+
+        if size <= min_bytes:
+            os.remove(tmp_path)
+            return None
+        return self._deliver(url_key, tmp_path, ext, dest_dir, prefix,
+                             response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+    def fetch_with(self, url: str, downloader: Callable[[str], Optional[str]], dest_dir: str,
+                   prefix: str = "asset") -> Optional[str]:
+        """
+        Cache para downloads que não são HTTP simples (yt-dlp): no miss chama
+        downloader(url) → path e ingere o arquivo. Sem revalidação — a
+        entrada vive até ser evictada.
+        """
+        url_key = normalize_url(url)
+        entry = self._lookup(url_key)
+        if entry:
+            self._touch(entry["sha256"])
+            return self.link_into(entry["path"], dest_dir, prefix)
+
+        path = downloader(url)
+        if not path or not os.path.exists(path):
+            return None
+        ext = os.path.splitext(path)[1].lstrip(".") or "bin"
+        tmp_path = os.path.join(self.tmp_dir, f"dl_{uuid.uuid4().hex}.part")
+        shutil.move(path, tmp_path)
+        return self._deliver(url_key, tmp_path, ext, dest_dir, prefix)
+
+
+_cache: Optional[MediaCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_media_cache() -> Optional[MediaCache]:
+    """Instância do processo (lazy). None se o cache estiver desabilitado ou indisponível."""
+    global _cache
+    if not settings.MEDIA_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = MediaCache()
+            except Exception as e:
+                logger.warning("[MediaCache] Cache indisponível, baixando direto: %s", e)
+                return None
+        return _cache
@@ -0,0 +1,350 @@
+# =============================================================================
+# app/services/media_library.py — Índice da biblioteca de mídia local
+# =============================================================================
+# Trilhas (app/assets/music/<mood>), B-roll ({DATA_MIDIA}/broll/<categoria>),
+# loops padrão (app/assets/defaults) e fontes (app/assets/fonts) eram
+# listados com os.listdir/os.walk a cada job — e a música era escolhida sem
+# saber a duração, caindo em loop quando era mais curta que o vídeo.
+#
+#   - Índice SQLite em {DATA_MIDIA}/cache/media_library.sqlite com path,
+#     tipo, categoria, duração, loudness (dBFS médio, só áudio), resolução
+#     e codec. Arquivos só são sondados de novo se mtime/tamanho mudarem.
+#   - Trilhas: "bed" normalizado para MIX_BED_DB em {DATA_MIDIA}/cache/beds
+#     (.npy int16 44.1 kHz estéreo, lido por mmap) — o estágio de mixagem
+#     (audio_mix) só faz operações de array, sem decodificar mp3 por job.
+#   - Em memória: grupos (tipo, categoria) ordenados por duração →
+#     sorteio O(1) e "trilha que cobre o vídeo" por bisect.
+#   - Atualização: no máximo a cada MEDIA_LIBRARY_REFRESH_S, compara o
+#     mtime dos diretórios (arquivo criado/removido/renomeado) e só então
+#     varre de novo. Arquivo sobrescrito com o mesmo nome entra na próxima
+#     varredura completa (refresh(force=True)).
+#
+# Seguro para várias threads e vários processos (WAL + lock local).
+# =============================================================================
+import os
+import re
+import time
+import random
+import bisect
+import hashlib
+import sqlite3
+import logging
+import threading
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services import audio_mix
+from app.services.ffmpeg_render import FFMPEG_BIN
+
+logger = logging.getLogger("media_library")
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "assets")
+BEDS_DIR = os.path.join(settings.DATA_MIDIA, "cache", "beds")
+
+# Tipo → (raiz, extensões, categoria a partir da subpasta?)
+KINDS = {
+    "music": (os.path.join(ASSETS_DIR, "music"), (".mp3", ".m4a", ".wav", ".ogg"), True),
+    "broll": (os.path.join(settings.DATA_MIDIA, "broll"), (".mp4", ".mov", ".avi", ".mkv", ".webm"), True),
+    "loop": (os.path.join(ASSETS_DIR, "defaults"), (".mp4",), False),
+    "font": (os.path.join(ASSETS_DIR, "fonts"), (".ttf", ".otf"), False),
+}
+
+_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+_VIDEO_RE = re.compile(r"Video:\s*(\w+).*?,\s*(\d{2,5})x(\d{2,5})")
+_AUDIO_RE = re.compile(r"Audio:\s*(\w+)")
+
+
+# ---------------------------------------------------------------------------
+# SONDAGEM
+# ---------------------------------------------------------------------------
+
+def probe_media(path: str) -> dict:
+    """Duração, resolução e codec lendo só o cabeçalho (ffmpeg -i, sem ffprobe)."""
+    result = subprocess.run([FFMPEG_BIN, "-hide_banner", "-i", path],
+                            capture_output=True, text=True, errors="ignore", timeout=30)
+    info = {"duration": None, "width": None, "height": None, "codec": None}
+    match = _DURATION_RE.search(result.stderr)
+    if match:
+        h, m, s = match.groups()
+        info["duration"] = int(h) * 3600 + int(m) * 60 + float(s)
+    video = audio = None
+    for line in result.stderr.splitlines():
+        if not line.lstrip().startswith("Stream #") or "(attached pic)" in line:
+            continue  # capa de mp3 aparece como stream de vídeo png/mjpeg
+        video = video or _VIDEO_RE.search(line)
+        audio = audio or _AUDIO_RE.search(line)
+    if video:
+        info["codec"], info["width"], info["height"] = video.group(1), int(video.group(2)), int(video.group(3))
+    elif audio:
+        info["codec"] = audio.group(1)
+    return info
+
+
+# ---------------------------------------------------------------------------
+# ÍNDICE
+# ---------------------------------------------------------------------------
+
+class MediaLibrary:
+    """Índice dos assets locais com sorteio por categoria e por duração."""
+
+    def __init__(self, db_path: Optional[str] = None, kinds: Optional[dict] = None):
+        self.kinds = kinds or KINDS
+        db_path = db_path or os.path.join(settings.DATA_MIDIA, "cache", "media_library.sqlite")
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._scan_lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS assets (
+                path TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                category TEXT NOT NULL,
+                mtime REAL NOT NULL,
+                size INTEGER NOT NULL,
+                duration REAL,
+                loudness_db REAL,
+                width INTEGER,
+                height INTEGER,
+                codec TEXT,
+                probed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_assets_kind ON assets(kind, category);
+        """)
+        self._groups: Dict[Tuple[str, Optional[str]], List[dict]] = {}
+        self._durations: Dict[Tuple[str, Optional[str]], List[float]] = {}
+        self._dir_stamp: Dict[str, Optional[int]] = {}
+        self._checked_at = 0.0
+        self._built = False
+
+    def _execute(self, sql: str, params: tuple = ()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    # ------------------------------------------------------------------
+    # VARREDURA
+    # ------------------------------------------------------------------
+
+    def _changed_dirs(self) -> bool:
+        if not self._dir_stamp:
+            return True
+        for path, stamp in self._dir_stamp.items():
+            try:
+                current = os.stat(path).st_mtime_ns
+            except OSError:
+                current = None  # raiz ausente continua "sem mudança" até ser criada
+            if current != stamp:
+                return True
+        return False
+
+    def refresh(self, force: bool = False) -> bool:
+        """Varre de novo se algum diretório mudou (ou force). Retorna True se varreu."""
+        now = time.monotonic()
+        if not force and self._built and now - self._checked_at < settings.MEDIA_LIBRARY_REFRESH_S:
+            return False
+        if not self._scan_lock.acquire(blocking=not self._built):
+            return False  # outra thread já está varrendo; usa o índice atual
+        try:
+            self._checked_at = time.monotonic()
+            if not force and self._built and not self._changed_dirs():
+                return False
+            self._scan()
+            return True
+        finally:
+            self._scan_lock.release()
+
+    def _scan(self):
+        t0 = time.monotonic()
+        known = {row[0]: (row[1], row[2]) for row in self._execute("SELECT path, mtime, size FROM assets")}
+        beds = {row[0] for row in self._execute("SELECT path FROM assets WHERE kind = 'music'")}
+        seen, dir_stamp, probed = set(), {}, 0
+
+        for kind, (root, exts, by_folder) in self.kinds.items():
+            if not os.path.isdir(root):
+                dir_stamp[root] = None
+                continue
+            for dirpath, dirnames, names in os.walk(root):
+                dirnames.sort()
+                dir_stamp[dirpath] = os.stat(dirpath).st_mtime_ns
+                rel = os.path.relpath(dirpath, root)
+                category = rel.split(os.sep)[0] if by_folder and rel != "." else ""
+                for name in sorted(names):
+                    if not name.lower().endswith(exts):
+                        continue
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    seen.add(path)
+                    if known.get(path) == (st.st_mtime, st.st_size) and (
+                            kind != "music" or os.path.exists(bed_path(path, *known[path]))):
+                        continue
+                    if path in known and path in beds:
+                        _remove_bed(path, *known[path])
+                    # Fontes: categoria = família ("Montserrat-Black.ttf" → "Montserrat")
+                    cat = name.split("-")[0].split("_")[0].rsplit(".", 1)[0] if kind == "font" else category
+                    self._index_file(path, kind, cat, st)
+                    probed += 1
+
+        gone = [p for p in known if p not in seen]
+        for path in gone:
+            self._execute("DELETE FROM assets WHERE path = ?", (path,))
+            if path in beds:
+                _remove_bed(path, *known[path])
+
+        self._build_groups()
+        self._dir_stamp = dir_stamp
+        self._built = True
+        logger.info("[Library] Índice atualizado em %.1fs: %d assets (%d sondados, %d removidos).",
+                    time.monotonic() - t0, len(seen), probed, len(gone))
+
+    def _index_file(self, path: str, kind: str, category: str, st: os.stat_result):
+        info = {"duration": None, "width": None, "height": None, "codec": None}
+        loudness = None
+        try:
+            if kind != "font":
+                info = probe_media(path)
+            if kind == "music":
+                loudness = _write_bed(path, st.st_mtime, st.st_size)
+        except (OSError, RuntimeError, subprocess.TimeoutExpired) as e:
+            logger.warning("[Library] Falha ao sondar %s: %s", os.path.basename(path), e)
+        self._execute(
+            "INSERT OR REPLACE INTO assets (path, kind, category, mtime, size, duration, loudness_db, "
+            "width, height, codec, probed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, kind, category, st.st_mtime, st.st_size, info["duration"], loudness,
+             info["width"], info["height"], info["codec"], time.time()))
+
+    def _build_groups(self):
+        cols = ("path", "kind", "category", "duration", "loudness_db", "width", "height", "codec")
+        rows = self._execute(f"SELECT {', '.join(cols)} FROM assets ORDER BY COALESCE(duration, 0), path")
+        groups: Dict[Tuple[str, Optional[str]], List[dict]] = {}
+        for row in rows:
+            asset = dict(zip(cols, row))
+            groups.setdefault((asset["kind"], asset["category"]), []).append(asset)
+            groups.setdefault((asset["kind"], None), []).append(asset)
+        # Troca atômica: leitores nunca veem um índice pela metade
+        self._durations = {k: [a["duration"] or 0.0 for a in v] for k, v in groups.items()}
+        self._groups = groups
+
+    # ------------------------------------------------------------------
+    # CONSULTA
+    # ------------------------------------------------------------------
+
+    def assets(self, kind: str, category: Optional[str] = None) -> List[dict]:
+        """Assets do tipo (e categoria), ordenados por duração."""
+        self.refresh()
+        return list(self._groups.get((kind, category), []))
+
+    def categories(self, kind: str) -> List[str]:
+        self.refresh()
+        return sorted(c for k, c in self._groups if k == kind and c is not None)
+
+    def pick(self, kind: str, category: Optional[str] = None,
+             min_duration: Optional[float] = None, fallback_any: bool = True,
+             rng: Optional[random.Random] = None) -> Optional[dict]:
+        """
+        Sorteia um asset do tipo/categoria. Com min_duration, só entre os que
+        cobrem essa duração (sem loop); se nenhum cobre, o mais longo.
+        Categoria vazia/inexistente → qualquer categoria (fallback_any).
+        rng com semente → escolha reprodutível (mesmo roteiro, mesma trilha).
+        """
+        rng = rng or random
+        self.refresh()
+        key = (kind, category)
+        if not self._groups.get(key) and category is not None and fallback_any:
+            key = (kind, None)
+        group = self._groups.get(key)
+        if not group:
+            return None
+        if min_duration:
+            start = bisect.bisect_left(self._durations[key], min_duration)
+            if start >= len(group):
+                return group[-1]
+            return group[rng.randrange(start, len(group))]
+        return rng.choice(group)
+
+    def music_bed(self, path: str) -> Optional[np.ndarray]:
+        """
+        Trilha normalizada (int16, amostras x canais, por mmap). Gera na hora
+        se a varredura ainda não gerou (ex.: arquivo recém-copiado).
+        """
+        try:
+            st = os.stat(path)
+            bed = bed_path(path, st.st_mtime, st.st_size)
+            if not os.path.exists(bed):
+                _write_bed(path, st.st_mtime, st.st_size)
+            return np.load(bed, mmap_mode="r")
+        except (OSError, ValueError, RuntimeError, subprocess.TimeoutExpired) as e:
+            logger.warning("[Library] Bed indisponível para %s: %s", os.path.basename(path), e)
+            return None
+
+
+def bed_path(path: str, mtime: float, size: int) -> str:
+    """Path do bed de uma trilha (muda com o arquivo e com MIX_BED_DB)."""
+    tag = hashlib.sha1(f"{path}|{mtime}|{size}|{settings.MIX_BED_DB}".encode()).hexdigest()[:16]
+    return os.path.join(BEDS_DIR, f"{tag}.npy")
+
+
+def _write_bed(path: str, mtime: float, size: int) -> Optional[float]:
+    """Decodifica a trilha uma vez: mede o loudness e grava o bed normalizado. Retorna o loudness."""
+    samples = audio_mix.decode_pcm(path)
+    loudness = audio_mix.level_db(samples)
+    samples *= audio_mix.gain_to(loudness, settings.MIX_BED_DB)
+    peak = float(np.abs(samples).max()) if len(samples) else 0.0
+    if peak > 1.0:
+        samples /= peak  # trilha muito baixa + ganho máximo: evita clipping no int16
+    os.makedirs(BEDS_DIR, exist_ok=True)
+    dst = bed_path(path, mtime, size)
+    tmp = f"{dst}.{os.getpid()}.part.npy"
+    np.save(tmp, (samples * 32767).astype(np.int16))
+    os.replace(tmp, dst)
+    return loudness
+
+
+def _remove_bed(path: str, mtime: float, size: int):
+    try:
+        os.remove(bed_path(path, mtime, size))
+    except FileNotFoundError:
+        pass
+
+
+_library: Optional[MediaLibrary] = None
+_library_lock = threading.Lock()
+
+
+def get_media_library() -> Optional[MediaLibrary]:
+    """Instância do processo (lazy). None se desabilitada ou indisponível."""
+    global _library
+    if not settings.MEDIA_LIBRARY_ENABLED:
+        return None
+    with _library_lock:
+        if _library is None:
+            try:
+                _library = MediaLibrary()
+            except Exception as e:
+                logger.warning("[Library] Índice indisponível, listando diretórios: %s", e)
+                return None
+        return _library
+
+
+def warmup() -> None:
+    """Constrói/atualiza o índice (startup da API e dos slots do worker)."""
+    library = get_media_library()
+    if library:
+        try:
+            library.refresh(force=True)
+        except Exception as e:
+            logger.warning("[Library] Falha ao indexar a biblioteca: %s", e)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(name)s] %(levelname)s %(message)s")
+    lib = get_media_library()
+    if lib:
+        lib.refresh(force=True)
+        for kind in KINDS:
+            print(kind, {c: len(lib.assets(kind, c)) for c in lib.categories(kind)})
@@ -0,0 +1,305 @@
+# =============================================================================
+# app/services/mezzanine.py — Biblioteca mezzanine (B-roll e loops pré-escalados)
+# =============================================================================
+# Loops de app/assets/defaults e clipes de /data_midia/broll eram decodificados
+# na resolução de origem e redimensionados/cortados frame a frame a cada job.
+# A ingestão transcodifica cada clipe UMA vez para os formatos de saída:
+#
+#   {DATA_MIDIA}/mezzanine/9x16/<nome>_<hash>.mp4   1080x1920
+#   {DATA_MIDIA}/mezzanine/16x9/<nome>_<hash>.mp4   1920x1080
+#
+#   - "cover" + crop central, TARGET_FPS, yuv420p, sem áudio
+#   - GOP curto (MEZZANINE_GOP frames, sem keyframes por cena): subclip em
+#     qualquer ponto decodifica no máximo um GOP
+#   - manifest.json guarda origem (mtime/tamanho), saídas e durações;
+#     arquivos novos ou alterados na biblioteca entram na próxima varredura,
+#     removidos saem do manifest
+#
+# No render, o trabalho nesses clipes vira só decode + overlay. Vídeos de
+# stock do Panic Search usam o mesmo transcode via cache de derivados
+# (por hash de conteúdo), limitado ao trecho usado.
+# =============================================================================
+import os
+import json
+import fcntl
+import hashlib
+import logging
+import threading
+import subprocess
+from typing import Dict, Iterable, Optional
+
+from app.config import settings
+from app.services import ffmpeg_render
+from app.services.derived_cache import derived_key, get_derived_cache, source_hash
+
+logger = logging.getLogger("mezzanine")
+
+MEZZ_DIR = os.path.join(settings.DATA_MIDIA, "mezzanine")
+MANIFEST_PATH = os.path.join(MEZZ_DIR, "manifest.json")
+LOCK_PATH = os.path.join(MEZZ_DIR, ".ingest.lock")
+BROLL_DIR = os.path.join(settings.DATA_MIDIA, "broll")
+DEFAULTS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "assets", "defaults")
+
+# Formatos de saída: aspecto → (largura, altura)
+PROFILES = {"9:16": (1080, 1920), "16:9": (1920, 1080)}
+FPS = 24  # igual ao TARGET_FPS do video_engine
+VIDEO_EXTS = (".mp4", ".mov", ".avi", ".mkv", ".webm")
+
+
+def _profile_dir(aspect: str) -> str:
+    return os.path.join(MEZZ_DIR, aspect.replace(":", "x"))
+
+
+def cache_params(aspect: str, max_duration: Optional[float] = None) -> dict:
+    """Parâmetros do transcode (entram na chave do cache de derivados)."""
+    w, h = PROFILES[aspect]
+    return {"v": 1, "w": w, "h": h, "fps": FPS, "gop": settings.MEZZANINE_GOP,
+            "crf": settings.MEZZANINE_CRF, "t": max_duration}
+
+
+def transcode(src: str, dst: str, aspect: str, max_duration: Optional[float] = None,
+              timeout: Optional[float] = None) -> str:
+    """Transcodifica src → dst no perfil do aspecto (escrita atômica)."""
+    w, h = PROFILES[aspect]
+    gop = settings.MEZZANINE_GOP
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp = f"{dst}.{os.getpid()}.{threading.get_ident()}.part.mp4"
+    args = ["-i", src]
+    if max_duration:
+        args += ["-t", f"{max_duration:.3f}"]
+    args += [
+        "-an", "-vf",
+        f"scale={w}:{h}:force_original_aspect_ratio=increase,crop={w}:{h},setsar=1,fps={FPS},format=yuv420p",
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", str(settings.MEZZANINE_CRF),
+        "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0",
+        "-movflags", "+faststart", tmp,
+    ]
+    try:
+        ffmpeg_render._run_ffmpeg(args, timeout=timeout)
+        os.replace(tmp, dst)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return dst
+
+
+# ---------------------------------------------------------------------------
+# MANIFEST
+# ---------------------------------------------------------------------------
+
+_manifest: Optional[dict] = None
+_manifest_mtime = 0.0
+_manifest_lock = threading.Lock()
+
+
+def load_manifest() -> Dict[str, dict]:
+    """Manifest atual (relido só quando o arquivo muda)."""
+    global _manifest, _manifest_mtime
+    with _manifest_lock:
+        try:
+            mtime = os.path.getmtime(MANIFEST_PATH)
+        except OSError:
+            return {}
+        if _manifest is None or mtime != _manifest_mtime:
+            try:
+                with open(MANIFEST_PATH) as f:
+                    _manifest = json.load(f)
+                _manifest_mtime = mtime
+            except (OSError, ValueError) as e:
+                logger.warning("[Mezzanine] Manifest ilegível: %s", e)
+                return {}
+        return _manifest
+
+
+def _write_manifest(manifest: dict):
+    tmp = f"{MANIFEST_PATH}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, MANIFEST_PATH)
+
+
+def _duration(path: str) -> Optional[float]:
+    duration = ffmpeg_render.probe_duration(path)
+    if duration is None:
+        try:
+            from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+            duration = ffmpeg_parse_infos(path).get("duration")
+        except Exception:
+            pass
+    return duration
+
+
+def _source_stamp(path: str) -> dict:
+    st = os.stat(path)
+    return {"mtime": st.st_mtime, "size": st.st_size}
+
+
+def lookup(src: str, aspect: str = "9:16") -> Optional[dict]:
+    """
+    {"path", "duration", "width", "height", "fps"} do mezzanine de `src`,
+    ou None se não ingerido / desatualizado (a origem mudou desde a ingestão).
+    """
+    if not settings.MEZZANINE_ENABLED:
+        return None
+    entry = load_manifest().get(os.path.abspath(src))
+    if not entry:
+        return None
+    try:
+        if _source_stamp(src) != entry["source"]:
+            return None
+    except OSError:
+        return None
+    out = entry["outputs"].get(aspect)
+    if out and os.path.exists(out["path"]):
+        return out
+    return None
+
+
+def resolve(src: str, aspect: str = "9:16") -> str:
+    """Path do mezzanine se existir, senão a própria origem."""
+    out = lookup(src, aspect)
+    return out["path"] if out else src
+
+
+def is_mezzanine(path: str, aspect: str = "9:16") -> bool:
+    """Path é uma saída da biblioteca mezzanine no aspecto dado."""
+    return os.path.abspath(path).startswith(_profile_dir(aspect) + os.sep)
+
+
+def prepare_stock_clip(path: str, aspect: str = "9:16", max_duration: float = 5.0,
+                       timeout: Optional[float] = None) -> str:
+    """
+    Mezzanine do trecho inicial (max_duration) de um vídeo baixado, via
+    cache de derivados (por hash do conteúdo). Falhou → devolve a origem.
+    """
+    if not settings.MEZZANINE_ENABLED:
+        return path
+    cache = get_derived_cache()
+    sha = source_hash(path) if cache else None
+    key = derived_key(sha, "mezzanine", cache_params(aspect, max_duration), PROFILES[aspect]) if sha else None
+    work_dir = os.path.dirname(path)
+    if key:
+        hit = cache.get_file(key, work_dir, prefix="mezz")
+        if hit:
+            return hit
+    dst = os.path.join(work_dir, f"mezz_{os.path.splitext(os.path.basename(path))[0]}.mp4")
+    try:
+        transcode(path, dst, aspect, max_duration=max_duration, timeout=timeout)
+    except (ffmpeg_render.FFmpegRenderError, subprocess.TimeoutExpired, OSError) as e:
+        logger.warning("[Mezzanine] Stock sem transcode (%s); usando a origem.", e)
+        return path
+    if key:
+        cache.put_file(key, "mezzanine", dst)
+    return dst
+
+
+# ---------------------------------------------------------------------------
+# INGESTÃO (incremental)
+# ---------------------------------------------------------------------------
+
+def library_sources(roots: Optional[Iterable[str]] = None) -> list:
+    files = []
+    for root in roots or (DEFAULTS_DIR, BROLL_DIR):
+        if not os.path.isdir(root):
+            continue
+        for dirpath, _, names in os.walk(root):
+            files.extend(os.path.abspath(os.path.join(dirpath, n))
+                         for n in sorted(names) if n.lower().endswith(VIDEO_EXTS))
+    return files
+
+
+def ingest_library(roots: Optional[Iterable[str]] = None) -> dict:
+    """
+    Transcodifica o que é novo/alterado na biblioteca e atualiza o manifest.
+    Um ingest por host de cada vez (flock); quem não pega o lock sai.
+    Retorna {"ingested": n, "removed": n, "failed": n}.
+    """
+    stats = {"ingested": 0, "removed": 0, "failed": 0}
+    if not settings.MEZZANINE_ENABLED:
+        return stats
+    os.makedirs(MEZZ_DIR, exist_ok=True)
+    with open(LOCK_PATH, "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logger.info("[Mezzanine] Ingestão já em andamento em outro processo.")
+            return stats
+
+        manifest = dict(load_manifest())
+        sources = set(library_sources(roots))
+        for src in sorted(sources):
+            try:
+                stamp = _source_stamp(src)
+            except OSError:
+                # Apagado/movido durante a varredura: tratado como removido
+                logger.info("[Mezzanine] %s sumiu durante a varredura.", os.path.basename(src))
+                sources.discard(src)
+                continue
+            entry = manifest.get(src)
+            if entry and entry["source"] == stamp and all(
+                    os.path.exists(o["path"]) for o in entry["outputs"].values()):
+                continue
+            tag = hashlib.sha1(f"{src}|{stamp['mtime']}|{stamp['size']}".encode()).hexdigest()[:10]
+            base = os.path.splitext(os.path.basename(src))[0]
+            outputs = {}
+            try:
+                for aspect, (w, h) in PROFILES.items():
+                    dst = os.path.join(_profile_dir(aspect), f"{base}_{tag}.mp4")
+                    transcode(src, dst, aspect)
+                    outputs[aspect] = {"path": dst, "duration": _duration(dst),
+                                       "width": w, "height": h, "fps": FPS}
+            except (ffmpeg_render.FFmpegRenderError, subprocess.TimeoutExpired, OSError) as e:
+                logger.warning("[Mezzanine] Falha ao transcodificar %s: %s", os.path.basename(src), e)
+                stats["failed"] += 1
+                continue
+            if entry:
+                _remove_outputs(entry, keep=outputs)
+            manifest[src] = {"source": stamp, "outputs": outputs}
+            stats["ingested"] += 1
+            _write_manifest(manifest)  # progresso visível para os jobs a cada clipe
+            logger.info("[Mezzanine] %s → %s", os.path.basename(src), ", ".join(outputs))
+
+        # Fora da varredura: a raiz pode não ter sido varrida nesta chamada
+        # (com separador: /data_midia/broll não casa com /data_midia/broll2)
+        scanned = tuple(os.path.join(os.path.abspath(r), "") for r in (roots or (DEFAULTS_DIR, BROLL_DIR)))
+        for src in [s for s in manifest if s.startswith(scanned) and s not in sources]:
+            _remove_outputs(manifest.pop(src))
+            stats["removed"] += 1
+
+        _write_manifest(manifest)
+    if stats["ingested"] or stats["removed"] or stats["failed"]:
+        logger.info("[Mezzanine] Ingestão: %(ingested)d novos, %(removed)d removidos, %(failed)d falhas.", stats)
+    return stats
+
+
+def _remove_outputs(entry: dict, keep: Optional[dict] = None):
+    keep_paths = {o["path"] for o in (keep or {}).values()}
+    for out in entry.get("outputs", {}).values():
+        if out["path"] not in keep_paths:
+            try:
+                os.remove(out["path"])
+            except FileNotFoundError:
+                pass
+
+
+def start_watcher(stop_event) -> Optional[threading.Thread]:
+    """Thread que reingere a biblioteca a cada MEZZANINE_SCAN_S (novos arquivos entram sozinhos)."""
+    if not settings.MEZZANINE_ENABLED:
+        return None
+
+    def loop():
+        while not stop_event.is_set():
+            try:
+                ingest_library()
+            except Exception as e:
+                logger.error("[Mezzanine] Erro na ingestão: %s", e)
+            stop_event.wait(settings.MEZZANINE_SCAN_S)
+
+    thread = threading.Thread(target=loop, name="mezzanine-ingest", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(name)s] %(levelname)s %(message)s")
+    print(ingest_library())
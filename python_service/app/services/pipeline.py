@@ -0,0 +1,250 @@
+# =============================================================================
+# app/services/pipeline.py — Estágios retomáveis do generate_video
+# =============================================================================
+# O job é dividido em estágios explícitos:
+#
+#   audio → assets → alignment → timeline → mix → plan → render → finalize
+#
+# Cada estágio concluído é gravado em video_jobs.metadata["pipeline"]:
+#
+#   {"stages": {"audio": {"key": ..., "fingerprint": ..., "output": {...},
+#                         "artifacts": [{"path", "sha256", "size"}],
+#                         "duration_s": 3.2, "finished_at": ...}, ...}}
+#
+#   - key: hash das entradas do estágio + fingerprints dos estágios dos quais
+#     ele depende — se um estágio anterior foi refeito com outro resultado,
+#     os seguintes também são
+#   - artifacts: arquivos produzidos; na retomada, todos precisam existir
+#     com o mesmo tamanho e sha256, senão o estágio roda de novo
+#   - duration_s: tempo de parede do estágio (para ver onde o tempo vai)
+#
+# Um job reclamado de novo pela fila (lease perdido) ou reenfileirado por
+# POST /jobs/{id}/retry pula o que já está pronto. Estágios com efeito
+# colateral (finalize: status do job + webhook) usam resume=False e rodam
+# sempre — senão um retry de job concluído terminaria sem sair de
+# 'processing'.
+#
+# run_graph() executa os estágios como grafo de dependências: cada um
+# começa assim que suas dependências terminam (ex.: TTS e downloads em
+# paralelo, alinhamento logo que o áudio existe) — a latência do job tende
+# ao ramo mais longo, não à soma dos estágios.
+# =============================================================================
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.config import settings
+from app.services.media_cache import sha256_file
+
+logger = logging.getLogger("pipeline")
+
+STAGES = ("audio", "assets", "alignment", "timeline", "mix", "plan", "render", "finalize")
+
+
+def _hash(obj) -> str:
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _artifact(path: str) -> dict:
+    return {"path": path, "sha256": sha256_file(path), "size": os.path.getsize(path)}
+
+
+def _artifact_ok(art: dict) -> bool:
+    try:
+        if os.path.getsize(art["path"]) != art["size"]:
+            return False
+        return sha256_file(art["path"]) == art["sha256"]
+    except OSError:
+        return False
+
+
+def stages_from(stage: str) -> List[str]:
+    """O estágio e todos os seguintes (para invalidar numa retentativa)."""
+    if stage not in STAGES:
+        raise ValueError(f"Estágio desconhecido: {stage}")
+    return list(STAGES[STAGES.index(stage):])
+
+
+@dataclass
+class Stage:
+    """Nó do grafo: fn recebe {dependência: output} e devolve o output do estágio."""
+    name: str
+    fn: Callable[[Dict[str, dict]], dict]
+    deps: Tuple[str, ...] = ()
+    inputs: Any = None
+    artifacts: Optional[Callable[[dict], Iterable[str]]] = None
+    resume: bool = True
+
+
+class JobPipeline:
+    """Executa estágios do job com retomada e registro em metadata."""
+
+    def __init__(self, job_id: str, conn=None):
+        self.job_id = job_id
+        self.conn = conn
+        self._lock = threading.Lock()
+        self.state = self._load() if settings.PIPELINE_RESUME else {}
+        self.state.setdefault("stages", {})
+        self.timings = {}
+        self.resumed = set()
+
+    # ------------------------------------------------------------------
+    # PERSISTÊNCIA
+    # ------------------------------------------------------------------
+
+    def _load(self) -> dict:
+        if not self.conn:
+            return {}
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT metadata->'pipeline' AS pipeline FROM video_jobs WHERE id = %s",
+                            (self.job_id,))
+                row = cur.fetchone()
+            self.conn.commit()
+            return dict(row["pipeline"] or {}) if row else {}
+        except Exception as e:
+            self.conn.rollback()
+            logger.warning("[Pipeline] Estado anterior ilegível (%s); começando do zero.", e)
+            return {}
+
+    def _save(self):
+        if not self.conn:
+            return
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(
+                    """UPDATE video_jobs
+                          SET metadata = jsonb_set(COALESCE(metadata, '{}'::jsonb), '{pipeline}', %s::jsonb),
+                              updated_at = CURRENT_TIMESTAMP
+                        WHERE id = %s""",
+                    (json.dumps(self.state, default=str), self.job_id))
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            logger.warning("[Pipeline] Falha ao gravar estado do job %s: %s", self.job_id, e)
+
+    # ------------------------------------------------------------------
+    # ESTÁGIOS
+    # ------------------------------------------------------------------
+
+    def _key(self, inputs, deps: Iterable[str]) -> str:
+        stages = self.state["stages"]
+        return _hash({"inputs": inputs,
+                      "deps": {d: stages.get(d, {}).get("fingerprint") for d in deps}})
+
+    def _resumable(self, name: str, key: str) -> Optional[dict]:
+        record = self.state["stages"].get(name)
+        if not record or record.get("key") != key:
+            return None
+        if not all(_artifact_ok(a) for a in record.get("artifacts", [])):
+            logger.info("[Pipeline] Estágio '%s' tem artefatos ausentes/alterados; refazendo.", name)
+            return None
+        return record
+
+    def run(self, name: str, fn: Callable[[], dict], inputs=None, deps: Iterable[str] = (),
+            artifacts: Optional[Callable[[dict], Iterable[str]]] = None, resume: bool = True) -> dict:
+        """
+        Executa fn() → output (dict serializável em JSON) ou devolve o output
+        gravado se o estágio já foi concluído com as mesmas entradas.
+        `artifacts(output)` lista os arquivos que o estágio produziu.
+        resume=False: roda sempre (o registro fica só para tempos/histórico).
+        """
+        deps = list(deps)
+        with self._lock:
+            key = self._key(inputs, deps)
+            record = self._resumable(name, key) if resume else None
+        if record is not None:
+            logger.info("[Pipeline] Estágio '%s' retomado (%.1fs economizados).",
+                        name, record.get("duration_s", 0.0))
+            self.timings[name] = 0.0
+            self.resumed.add(name)
+            return record["output"]
+
+        t0 = time.monotonic()
+        output = fn()
+        duration = time.monotonic() - t0
+
+        paths = [p for p in (artifacts(output) if artifacts else []) if p and os.path.exists(p)]
+        arts = [_artifact(p) for p in dict.fromkeys(paths)]
+        with self._lock:
+            self.state["stages"][name] = {
+                "key": key,
+                "fingerprint": _hash({"output": output, "artifacts": [a["sha256"] for a in arts]}),
+                "output": output,
+                "artifacts": arts,
+                "duration_s": round(duration, 3),
+                "finished_at": datetime.now(timezone.utc).isoformat(),
+            }
+            self.timings[name] = duration
+            self._save()
+        logger.info("[Pipeline] Estágio '%s' concluído em %.2fs.", name, duration)
+        return output
+
+    def run_graph(self, stages: List[Stage], parallel: Optional[bool] = None) -> Dict[str, dict]:
+        """
+        Executa os estágios respeitando as dependências, em paralelo quando
+        possível (PIPELINE_PARALLEL). Retorna {nome: output}. A primeira
+        falha cancela o que ainda não começou e é relançada — o que já
+        estava rodando termina e fica gravado para a retomada.
+        """
+        parallel = settings.PIPELINE_PARALLEL if parallel is None else parallel
+        names = {st.name for st in stages}
+        for st in stages:
+            missing = set(st.deps) - names
+            if missing:
+                raise ValueError(f"Estágio '{st.name}' depende de estágios ausentes: {sorted(missing)}")
+
+        pending = {st.name: st for st in stages}
+        outputs: Dict[str, dict] = {}
+        running = {}
+        t0 = time.monotonic()
+        pool = ThreadPoolExecutor(max_workers=len(stages) if parallel else 1,
+                                  thread_name_prefix=f"stage-{self.job_id[:8]}")
+        try:
+            while pending or running:
+                for name, st in list(pending.items()):
+                    if all(d in outputs for d in st.deps):
+                        del pending[name]
+                        dep_outputs = {d: outputs[d] for d in st.deps}
+                        future = pool.submit(self.run, st.name, lambda st=st, dep=dep_outputs: st.fn(dep),
+                                             st.inputs, st.deps, st.artifacts, st.resume)
+                        running[future] = name
+                if not running:
+                    raise ValueError(f"Dependência circular entre estágios: {sorted(pending)}")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    outputs[running.pop(future)] = future.result()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        wall = time.monotonic() - t0
+        busy = sum(self.timings.get(name, 0.0) for name in outputs)
+        logger.info("[Pipeline] Job %s: %.1fs de parede para %.1fs de estágios (%.1fx).",
+                    self.job_id, wall, busy, busy / wall if wall > 0 else 1.0)
+        return outputs
+
+    def summary(self) -> str:
+        """'audio 3.2s | assets (retomado) | ...' na ordem dos estágios."""
+        parts = []
+        for name in STAGES:
+            if name not in self.timings:
+                continue
+            parts.append(f"{name} (retomado)" if name in self.resumed else f"{name} {self.timings[name]:.1f}s")
+        return " | ".join(parts)
+
+
+def invalidate_sql(stages: Iterable[str]) -> str:
+    """Expressão SQL que remove os estágios de metadata (ex.: retry a partir do render)."""
+    expr = "COALESCE(metadata, '{}'::jsonb)"
+    for name in stages:
+        if name not in STAGES:
+            raise ValueError(f"Estágio desconhecido: {name}")
+        expr = f"({expr} #- '{{pipeline,stages,{name}}}')"
+    return expr
@@ -0,0 +1,78 @@
+# =============================================================================
+# app/services/render_cache.py — Cache de resultado do render
+# =============================================================================
+# Retentativas do n8n e itens duplicados do RSS (mesmo conteúdo, source_url
+# diferente) geravam renders idênticos. Antes do render, o estágio calcula
+# uma chave canônica de tudo que determina o MP4: a versão do motor
+# (RENDER_ENGINE_VERSION — subir quando o render mudar) + o plan_hash do
+# plano do render (app/services/render_plan.py), que já cobre:
+#
+#   - roteiro + voz do TTS + legendas (tempos inclusos)
+#   - timeline com o sha256 de cada asset resolvido (não o path do job)
+#   - sha256 da trilha escolhida (sorteio com semente derivada do roteiro)
+#     e níveis da mixagem
+#   - formato: resolução, fps, crossfade, preview, logo
+#
+# Se um job concluído tem a mesma chave (video_jobs.render_hash) e o MP4
+# ainda existe, o arquivo é ligado (hardlink) no path do job novo e o
+# render é pulado. Hit/miss ficam em metadata["render_cache"].
+# =============================================================================
+import os
+import shutil
+import hashlib
+import logging
+from typing import Optional
+
+from app.config import settings
+from app.services.render_plan import plan_hash
+from app.utils.database import get_db_connection
+
+logger = logging.getLogger("render_cache")
+
+RENDER_ENGINE_VERSION = "2026.10.18-2"
+
+
+def render_key(plan: dict) -> str:
+    """Chave do cache (sha256 hex): versão do motor + plan_hash do plano."""
+    return hashlib.sha256(f"{RENDER_ENGINE_VERSION}|{plan_hash(plan)}".encode()).hexdigest()
+
+
+def find(key: str, exclude_job: Optional[str] = None) -> Optional[dict]:
+    """Job concluído com a mesma chave e MP4 ainda no disco: {"job_id", "video_path"}."""
+    if not settings.RENDER_CACHE_ENABLED:
+        return None
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """SELECT id, video_path FROM video_jobs
+                    WHERE render_hash = %s AND id::text <> %s
+                      AND status IN ('completed', 'preview_ready') AND video_path IS NOT NULL
+                    ORDER BY updated_at DESC
+                    LIMIT 5""",
+                (key, str(exclude_job or "")))
+            rows = cur.fetchall()
+        conn.commit()
+        for row in rows:
+            if os.path.exists(row["video_path"]):
+                return {"job_id": str(row["id"]), "video_path": row["video_path"]}
+        return None
+    except Exception as e:
+        conn.rollback()
+        logger.warning("[RenderCache] Consulta falhou, renderizando: %s", e)
+        return None
+    finally:
+        conn.close()
+
+
+def link(src: str, dst: str) -> str:
+    """Hardlink do MP4 existente em dst (cópia se estiver em outro filesystem)."""
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return dst
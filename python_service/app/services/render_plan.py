@@ -0,0 +1,396 @@
+# =============================================================================
+# app/services/render_plan.py — Plano declarativo do render + estimador de custo
+# =============================================================================
+# Antes do render, o job (e o POST /video/render) monta um plano pequeno e
+# serializável do que vai ser renderizado:
+#
+#   {"v": 1, "canvas": {"w": 1080, "h": 1920, "fps": 24}, "duration": 11.53,
+#    "backend": "ffmpeg", "preview": false,
+#    "tracks": {"video":    [{"type": "image", "src": "3f2a...", "dur": 4.0, "ken_burns": 0.06}, ...],
+#               "audio":    [{"role": "narration", "script": "9c1e...", "voice": "pt-BR-..."}, ...],
+#               "overlays": [{"kind": "subtitles", "count": 8, "hash": "..."}, {"kind": "logo", ...}]},
+#    "outputs": [...],                         # saídas extras (config.outputs)
+#    "sources": {"3f2a...": {"kind": "image", "path": "/data_midia/temp/..."}}}
+#
+# Fontes são identificadas pelo sha256 do conteúdo (os paths ficam só em
+# "sources"), então dois planos iguais têm o mesmo plan_hash mesmo com
+# arquivos em pastas de jobs diferentes — é a chave do cache de render.
+# O plano vai para metadata["pipeline"] (estágio "plan") e dá para
+# inspecioná-lo e compará-lo antes de renderizar.
+#
+# O estimador prevê segundos de render e pico de memória a partir do plano:
+#
+#   - work(plan): custo em "segundos de referência" (megapixel-frames de
+#     saída, Ken Burns, crossfades, decode de vídeo, legendas, saídas extras)
+#   - render_s = k[backend] * work, com k = mediana de render_s / work dos
+#     últimos renders medidos daquele backend (SQLite em
+#     {DATA_MIDIA}/cache/render_stats.sqlite); sem histórico, k padrão
+#   - peak_mb = base + m * (entradas x megapixels do canvas), ajustado por
+#     mínimos quadrados no histórico quando há amostras suficientes
+#
+# Cada render real (não hit de cache) registra tempo e pico de RSS
+# (processo + filhos, amostrado via /proc) para calibrar as próximas
+# estimativas.
+# =============================================================================
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.services.media_cache import sha256_file
+
+logger = logging.getLogger("render_plan")
+
+PLAN_VERSION = 1
+STATS_PATH = os.path.join(settings.DATA_MIDIA, "cache", "render_stats.sqlite")
+
+# Pesos do work(plan) — segundos de referência (ffmpeg, libx264, 1 render por vez)
+COST = {
+    "overhead_s": 1.5,      # spawn do ffmpeg/MoviePy, abertura das entradas, mux
+    "frame_mpx": 0.025,     # por megapixel-frame de saída (composição + encode)
+    "ken_burns_mpx": 0.010, # zoompan por megapixel-frame
+    "xfade_mpx": 0.010,     # xfade: dois frames por frame de saída
+    "decode_s": 0.15,       # por segundo de vídeo/loop decodificado (não prescaled)
+    "subtitle": 0.02,       # por legenda (PNG + overlay)
+    "extra_mpx": 0.020,     # saídas extras (scale + encode)
+}
+# k padrão (render_s / work) por backend, antes de haver histórico
+DEFAULT_FACTOR = {"ffmpeg": 1.0, "segmented": 0.6, "moviepy": 3.0, "cache": 0.0, "route": 3.0}
+# Memória padrão: base (MB) e MB por entrada x megapixel do canvas
+DEFAULT_MEM = {"ffmpeg": (250.0, 25.0), "segmented": (400.0, 25.0), "moviepy": (600.0, 60.0),
+               "route": (600.0, 60.0)}
+MIN_SAMPLES = 5
+
+
+def content_id(path: Optional[str]) -> Optional[str]:
+    """Identidade da fonte no plano: sha256 (16 hex) do conteúdo; None se não existir."""
+    if not path:
+        return None
+    try:
+        return sha256_file(path)[:16]
+    except OSError:
+        return None
+
+
+def _text_hash(obj) -> str:
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+# ---------------------------------------------------------------------------
+# PLANO
+# ---------------------------------------------------------------------------
+
+# Campos do segmento que viram efeitos no plano (o resto é path/estado do job)
+_SEGMENT_FX = ("start", "ken_burns", "mirror", "prescaled", "color", "text", "category")
+
+
+def build_plan(
+    timeline: List[dict],
+    *,
+    duration: float,
+    width: int,
+    height: int,
+    fps: int,
+    crossfade: float,
+    backend: str,
+    preview: bool = False,
+    narration: Optional[dict] = None,
+    music_path: Optional[str] = None,
+    mix: Optional[list] = None,
+    subtitle_groups: Optional[List[dict]] = None,
+    subtitle_renderer: Optional[str] = None,
+    logo_path: Optional[str] = None,
+    outputs: Optional[List[dict]] = None,
+) -> dict:
+    """
+    Plano serializável do render. `timeline` no formato do video_engine
+    ({"type", "path", "duration", ...efeitos}); `narration` identifica a
+    narração pela origem (ex.: {"script": hash, "voice": ...}), não pelo
+    arquivo do TTS, que muda de bytes a cada síntese.
+    """
+    sources = {}
+
+    def source(path: Optional[str], kind: str) -> Optional[str]:
+        sid = content_id(path)
+        if sid:
+            sources[sid] = {"kind": kind, "path": path}
+        return sid
+
+    video = []
+    for seg in timeline:
+        entry = {"type": seg["type"], "src": source(seg.get("path"), seg["type"]),
+                 "dur": round(float(seg["duration"]), 3)}
+        entry.update({k: seg[k] for k in _SEGMENT_FX if seg.get(k) not in (None, False, 0, 0.0)})
+        video.append(entry)
+
+    audio = [dict({"role": "narration"}, **(narration or {}))]
+    if music_path:
+        audio.append({"role": "music", "src": source(music_path, "music"), "mix": mix})
+
+    overlays = []
+    if subtitle_groups:
+        overlays.append({"kind": "subtitles", "count": len(subtitle_groups), "renderer": subtitle_renderer,
+                         "hash": _text_hash([[g.get("text"), g.get("start"), g.get("duration")]
+                                             for g in subtitle_groups])})
+    if logo_path:
+        overlays.append({"kind": "logo", "src": source(logo_path, "logo")})
+
+    return {
+        "v": PLAN_VERSION,
+        "canvas": {"w": width, "h": height, "fps": fps},
+        "duration": round(float(duration), 3),
+        "crossfade": crossfade,
+        "backend": backend,
+        "preview": bool(preview),
+        "tracks": {"video": video, "audio": audio, "overlays": overlays},
+        "outputs": [{"name": o["name"], "aspect": o["aspect"],
+                     "videos": [{"w": v["width"], "h": v["height"], "kbps": v.get("kbps")} for v in o["videos"]],
+                     "posters": [p["t"] for p in o["posters"]]}
+                    for o in outputs or []],
+        "sources": sources,
+    }
+
+
+def plan_hash(plan: dict) -> str:
+    """sha256 do plano sem os paths (fontes já entram pelo hash do conteúdo)."""
+    canonical = {k: v for k, v in plan.items() if k != "sources"}
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True, separators=(",", ":"),
+                                     default=str).encode()).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# FEATURES + ESTIMATIVA
+# ---------------------------------------------------------------------------
+
+def plan_features(plan: dict) -> dict:
+    """Grandezas do plano que determinam o custo do render."""
+    canvas = plan["canvas"]
+    mpx = canvas["w"] * canvas["h"] / 1e6
+    fps = canvas["fps"]
+    video = plan["tracks"]["video"]
+    kb_s = sum(s["dur"] for s in video if s.get("ken_burns"))
+    decode_s = sum(s["dur"] for s in video if s["type"] in ("video", "loop", "broll") and not s.get("prescaled"))
+    xfades = max(0, len(video) - 1) if plan.get("crossfade") else 0
+    subtitles = sum(o.get("count", 0) for o in plan["tracks"]["overlays"] if o["kind"] == "subtitles")
+    extra_mpx = sum(v["w"] * v["h"] / 1e6 * fps * plan["duration"]
+                    for o in plan.get("outputs", []) for v in o["videos"])
+    inputs = len(video) + len(plan["tracks"]["audio"]) + len(plan["tracks"]["overlays"])
+    return {
+        "frame_mpx": mpx * fps * plan["duration"],
+        "ken_burns_mpx": mpx * fps * kb_s,
+        "xfade_mpx": mpx * fps * xfades * (plan.get("crossfade") or 0.0),
+        "decode_s": decode_s,
+        "subtitles": subtitles,
+        "extra_mpx": extra_mpx,
+        "mem_units": inputs * mpx,
+    }
+
+
+def work_units(features: dict) -> float:
+    """Custo do plano em segundos de referência (ver COST)."""
+    return (COST["overhead_s"]
+            + COST["frame_mpx"] * features["frame_mpx"]
+            + COST["ken_burns_mpx"] * features["ken_burns_mpx"]
+            + COST["xfade_mpx"] * features["xfade_mpx"]
+            + COST["decode_s"] * features["decode_s"]
+            + COST["subtitle"] * features["subtitles"]
+            + COST["extra_mpx"] * features["extra_mpx"])
+
+
+class RenderStats:
+    """Histórico de renders medidos (SQLite local, WAL) e estimativa calibrada por ele."""
+
+    def __init__(self, path: str = STATS_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS renders (
+                              id INTEGER PRIMARY KEY AUTOINCREMENT,
+                              backend TEXT NOT NULL,
+                              plan_hash TEXT,
+                              work REAL NOT NULL,
+                              mem_units REAL NOT NULL,
+                              render_s REAL NOT NULL,
+                              peak_mb REAL,
+                              created_at REAL NOT NULL)""")
+            db.execute("CREATE INDEX IF NOT EXISTS idx_renders_backend ON renders (backend, id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=10)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def record(self, plan: dict, backend: str, render_s: float, peak_mb: Optional[float]):
+        """Registra um render real (hit de cache não entra)."""
+        features = plan_features(plan)
+        with self._lock, self._connect() as db:
+            db.execute("INSERT INTO renders (backend, plan_hash, work, mem_units, render_s, peak_mb, created_at) "
+                       "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                       (backend, plan_hash(plan), work_units(features), features["mem_units"],
+                        render_s, peak_mb, time.time()))
+            # Janela deslizante por backend
+            db.execute("DELETE FROM renders WHERE backend = ? AND id NOT IN "
+                       "(SELECT id FROM renders WHERE backend = ? ORDER BY id DESC LIMIT ?)",
+                       (backend, backend, settings.RENDER_STATS_WINDOW))
+
+    def _samples(self, backend: str) -> list:
+        with self._connect() as db:
+            return db.execute("SELECT work, mem_units, render_s, peak_mb FROM renders "
+                              "WHERE backend = ? ORDER BY id DESC LIMIT ?",
+                              (backend, settings.RENDER_STATS_WINDOW)).fetchall()
+
+    def estimate(self, plan: dict, backend: Optional[str] = None) -> dict:
+        """
+        {"render_s", "peak_mb", "work", "samples", "basis"} — basis
+        "history" quando calibrado por renders medidos, senão "default".
+        """
+        backend = backend or plan.get("backend") or "ffmpeg"
+        features = plan_features(plan)
+        work = work_units(features)
+        try:
+            samples = self._samples(backend)
+        except sqlite3.Error as e:
+            logger.warning("[RenderPlan] Histórico indisponível: %s", e)
+            samples = []
+
+        factor = DEFAULT_FACTOR.get(backend, 1.0)
+        base, per_unit = DEFAULT_MEM.get(backend, DEFAULT_MEM["ffmpeg"])
+        basis = "default"
+        if len(samples) >= MIN_SAMPLES:
+            factor = float(np.median([s[2] / s[0] for s in samples if s[0] > 0]))
+            basis = "history"
+            mem = np.array([(s[1], s[3]) for s in samples if s[3] is not None], dtype=float)
+            if len(mem) >= MIN_SAMPLES:
+                if np.ptp(mem[:, 0]) > 1e-6:
+                    slope, intercept = np.polyfit(mem[:, 0], mem[:, 1], 1)
+                    if slope >= 0:
+                        base, per_unit = float(intercept), float(slope)
+                    else:
+                        base, per_unit = float(np.percentile(mem[:, 1], 90)), 0.0
+                else:
+                    base, per_unit = float(np.percentile(mem[:, 1], 90)), 0.0
+        return {
+            "render_s": round(factor * work, 2),
+            "peak_mb": round(max(0.0, base + per_unit * features["mem_units"]), 1),
+            "work": round(work, 2),
+            "samples": len(samples),
+            "basis": basis,
+        }
+
+
+_stats: Optional[RenderStats] = None
+_stats_lock = threading.Lock()
+
+
+def get_render_stats() -> Optional[RenderStats]:
+    """Histórico compartilhado do processo; None se o SQLite não abrir."""
+    global _stats
+    with _stats_lock:
+        if _stats is None:
+            try:
+                _stats = RenderStats()
+            except (sqlite3.Error, OSError) as e:
+                logger.warning("[RenderPlan] Histórico de renders indisponível: %s", e)
+                return None
+        return _stats
+
+
+def estimate(plan: dict, backend: Optional[str] = None) -> dict:
+    """Estimativa do plano (k/memória padrão se não houver histórico)."""
+    stats = get_render_stats()
+    if stats:
+        return stats.estimate(plan, backend)
+    features = plan_features(plan)
+    backend = backend or plan.get("backend") or "ffmpeg"
+    base, per_unit = DEFAULT_MEM.get(backend, DEFAULT_MEM["ffmpeg"])
+    work = work_units(features)
+    return {"render_s": round(DEFAULT_FACTOR.get(backend, 1.0) * work, 2),
+            "peak_mb": round(base + per_unit * features["mem_units"], 1),
+            "work": round(work, 2), "samples": 0, "basis": "default"}
+
+
+def record(plan: dict, backend: str, render_s: float, peak_mb: Optional[float]):
+    """Registra a medição de um render (falha no histórico só vira aviso)."""
+    stats = get_render_stats()
+    if not stats:
+        return
+    try:
+        stats.record(plan, backend, render_s, peak_mb)
+    except sqlite3.Error as e:
+        logger.warning("[RenderPlan] Falha ao registrar render: %s", e)
+
+
+# ---------------------------------------------------------------------------
+# MEDIÇÃO DE MEMÓRIA (processo + filhos, via /proc)
+# ---------------------------------------------------------------------------
+
+def _rss_mb(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+def _descendants(root: int) -> List[int]:
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    found, stack = [], [root]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+class PeakMemory:
+    """
+    Context manager: pico de RSS (MB) do render — crescimento do próprio
+    processo + RSS dos filhos (ffmpeg), amostrado a cada `interval` s.
+    Sem /proc (fora do Linux), peak_mb fica None.
+    """
+
+    def __init__(self, interval: float = 0.25):
+        self.interval = interval
+        self.peak_mb: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self) -> float:
+        pid = os.getpid()
+        return (_rss_mb(pid) - self._base) + sum(_rss_mb(p) for p in _descendants(pid))
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb or 0.0, self._sample())
+
+    def __enter__(self):
+        if os.path.isdir("/proc/self"):
+            self._base = _rss_mb(os.getpid())
+            self.peak_mb = 0.0
+            self._thread = threading.Thread(target=self._loop, name="peak-memory", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+            self.peak_mb = round(max(self.peak_mb, self._sample()), 1)
+        return False
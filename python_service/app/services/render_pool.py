@@ -0,0 +1,272 @@
+# =============================================================================
+# app/services/render_pool.py — Pool de processos do POST /video/render
+# =============================================================================
+# O endpoint criava um ThreadPoolExecutor novo por requisição e envolvia o
+# render em asyncio.wait_for(..., 300). No timeout a resposta ia embora, mas
+# a thread (e o ffmpeg filho do MoviePy) continuava renderizando: renders
+# abortados seguiam comendo CPU/RAM enquanto os novos se empilhavam.
+#
+# Agora há um pool compartilhado e limitado por processo da API:
+#
+#   - RENDER_POOL_SIZE processos residentes (spawn), um render por vez cada,
+#     falando com a API por Pipe. Cada processo abre a própria sessão
+#     (os.setsid), então ffmpeg/ImageMagick filhos ficam no mesmo grupo
+#   - Timeout → SIGKILL no grupo inteiro (processo + ffmpeg), a memória
+#     volta para o SO e o slot é recriado
+#   - Fila limitada (RENDER_POOL_MAX_QUEUE): acima disso a requisição é
+#     recusada na hora em vez de esperar indefinidamente
+#   - Processos são reciclados a cada RENDER_POOL_MAX_TASKS renders
+#     (MoviePy/PIL acumulam memória entre renders)
+#   - status() expõe slots ativos, fila e contadores (GET /video/render/status)
+#
+# Funções e argumentos vão para o processo por pickle: use funções de nível
+# de módulo (ex.: routes.video._render_logic_internal).
+# =============================================================================
+import os
+import time
+import signal
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from app.config import settings
+
+logger = logging.getLogger("render_pool")
+
+
+class RenderQueueFull(Exception):
+    """Fila do pool cheia (ou espera na fila esgotada)."""
+
+
+class RenderTimeout(Exception):
+    """Render passou do timeout e o processo foi morto."""
+
+
+class RenderWorkerDied(Exception):
+    """Processo do slot morreu no meio do render (OOM, segfault...)."""
+
+
+# ---------------------------------------------------------------------------
+# PROCESSO DO SLOT
+# ---------------------------------------------------------------------------
+
+def _slot_main(conn) -> None:
+    """Loop do processo: recebe (func, args), devolve ("ok", resultado) ou ("error", exc)."""
+    # Grupo próprio: o timeout mata o processo e os ffmpeg filhos de uma vez
+    os.setsid()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(name)s] %(levelname)s %(message)s")
+    while True:
+        try:
+            func, args = conn.recv()
+        except (EOFError, OSError):
+            return  # API encerrou
+        try:
+            reply = ("ok", func(*args))
+        except Exception as e:
+            reply = ("error", e)
+        try:
+            conn.send(reply)
+        except Exception:
+            # Resultado/exceção não serializável: devolve só a mensagem
+            conn.send(("error", RuntimeError(f"{type(reply[1]).__name__}: {reply[1]}")))
+
+
+class _Slot:
+    def __init__(self, index: int):
+        self.index = index
+        self.proc = None
+        self.conn = None
+        self.tasks = 0
+        self.label = None
+        self.started_at = None
+
+    def start(self, ctx):
+        parent, child = ctx.Pipe()
+        self.proc = ctx.Process(target=_slot_main, args=(child,), name=f"render-pool-{self.index}", daemon=True)
+        self.proc.start()
+        child.close()
+        self.conn = parent
+        self.tasks = 0
+
+    def kill(self):
+        """SIGKILL no grupo do processo (inclui ffmpeg filhos)."""
+        if self.proc is None:
+            return
+        try:
+            os.killpg(self.proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            # Ainda não chamou setsid (ou já saiu): mata só o processo
+            self.proc.kill()
+        self.proc.join(timeout=5)
+        self.conn.close()
+        self.proc = None
+
+    @property
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.is_alive()
+
+
+# ---------------------------------------------------------------------------
+# POOL
+# ---------------------------------------------------------------------------
+
+class RenderPool:
+    """Pool limitado de processos de render com timeout que mata de verdade."""
+
+    def __init__(self, size: int, max_queue: int, max_tasks: int = 0):
+        self.size = max(1, size)
+        self.max_queue = max(0, max_queue)
+        self.max_tasks = max_tasks
+        self._ctx = multiprocessing.get_context("spawn")
+        self._cond = threading.Condition()
+        self._slots = [_Slot(i) for i in range(self.size)]
+        self._idle = []
+        self._queued = 0
+        self._started = False
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=self.size + self.max_queue,
+                                            thread_name_prefix="render-pool")
+        self.stats = {"completed": 0, "failed": 0, "timeouts": 0, "rejected": 0, "restarts": 0}
+
+    def start(self):
+        """Sobe os processos (idempotente). Chamado no startup ou no primeiro render."""
+        with self._cond:
+            if self._started or self._closed:
+                return
+            for slot in self._slots:
+                slot.start(self._ctx)
+            self._idle = list(self._slots)
+            self._started = True
+        logger.info("[RenderPool] %d processos de render prontos (fila máx. %d).", self.size, self.max_queue)
+
+    def _acquire(self, queue_timeout: float) -> _Slot:
+        with self._cond:
+            if self._closed:
+                raise RenderQueueFull("pool de render encerrado")
+            if not self._idle and self._queued >= self.max_queue:
+                self.stats["rejected"] += 1
+                raise RenderQueueFull(f"fila de render cheia ({self._queued} aguardando)")
+            self._queued += 1
+            try:
+                if not self._cond.wait_for(lambda: self._idle or self._closed, timeout=queue_timeout):
+                    self.stats["rejected"] += 1
+                    raise RenderQueueFull(f"sem slot de render livre após {queue_timeout:.0f}s na fila")
+                if self._closed:
+                    raise RenderQueueFull("pool de render encerrado")
+                return self._idle.pop()
+            finally:
+                self._queued -= 1
+
+    def _release(self, slot: _Slot, recycle: bool):
+        if recycle or not slot.alive or (self.max_tasks and slot.tasks >= self.max_tasks):
+            if slot.proc is not None:
+                slot.kill()
+            if not self._closed:
+                slot.start(self._ctx)
+                self.stats["restarts"] += 1
+        with self._cond:
+            slot.label = slot.started_at = None
+            if not self._closed:
+                self._idle.append(slot)
+                self._cond.notify()
+
+    def run(self, func, *args, timeout: Optional[float] = None, label: str = ""):
+        """
+        Executa func(*args) em um slot (bloqueante). Espera na fila até
+        RENDER_POOL_QUEUE_TIMEOUT_S; depois, `timeout` segundos de render.
+
+        Raises:
+            RenderQueueFull, RenderTimeout, RenderWorkerDied ou a exceção
+            levantada pela própria func.
+        """
+        self.start()
+        slot = self._acquire(settings.RENDER_POOL_QUEUE_TIMEOUT_S)
+        slot.label, slot.started_at = label, time.time()
+        recycle = True
+        try:
+            try:
+                slot.conn.send((func, args))
+                if not slot.conn.poll(timeout):
+                    self.stats["timeouts"] += 1
+                    logger.warning("[RenderPool] Timeout de %.0fs em '%s': matando o slot %d (pid %s).",
+                                   timeout, label, slot.index, slot.proc.pid)
+                    raise RenderTimeout(f"render excedeu {timeout:.0f}s e foi abortado")
+                status, value = slot.conn.recv()
+            except (EOFError, OSError) as e:
+                self.stats["failed"] += 1
+                logger.error("[RenderPool] Slot %d morreu durante '%s' (exit %s).",
+                             slot.index, label, slot.proc.exitcode if slot.proc else None)
+                raise RenderWorkerDied(f"processo de render morreu: {e}") from e
+            recycle = False
+            slot.tasks += 1
+            if status == "error":
+                self.stats["failed"] += 1
+                raise value
+            self.stats["completed"] += 1
+            return value
+        finally:
+            self._release(slot, recycle)
+
+    async def submit(self, func, *args, timeout: Optional[float] = None, label: str = ""):
+        """Versão async de run(): a espera acontece numa thread do pool, fora do event loop."""
+        with self._cond:
+            if not self._closed and self._started and not self._idle and self._queued >= self.max_queue:
+                self.stats["rejected"] += 1
+                raise RenderQueueFull(f"fila de render cheia ({self._queued} aguardando)")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, lambda: self.run(func, *args, timeout=timeout, label=label))
+
+    def status(self) -> dict:
+        """Slots, fila e contadores (GET /video/render/status)."""
+        now = time.time()
+        with self._cond:
+            slots = [{
+                "slot": s.index,
+                "pid": s.proc.pid if s.proc else None,
+                "alive": s.alive,
+                "busy": s.started_at is not None,
+                "label": s.label,
+                "elapsed_s": round(now - s.started_at, 1) if s.started_at else None,
+                "tasks": s.tasks,
+            } for s in self._slots]
+            busy = sum(1 for s in slots if s["busy"])
+            return {
+                "started": self._started,
+                "size": self.size,
+                "busy": busy,
+                "idle": len(self._idle),
+                "queued": self._queued,
+                "max_queue": self.max_queue,
+                "slots": slots,
+                "stats": dict(self.stats),
+            }
+
+    def shutdown(self):
+        """Mata os processos (shutdown da API); renders em andamento são abortados."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            slots = list(self._slots)
+        for slot in slots:
+            if slot.proc is not None:
+                slot.kill()
+        self._executor.shutdown(wait=False)
+
+
+_pool: Optional[RenderPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> RenderPool:
+    """Pool compartilhado do processo da API (criado no primeiro uso)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = RenderPool(settings.RENDER_POOL_SIZE, settings.RENDER_POOL_MAX_QUEUE,
+                               settings.RENDER_POOL_MAX_TASKS)
+        return _pool
@@ -0,0 +1,242 @@
+# =============================================================================
+# app/services/subtitle_renderer.py — Legendas via atlas de glifos (Pillow)
+# =============================================================================
+# Substitui o TextClip(method="caption") por legenda — que chama o
+# ImageMagick (`convert`) uma vez por grupo — por um renderizador in-process:
+#
+#   - Cada glifo é rasterizado UMA vez por (fonte, tamanho, stroke) em duas
+#     máscaras: contorno (stroke) e preenchimento. O atlas fica em cache.
+#   - O layout (quebra de linha na largura máxima, centralização, kerning
+#     por par) é feito em Python, colando as máscaras do atlas.
+#   - Saída: RGBA pré-renderizado → ImageClip (MoviePy) ou PNG (overlay do
+#     backend ffmpeg).
+#
+# O estilo padrão reproduz o das legendas word-level: #FFDD00, stroke preto
+# 5px, 88% da largura, topo em 75% da altura.
+# =============================================================================
+import os
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+logger = logging.getLogger("subtitle_renderer")
+
+FALLBACK_FONTS = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+]
+
+
+@dataclass(frozen=True)
+class SubtitleStyle:
+    font_path: str
+    font_size: int = 72
+    color: str = "#FFDD00"
+    stroke_color: str = "black"
+    stroke_width: int = 5
+    max_width_ratio: float = 0.88   # largura máxima do bloco (fração do frame)
+    y_ratio: float = 0.75           # topo do bloco (fração da altura)
+    line_spacing: float = 1.0       # multiplicador da altura de linha
+
+
+@lru_cache(maxsize=16)
+def load_font(font_path: str, font_size: int) -> ImageFont.FreeTypeFont:
+    """TrueType do path; fallback para DejaVu Bold ou a fonte embutida do Pillow."""
+    for candidate in [font_path] + FALLBACK_FONTS:
+        if candidate and os.path.exists(candidate):
+            try:
+                return ImageFont.truetype(candidate, font_size)
+            except OSError:
+                continue
+    logger.warning("[Subtitles] Fonte '%s' indisponível — usando fonte embutida do Pillow.", font_path)
+    return ImageFont.load_default(size=font_size)
+
+
+# ---------------------------------------------------------------------------
+# ATLAS DE GLIFOS
+# ---------------------------------------------------------------------------
+
+@dataclass
+class _Glyph:
+    stroke: np.ndarray   # máscara L (uint8) do texto com contorno
+    fill: np.ndarray     # máscara L do preenchimento, mesmo tamanho/origem
+    left: int            # deslocamento da máscara em relação ao cursor
+    top: int
+    advance: float
+
+
+class GlyphAtlas:
+    """Máscaras de contorno/preenchimento por caractere, geradas sob demanda."""
+
+    def __init__(self, font_path: str, font_size: int, stroke_width: int):
+        self.font = load_font(font_path, font_size)
+        self.stroke_width = stroke_width
+        self.glyphs: Dict[str, _Glyph] = {}
+        self.kerning: Dict[Tuple[str, str], float] = {}
+        ascent, descent = self.font.getmetrics()
+        self.ascent = ascent
+        self.line_height = ascent + descent + 2 * stroke_width
+
+    def glyph(self, ch: str) -> _Glyph:
+        cached = self.glyphs.get(ch)
+        if cached is not None:
+            return cached
+
+        sw = self.stroke_width
+        left, top, right, bottom = self.font.getbbox(ch, stroke_width=sw)
+        w, h = max(1, right - left), max(1, bottom - top)
+        stroke_img = Image.new("L", (w, h), 0)
+        fill_img = Image.new("L", (w, h), 0)
+        origin = (-left, -top)
+        ImageDraw.Draw(stroke_img).text(origin, ch, font=self.font, fill=255,
+                                        stroke_width=sw, stroke_fill=255)
+        ImageDraw.Draw(fill_img).text(origin, ch, font=self.font, fill=255)
+
+        glyph = _Glyph(np.asarray(stroke_img), np.asarray(fill_img), left, top, self.font.getlength(ch))
+        self.glyphs[ch] = glyph
+        return glyph
+
+    def kern(self, a: str, b: str) -> float:
+        """Ajuste de kerning do par (diferença entre o par e os glifos isolados)."""
+        key = (a, b)
+        if key not in self.kerning:
+            self.kerning[key] = self.font.getlength(a + b) - self.glyph(a).advance - self.glyph(b).advance
+        return self.kerning[key]
+
+    def text_width(self, text: str) -> float:
+        width, prev = 0.0, None
+        for ch in text:
+            if prev is not None:
+                width += self.kern(prev, ch)
+            width += self.glyph(ch).advance
+            prev = ch
+        return width
+
+
+@lru_cache(maxsize=8)
+def get_atlas(font_path: str, font_size: int, stroke_width: int) -> GlyphAtlas:
+    return GlyphAtlas(font_path, font_size, stroke_width)
+
+
+# ---------------------------------------------------------------------------
+# LAYOUT + RASTER
+# ---------------------------------------------------------------------------
+
+def wrap_lines(atlas: GlyphAtlas, text: str, max_width: float) -> List[str]:
+    """Quebra por palavras na largura máxima (mesmo critério do method='caption')."""
+    lines: List[str] = []
+    current = ""
+    for word in text.split():
+        candidate = f"{current} {word}" if current else word
+        if current and atlas.text_width(candidate) > max_width:
+            lines.append(current)
+            current = word
+        else:
+            current = candidate
+    if current:
+        lines.append(current)
+    return lines
+
+
+def render_text(text: str, style: SubtitleStyle, frame_width: int) -> np.ndarray:
+    """
+    Renderiza `text` centralizado em um bloco RGBA (uint8, H×W×4) justo ao
+    texto, com largura máxima style.max_width_ratio × frame_width.
+    """
+    atlas = get_atlas(style.font_path, style.font_size, style.stroke_width)
+    sw = style.stroke_width
+    lines = wrap_lines(atlas, text, frame_width * style.max_width_ratio - 2 * sw) or [""]
+    widths = [atlas.text_width(line) for line in lines]
+    line_h = int(round(atlas.line_height * style.line_spacing))
+
+    canvas_w = int(np.ceil(max(widths))) + 2 * sw + 2
+    canvas_h = line_h * len(lines) + 2
+    stroke_a = np.zeros((canvas_h, canvas_w), dtype=np.uint8)
+    fill_a = np.zeros((canvas_h, canvas_w), dtype=np.uint8)
+
+    for row, (line, width) in enumerate(zip(lines, widths)):
+        cursor = (canvas_w - width) / 2.0
+        line_top = row * line_h + sw + 1
+        prev = None
+        for ch in line:
+            if prev is not None:
+                cursor += atlas.kern(prev, ch)
+            g = atlas.glyph(ch)
+            x0 = int(round(cursor)) + g.left
+            y0 = line_top + g.top
+            h, w = g.stroke.shape
+            xs, ys = max(0, x0), max(0, y0)
+            xe, ye = min(canvas_w, x0 + w), min(canvas_h, y0 + h)
+            if xe > xs and ye > ys:
+                src = (slice(ys - y0, ye - y0), slice(xs - x0, xe - x0))
+                dst = (slice(ys, ye), slice(xs, xe))
+                np.maximum(stroke_a[dst], g.stroke[src], out=stroke_a[dst])
+                np.maximum(fill_a[dst], g.fill[src], out=fill_a[dst])
+            cursor += g.advance
+            prev = ch
+
+    # Preenchimento sobre o contorno
+    fa = fill_a[..., None].astype(np.float32) / 255.0
+    fill_rgb = np.array(ImageColor.getrgb(style.color)[:3], dtype=np.float32)
+    stroke_rgb = np.array(ImageColor.getrgb(style.stroke_color)[:3], dtype=np.float32)
+    rgba = np.empty((canvas_h, canvas_w, 4), dtype=np.uint8)
+    rgba[..., :3] = (fill_rgb * fa + stroke_rgb * (1.0 - fa)).astype(np.uint8)
+    rgba[..., 3] = np.maximum(stroke_a, fill_a)
+    return rgba
+
+
+def overlay_position(rgba: np.ndarray, style: SubtitleStyle, frame_size: Tuple[int, int]) -> Tuple[int, int]:
+    """(x, y) do bloco: centralizado na horizontal, topo em y_ratio da altura."""
+    frame_w, frame_h = frame_size
+    return (frame_w - rgba.shape[1]) // 2, int(frame_h * style.y_ratio)
+
+
+# ---------------------------------------------------------------------------
+# SAÍDAS (MoviePy / ffmpeg)
+# ---------------------------------------------------------------------------
+
+def subtitle_image_clips(groups: List[dict], style: SubtitleStyle, frame_size: Tuple[int, int]) -> List:
+    """ImageClips com máscara, um por grupo {"text", "start", "duration"}."""
+    from moviepy.editor import ImageClip
+
+    clips = []
+    for group in groups:
+        rgba = render_text(group["text"], style, frame_size[0])
+        mask = ImageClip(rgba[..., 3].astype(np.float32) / 255.0, ismask=True)
+        clip = (
+            ImageClip(rgba[..., :3])
+            .set_mask(mask)
+            .set_start(group["start"])
+            .set_duration(group["duration"])
+            .set_position(overlay_position(rgba, style, frame_size))
+        )
+        clips.append(clip)
+    return clips
+
+
+def export_overlay_pngs(groups: List[dict], style: SubtitleStyle, frame_size: Tuple[int, int],
+                        work_dir: str, prefix: str = "sub") -> List[dict]:
+    """
+    PNGs RGBA para o overlay do backend ffmpeg.
+
+    Returns:
+        [{"path", "x", "y", "start", "end"}] (formato de subtitle_overlays).
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    overlays = []
+    for k, group in enumerate(groups):
+        rgba = render_text(group["text"], style, frame_size[0])
+        path = os.path.join(work_dir, f"{prefix}_{k:03d}.png")
+        Image.fromarray(rgba, "RGBA").save(path, compress_level=1)
+        x, y = overlay_position(rgba, style, frame_size)
+        overlays.append({
+            "path": path,
+            "x": x,
+            "y": y,
+            "start": group["start"],
+            "end": group["start"] + group["duration"],
+        })
+    return overlays
@@ -1,44 +1,34 @@
-
 # =============================================================================
 # app/services/subtitles.py
 # =============================================================================
-import os
 import math
 import logging
-from faster_whisper import WhisperModel
+from app.services.transcription import transcription_client
 
 logger = logging.getLogger(__name__)
 
 class SubtitleService:
-    def __init__(self, model_size="tiny", device="cpu", compute_type="int8"):
+    def __init__(self, beam_size: int = 5, language: str = "pt"):
         """
-        Inicializa o modelo Whisper.
-        model_size: tiny, base, small, medium, large-v2
-        device: cpu ou cuda
+        Gera legendas SRT usando o Whisper residente compartilhado
+        (app/services/transcription.py). Tamanho do modelo, device e
+        compute_type são configurados no settings (WHISPER_*).
         """
-        self.model_size = model_size
-        self.device = device
-        self.compute_type = compute_type
-        self._model = None
-
-    @property
-    def model(self):
-        if self._model is None:
-            logger.info(f"[Subtitles] Carregando modelo Whisper '{self.model_size}'...")
-            self._model = WhisperModel(self.model_size, device=self.device, compute_type=self.compute_type)
-        return self._model
+        self.beam_size = beam_size
+        self.language = language
+        self.client = transcription_client
 
     def generate_srt(self, audio_path: str, output_srt_path: str):
         """Transcreve áudio e salva em formato SRT."""
         try:
             logger.info(f"[Subtitles] Transcrevendo {audio_path}...")
-            segments, info = self.model.transcribe(audio_path, beam_size=5, language="pt")
+            result = self.client.transcribe(audio_path, beam_size=self.beam_size, language=self.language)
             
             with open(output_srt_path, "w", encoding="utf-8") as f:
-                for i, segment in enumerate(segments, start=1):
-                    start = self._format_timestamp(segment.start)
-                    end = self._format_timestamp(segment.end)
-                    text = segment.text.strip()
+                for i, segment in enumerate(result["segments"], start=1):
+                    start = self._format_timestamp(segment["start"])
+                    end = self._format_timestamp(segment["end"])
+                    text = segment["text"].strip()
                     
                     f.write(f"{i}\n")
                     f.write(f"{start} --> {end}\n")
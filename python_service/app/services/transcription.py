@@ -0,0 +1,288 @@
+# =============================================================================
+# app/services/transcription.py — Serviço residente de transcrição (Whisper)
+# =============================================================================
+# Um único WhisperModel por host, carregado uma vez em um processo dedicado
+# e acessado por Unix socket (multiprocessing.connection). Todos os workers
+# do uvicorn, background tasks, video_engine e SubtitleService falam com o
+# mesmo processo — sem recarregar o modelo por job e sem RAM duplicada.
+#
+# Como funciona:
+#   - O primeiro cliente que não encontra o socket dispara o processo
+#     servidor. O servidor segura um flock no arquivo .lock: se outro
+#     processo já for o dono, o novo servidor sai imediatamente.
+#   - Socket e lock ficam num diretório local do host (tempdir), nunca no
+#     /data_midia compartilhado entre hosts: cada host tem o seu servidor.
+#   - Conexões entram em uma fila FIFO; a thread do modelo atende um pedido
+#     por vez e responde cada job na sua conexão. Não há lote entre jobs:
+#     o BatchedInferencePipeline (WHISPER_BATCH_SIZE) agrupa os trechos de
+#     um mesmo áudio.
+#   - Se o servidor não subir, o cliente cai para um modelo in-process
+#     (lazy, um por processo) — a legenda nunca trava o job.
+# =============================================================================
+import os
+import time
+import queue
+import tempfile
+import logging
+import threading
+import multiprocessing
+from multiprocessing.connection import Client, Listener
+
+from app.config import settings
+
+logger = logging.getLogger("transcription")
+
+SOCKET_PATH = settings.WHISPER_SOCKET or os.path.join(tempfile.gettempdir(), "whisper.sock")
+LOCK_PATH = SOCKET_PATH + ".lock"
+
+# Tempo máximo esperando o servidor carregar o modelo na primeira chamada
+SERVER_START_TIMEOUT = 120.0
+
+
+# ---------------------------------------------------------------------------
+# MODELO (compartilhado pelo servidor e pelo fallback in-process)
+# ---------------------------------------------------------------------------
+
+def _load_model():
+    """Carrega o WhisperModel com tamanho/device/compute_type do settings."""
+    from faster_whisper import WhisperModel
+
+    logger.info("[Transcription] Carregando modelo Whisper '%s' (%s/%s)...",
+                settings.WHISPER_MODEL_SIZE, settings.WHISPER_DEVICE, settings.WHISPER_COMPUTE_TYPE)
+    return WhisperModel(
+        settings.WHISPER_MODEL_SIZE,
+        device=settings.WHISPER_DEVICE,
+        compute_type=settings.WHISPER_COMPUTE_TYPE,
+    )
+
+
+def _batched_pipeline(model):
+    """BatchedInferencePipeline (faster-whisper >= 1.1) quando disponível."""
+    if settings.WHISPER_BATCH_SIZE <= 1:
+        return None
+    try:
+        from faster_whisper import BatchedInferencePipeline
+        return BatchedInferencePipeline(model=model)
+    except ImportError:
+        return None
+
+
+def _run_transcription(model, pipeline, audio_path: str, options: dict) -> dict:
+    """
+    Executa a transcrição e materializa o resultado em tipos simples
+    (picklable) — os segments do faster-whisper são um gerador lazy.
+    """
+    if pipeline is not None:
+        segments, info = pipeline.transcribe(audio_path, batch_size=settings.WHISPER_BATCH_SIZE, **options)
+    else:
+        segments, info = model.transcribe(audio_path, **options)
+
+    result_segments = []
+    for segment in segments:
+        words = []
+        for word_obj in (getattr(segment, "words", None) or []):
+            words.append({"word": word_obj.word, "start": word_obj.start, "end": word_obj.end})
+        result_segments.append({
+            "start": segment.start,
+            "end": segment.end,
+            "text": segment.text,
+            "words": words,
+        })
+
+    return {
+        "language": info.language,
+        "language_probability": info.language_probability,
+        "segments": result_segments,
+    }
+
+
+def _warmup_model(model):
+    """Uma inferência em 1s de silêncio aquece os kernels do CTranslate2."""
+    import numpy as np
+    list(model.transcribe(np.zeros(16000, dtype=np.float32), language="pt", beam_size=1)[0])
+
+
+# ---------------------------------------------------------------------------
+# SERVIDOR (processo residente)
+# ---------------------------------------------------------------------------
+
+class _ModelServer:
+    """Dono do modelo: aceita conexões e atende a fila em ordem de chegada."""
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self.requests: "queue.Queue" = queue.Queue()
+        self.model = _load_model()
+        self.pipeline = _batched_pipeline(self.model)
+        _warmup_model(self.model)
+        logger.info("[Transcription] Modelo pronto (batch=%s).", "on" if self.pipeline else "off")
+
+    def serve(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)  # socket órfão de um servidor anterior
+        threading.Thread(target=self._model_loop, daemon=True).start()
+        with Listener(self.socket_path, family="AF_UNIX") as listener:
+            logger.info("[Transcription] Servidor ouvindo em %s", self.socket_path)
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    logger.warning("[Transcription] Erro no accept: %s", e)
+                    continue
+                threading.Thread(target=self._read_request, args=(conn,), daemon=True).start()
+
+    def _read_request(self, conn):
+        try:
+            request = conn.recv()
+            if request.get("op") == "ping":
+                # Health check responde direto, sem esperar a fila do modelo
+                conn.send({"ok": True, "result": "pong"})
+                conn.close()
+                return
+            self.requests.put((request, conn))
+        except (EOFError, OSError):
+            conn.close()
+
+    def _model_loop(self):
+        while True:
+            request, conn = self.requests.get()
+            try:
+                reply = {"ok": True, "result": _run_transcription(
+                    self.model, self.pipeline, request["audio_path"], request.get("options", {})
+                )}
+            except Exception as e:
+                reply = {"ok": False, "error": str(e)}
+            try:
+                conn.send(reply)
+            except (EOFError, OSError):
+                pass
+            finally:
+                conn.close()
+
+
+def _server_main(socket_path: str, lock_path: str):
+    """Entry point do processo servidor (um por host, garantido por flock)."""
+    import fcntl
+
+    logging.basicConfig(level=logging.INFO,
+                        format="[%(asctime)s][%(name)s] %(levelname)s: %(message)s",
+                        datefmt="%H:%M:%S")
+    lock_file = open(lock_path, "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return  # outro processo já é o servidor deste host
+    _ModelServer(socket_path).serve()
+
+
+def _lock_is_held() -> bool:
+    """True se algum processo servidor segura o flock deste host."""
+    import fcntl
+
+    try:
+        with open(LOCK_PATH, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return False
+    except OSError:
+        return True
+
+
+# ---------------------------------------------------------------------------
+# CLIENTE
+# ---------------------------------------------------------------------------
+
+class TranscriptionClient:
+    """Cliente do servidor residente, com fallback para modelo in-process."""
+
+    def __init__(self, socket_path: str = SOCKET_PATH):
+        self.socket_path = socket_path
+        self._spawn_lock = threading.Lock()
+        self._local_model = None
+        self._local_lock = threading.Lock()
+
+    def _request(self, payload: dict):
+        conn = Client(self.socket_path, family="AF_UNIX")
+        try:
+            conn.send(payload)
+            reply = conn.recv()
+        finally:
+            conn.close()
+        if not reply.get("ok"):
+            raise RuntimeError(reply.get("error", "erro desconhecido no servidor Whisper"))
+        return reply["result"]
+
+    def _ensure_server(self) -> bool:
+        """Garante que há um servidor respondendo; dispara um se preciso."""
+        try:
+            self._request({"op": "ping"})
+            return True
+        except (OSError, EOFError):
+            pass
+
+        with self._spawn_lock:
+            os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+            ctx = multiprocessing.get_context("spawn")
+            proc = ctx.Process(target=_server_main, args=(self.socket_path, LOCK_PATH),
+                               name="whisper-server", daemon=True)
+            proc.start()
+            logger.info("[Transcription] Servidor Whisper disparado (pid=%s).", proc.pid)
+
+            deadline = time.monotonic() + SERVER_START_TIMEOUT
+            while time.monotonic() < deadline:
+                try:
+                    self._request({"op": "ping"})
+                    return True
+                except (OSError, EOFError):
+                    if not proc.is_alive() and not _lock_is_held():
+                        # Nosso servidor morreu e nenhum outro segura o lock
+                        # (ex.: faster-whisper ausente) → não adianta esperar
+                        break
+                    time.sleep(0.5)
+        logger.warning("[Transcription] Servidor Whisper indisponível.")
+        return False
+
+    def _transcribe_local(self, audio_path: str, options: dict) -> dict:
+        with self._local_lock:
+            if self._local_model is None:
+                self._local_model = _load_model()
+            return _run_transcription(self._local_model, None, audio_path, options)
+
+    def transcribe(self, audio_path: str, **options) -> dict:
+        """
+        Transcreve `audio_path` (path visível pelo servidor, ex. /data_midia).
+
+        options: repassadas ao model.transcribe (language, word_timestamps,
+        vad_filter, beam_size...).
+
+        Returns:
+            {"language", "language_probability", "segments": [{"start", "end",
+            "text", "words": [{"word", "start", "end"}]}]}
+        """
+        payload = {"op": "transcribe", "audio_path": audio_path, "options": options}
+        if settings.WHISPER_SERVER_ENABLED:
+            try:
+                return self._request(payload)
+            except (OSError, EOFError):
+                if self._ensure_server():
+                    return self._request(payload)
+        logger.warning("[Transcription] Usando modelo in-process (fallback).")
+        return self._transcribe_local(audio_path, options)
+
+    def warmup(self):
+        """Sobe o servidor (carrega + aquece o modelo) no startup da API."""
+        if not settings.WHISPER_SERVER_ENABLED:
+            return
+        try:
+            if self._ensure_server():
+                logger.info("[Transcription] Servidor Whisper pronto.")
+        except Exception as e:
+            logger.warning("[Transcription] Warmup falhou: %s", e)
+
+
+transcription_client = TranscriptionClient()
+
+
+def transcribe(audio_path: str, **options) -> dict:
+    """Atalho para transcription_client.transcribe."""
+    return transcription_client.transcribe(audio_path, **options)
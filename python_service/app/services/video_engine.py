@@ -17,6 +17,8 @@ Principais mudanças vs MVP:
 """
 
 import os
+import re
+import time
 import uuid
 import logging
 import requests
@@ -25,6 +27,7 @@ import random
 import asyncio
 import edge_tts
 import json
+import hashlib
 import numpy as np
 from typing import List, Optional, Tuple, Union
 from pathlib import Path
@@ -42,7 +45,18 @@ from moviepy.video.tools.subtitles import SubtitlesClip
 
 from app.config import settings
 from app.utils.database import get_db_connection
-from app.services.audio import AudioService
+from app.services.audio import AudioService, load_word_timings, word_timings_path
+from app.services import audio_mix, ffmpeg_render, job_events, mezzanine, render_cache, render_plan
+from app.services.job_predict import estimate_narration_s, job_features, parse_script
+from app.services.job_queue import STATUS_PREVIEW_READY
+from app.services.transcription import transcribe
+from app.services.alignment import align_script
+from app.services.asset_acquisition import AcquisitionRun
+from app.services.media_cache import get_media_cache
+from app.services.media_library import get_media_library
+from app.services.derived_cache import derived_key, get_derived_cache, source_hash
+from app.services.pipeline import JobPipeline, Stage
+from app.services.subtitle_renderer import SubtitleStyle, export_overlay_pngs, subtitle_image_clips
 
 # =============================================================================
 # CONFIGURAÇÃO DE LOGGER — Todos os passos geram logs descritivos para o Docker
@@ -74,6 +88,13 @@ DEFAULTS_DIR = os.path.join(ASSETS_DIR, "defaults")
 # Resolução alvo: 9:16 vertical (YouTube Shorts / TikTok)
 TARGET_W = 1080
 TARGET_H = 1920
+TARGET_FPS = 24
+CROSSFADE_S = 0.5  # Sobreposição entre clipes consecutivos (crossfadein)
+
+# Backends de render: "moviepy" (composição frame a frame em Python),
+# "ffmpeg" (filter_complex nativo) ou "segmented" (pedaços renderizados em
+# paralelo + concat sem re-encode). Os dois últimos caem no MoviePy se falharem.
+RENDER_BACKENDS = ("moviepy", "ffmpeg", "segmented")
 
 for d in [TEMP_DIR, OUTPUT_DIR, AUDIO_DIR, FONTS_DIR, MUSIC_DIR, OVERLAYS_DIR, DEFAULTS_DIR]:
     os.makedirs(d, exist_ok=True)
@@ -91,8 +112,14 @@ def get_montserrat_black() -> str:
     primary = os.path.join(FONTS_DIR, "Montserrat-Black.ttf")
     if os.path.exists(primary):
         return primary
-    # Fallback: primeira .ttf encontrada
+    # Fallback: primeira .ttf encontrada (Montserrat de qualquer peso antes)
     try:
+        library = get_media_library()
+        if library:
+            font = library.pick("font", "Montserrat") or library.pick("font")
+            if font:
+                logger.warning("Montserrat-Black.ttf não encontrada, usando: %s", os.path.basename(font["path"]))
+                return font["path"]
         fonts = [f for f in os.listdir(FONTS_DIR) if f.endswith(".ttf")]
         if fonts:
             logger.warning("Montserrat-Black.ttf não encontrada, usando: %s", fonts[0])
@@ -102,18 +129,32 @@ def get_montserrat_black() -> str:
     return "Arial-Bold"
 
 
-def get_background_music(mood: str = "Epic") -> Optional[str]:
+def get_background_music(mood: str = "Epic", min_duration: Optional[float] = None,
+                         rng: Optional[random.Random] = None) -> Optional[str]:
     """
     Seleciona trilha sonora aleatória da pasta de mood.
     Moods disponíveis: Epic, Happy, Rock, Sad.
+    Com min_duration, prefere trilhas que cobrem o vídeo inteiro (sem loop).
+    rng com semente torna a escolha reprodutível (cache de render).
     Fallback: qualquer .mp3 em qualquer subpasta.
     """
+    rng = rng or random
     try:
+        library = get_media_library()
+        if library:
+            track = library.pick("music", mood, min_duration=min_duration, rng=rng)
+            if track:
+                covers = not min_duration or (track["duration"] or 0) >= min_duration
+                logger.info("[Music] DJ escolheu (%s): %s (%.0fs%s)", track["category"],
+                            os.path.basename(track["path"]), track["duration"] or 0,
+                            "" if covers else ", com loop")
+                return track["path"]
+
         mood_path = os.path.join(MUSIC_DIR, mood)
         if os.path.exists(mood_path):
-            musics = [f for f in os.listdir(mood_path) if f.endswith(".mp3")]
+            musics = sorted(f for f in os.listdir(mood_path) if f.endswith(".mp3"))
             if musics:
-                chosen = random.choice(musics)
+                chosen = rng.choice(musics)
                 logger.info("[Music] DJ escolheu (%s): %s", mood, chosen)
                 return os.path.join(mood_path, chosen)
 
@@ -124,7 +165,7 @@ def get_background_music(mood: str = "Epic") -> Optional[str]:
                 if f.endswith(".mp3"):
                     all_musics.append(os.path.join(root, f))
         if all_musics:
-            chosen = random.choice(all_musics)
+            chosen = rng.choice(sorted(all_musics))
             logger.info("[Music] DJ Fallback: %s", os.path.basename(chosen))
             return chosen
     except Exception as e:
@@ -141,14 +182,21 @@ def get_watermark_path() -> Optional[str]:
     return None
 
 
-def get_fallback_loop() -> Optional[str]:
+def get_fallback_loop(rng: Optional[random.Random] = None) -> Optional[str]:
     """Retorna um vídeo de loop padrão da pasta defaults."""
+    rng = rng or random
     try:
-        loops = [f for f in os.listdir(DEFAULTS_DIR) if f.endswith(".mp4")]
+        library = get_media_library()
+        loop = library.pick("loop", rng=rng) if library else None
+        if loop:
+            logger.info("[Fallback] Usando loop padrão: %s", os.path.basename(loop["path"]))
+            return mezzanine.resolve(loop["path"], "9:16")
+        loops = sorted(f for f in os.listdir(DEFAULTS_DIR) if f.endswith(".mp4"))
         if loops:
-            chosen = random.choice(loops)
+            chosen = rng.choice(loops)
             logger.info("[Fallback] Usando loop padrão: %s", chosen)
-            return os.path.join(DEFAULTS_DIR, chosen)
+            # Versão mezzanine (já 1080x1920 @ TARGET_FPS) quando ingerida
+            return mezzanine.resolve(os.path.join(DEFAULTS_DIR, chosen), "9:16")
     except Exception:
         pass
     return None
@@ -158,17 +206,71 @@ def get_fallback_loop() -> Optional[str]:
 # PASSO A — DETECÇÃO DE WATERMARK DE STOCK (Heurística Pillow)
 # =============================================================================
 
-def detect_stock_watermark(img_path: str) -> bool:
+# Faixa analisada e limiar de "pixel claro" (valores do algoritmo original)
+WATERMARK_BAND = 0.15
+WATERMARK_BRIGHT_LEVEL = 200
+# Largura da faixa depois da redução (a razão de pixels claros é estável
+# em escala; decodificar/contar a foto inteira de 4000px não muda o score)
+WATERMARK_BAND_WIDTH = 512
+
+
+def _watermark_band(img_path: str) -> np.ndarray:
+    """Faixa inferior (15%) em grayscale, reduzida, como array numpy uint8."""
+    with Image.open(img_path) as img:
+        w, h = img.size
+        if w > WATERMARK_BAND_WIDTH:
+            # JPEG: decodifica já em escala reduzida (DCT scaling)
+            img.draft("L", (WATERMARK_BAND_WIDTH, max(1, h * WATERMARK_BAND_WIDTH // w)))
+        gray = img.convert("L")
+    w, h = gray.size
+    band = gray.crop((0, int(h * (1 - WATERMARK_BAND)), w, h))
+    if w > WATERMARK_BAND_WIDTH:
+        band = band.reduce(max(1, w // WATERMARK_BAND_WIDTH))
+    return np.asarray(band)
+
+
+def watermark_score(img_path: str) -> float:
+    """Fração de pixels muito claros (> 200) na faixa inferior da imagem."""
+    band = _watermark_band(img_path)
+    return float(np.count_nonzero(band > WATERMARK_BRIGHT_LEVEL)) / band.size if band.size else 0.0
+
+
+def score_stock_watermarks(img_paths: List[str], workers: int = 4) -> List[Tuple[Optional[float], bool]]:
+    """
+    Avaliação em lote: decodifica as faixas em paralelo (Pillow libera o GIL)
+    e devolve [(score, veredito)] na ordem de entrada. score=None → falhou
+    (veredito False, mesmo fallback do detector individual).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    def one(path):
+        try:
+            return watermark_score(path)
+        except Exception as e:
+            logger.warning("[WatermarkDetect] Erro ao checar '%s': %s", path, e)
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        scores = list(pool.map(one, img_paths))
+    return [(sc, sc is not None and sc > settings.WATERMARK_THRESHOLD) for sc in scores]
+
+
+def detect_stock_watermark(img_path: str, score: Optional[float] = None) -> bool:
     """
     Detecta marcas d'água óbvias de bancos de imagem (Getty, Adobe Stock, etc.)
     usando heurística de pixels — sem OCR, sem OpenCV, sem peso extra na build.
 
     ALGORITMO:
-        1. Abre a imagem e recorta a faixa inferior (últimos 15% da altura),
-           que é onde as watermarks de stock costumam ficar.
-        2. Converte para grayscale.
-        3. Conta pixels muito claros (valor > 200). Se mais de 25% da faixa
-           for clara, a imagem provavelmente tem texto de watermark de stock.
+        1. Abre a imagem (JPEG em modo draft, já reduzido) e recorta a faixa
+           inferior (últimos 15% da altura), onde as watermarks de stock
+           costumam ficar.
+        2. Converte para grayscale e reduz a faixa para ~512px de largura.
+        3. Conta (numpy, vetorizado) pixels muito claros (valor > 200). Se
+           a fração passar de WATERMARK_THRESHOLD (0.35), a imagem
+           provavelmente tem texto de watermark de stock.
+
+    O score é sempre logado para calibrar o limiar com dados reais.
+    `score` já calculado (cache/lote) pula a leitura da imagem.
 
     Limitações: pode rejeitar fotos com céu claro na parte de baixo.
     Em produção, isso é aceitável — melhor rejeitar do que publicar com logo.
@@ -178,22 +280,13 @@ def detect_stock_watermark(img_path: str) -> bool:
         False se parece OK → ACEITAR.
     """
     try:
-        img = Image.open(img_path).convert("L")  # Grayscale
-        w, h = img.size
-
-        # Recorta apenas os últimos 15% verticais
-        bottom_band = img.crop((0, int(h * 0.85), w, h))
-        pixels = list(bottom_band.getdata())
-
-        # Conta pixels muito claros (brancos/cinza claro típico de watermarks)
-        bright_count = sum(1 for p in pixels if p > 200)
-        bright_ratio = bright_count / len(pixels) if pixels else 0
-
-        if bright_ratio > 0.35:
-            logger.info("[WatermarkDetect] Rejeitando '%s' (%.0f%% pixels claros na base)",
-                        os.path.basename(img_path), bright_ratio * 100)
-            return True  # Suspeito de watermark
-
+        if score is None:
+            score = watermark_score(img_path)
+        verdict = score > settings.WATERMARK_THRESHOLD
+        logger.info("[WatermarkDetect] score=%.3f limiar=%.2f → %s: %s",
+                    score, settings.WATERMARK_THRESHOLD,
+                    "rejeita" if verdict else "aceita", os.path.basename(img_path))
+        return verdict
     except Exception as e:
         logger.warning("[WatermarkDetect] Erro ao checar '%s': %s", img_path, e)
     return False
@@ -203,6 +296,66 @@ def detect_stock_watermark(img_path: str) -> bool:
 # PASSO A — BLURRED BACKGROUND PADDING (O coração do refactoring visual)
 # =============================================================================
 
+def _cover_box(orig_w: int, orig_h: int) -> Tuple[float, float, float, float]:
+    """
+    Recorte da ORIGEM que, escalado, cobre exatamente TARGET_W x TARGET_H
+    (mesma conta do fundo: escala pela altura; se não cobrir a largura,
+    escala pela largura; recorte centralizado).
+    """
+    bg_ratio = TARGET_H / orig_h
+    if orig_w * bg_ratio < TARGET_W:
+        bg_ratio = TARGET_W / orig_w
+    box_w, box_h = TARGET_W / bg_ratio, TARGET_H / bg_ratio
+    x0, y0 = (orig_w - box_w) / 2, (orig_h - box_h) / 2
+    return (x0, y0, x0 + box_w, y0 + box_h)
+
+
+def _blurred_cover_layer(img: Image.Image, fast: bool = True) -> Image.Image:
+    """
+    Camada de fundo 1080x1920 desfocada (r=40) e escurecida (35%).
+
+    fast=False — caminho original: escala a origem para cobrir 1920px
+    (ex.: 3413x1920 para 16:9) com LANCZOS, recorta e aplica o
+    GaussianBlur(40) na resolução cheia.
+
+    fast=True — mesmo resultado visual a 1/BLUR_BG_DOWNSCALE da resolução:
+    o recorte de cobertura é lido direto da origem já reduzido
+    (resize com box + reducing_gap), o blur roda com raio 40/N e o
+    resultado volta a 1080x1920 com BICUBIC. Como o fundo é um borrão
+    escurecido, a diferença é imperceptível e o custo cai ~N² vezes.
+    """
+    if not fast:
+        orig_w, orig_h = img.size
+        # Escala para cobrir os 1920px de altura completamente
+        bg_ratio = TARGET_H / orig_h
+        bg_w = int(orig_w * bg_ratio)
+        bg_h = TARGET_H
+
+        # Se a largura não cobrir 1080, escala pelo eixo X
+        if bg_w < TARGET_W:
+            bg_ratio = TARGET_W / orig_w
+            bg_w = TARGET_W
+            bg_h = int(orig_h * bg_ratio)
+
+        bg = img.resize((bg_w, bg_h), Image.LANCZOS)
+
+        # Centraliza o recorte do fundo (caso seja maior que o canvas)
+        crop_x = (bg_w - TARGET_W) // 2
+        crop_y = (bg_h - TARGET_H) // 2
+        bg = bg.crop((crop_x, crop_y, crop_x + TARGET_W, crop_y + TARGET_H))
+
+        # Aplica desfoque gaussiano forte e escurece
+        bg = bg.filter(ImageFilter.GaussianBlur(radius=40))
+        return ImageEnhance.Brightness(bg).enhance(0.35)  # 65% mais escuro
+
+    factor = max(1, settings.BLUR_BG_DOWNSCALE)
+    small_size = (TARGET_W // factor, TARGET_H // factor)
+    small = img.resize(small_size, Image.BILINEAR, box=_cover_box(*img.size), reducing_gap=2.0)
+    small = small.filter(ImageFilter.GaussianBlur(radius=40 / factor))
+    small = ImageEnhance.Brightness(small).enhance(0.35)  # 65% mais escuro
+    return small.resize((TARGET_W, TARGET_H), Image.BICUBIC)
+
+
 def make_blurred_background(img_path: str) -> Optional[str]:
     """
     Transforma qualquer imagem 16:9 (ou qualquer aspect ratio) em um frame
@@ -235,27 +388,7 @@ def make_blurred_background(img_path: str) -> Optional[str]:
         orig_w, orig_h = img.size
 
         # ── CAMADA DE FUNDO (Blurred) ──────────────────────────────────────
-        # Escala para cobrir os 1920px de altura completamente
-        bg_ratio = TARGET_H / orig_h
-        bg_w = int(orig_w * bg_ratio)
-        bg_h = TARGET_H
-
-        # Se a largura não cobrir 1080, escala pelo eixo X
-        if bg_w < TARGET_W:
-            bg_ratio = TARGET_W / orig_w
-            bg_w = TARGET_W
-            bg_h = int(orig_h * bg_ratio)
-
-        bg = img.resize((bg_w, bg_h), Image.LANCZOS)
-
-        # Centraliza o recorte do fundo (caso seja maior que o canvas)
-        crop_x = (bg_w - TARGET_W) // 2
-        crop_y = (bg_h - TARGET_H) // 2
-        bg = bg.crop((crop_x, crop_y, crop_x + TARGET_W, crop_y + TARGET_H))
-
-        # Aplica desfoque gaussiano forte e escurece
-        bg = bg.filter(ImageFilter.GaussianBlur(radius=40))
-        bg = ImageEnhance.Brightness(bg).enhance(0.35)  # 65% mais escuro
+        bg = _blurred_cover_layer(img, fast=(settings.BLUR_BG_QUALITY != "full"))
 
         # ── CAMADA DE FRENTE (Nítida, centralizada) ────────────────────────
         # Escala para caber exatamente na largura de 1080px
@@ -293,18 +426,17 @@ def make_blurred_background(img_path: str) -> Optional[str]:
 
 
 # =============================================================================
-# PASSO B — LEGENDAS WORD-LEVEL VIA FASTER-WHISPER
+# PASSO B — LEGENDAS WORD-LEVEL (TIMINGS DO TTS / FASTER-WHISPER)
 # =============================================================================
 
-def generate_word_level_clips(
-    audio_path: str,
+def group_words(
+    all_words: List[dict],
     words_per_group: int = 3,
-    font_path: Optional[str] = None,
     video_duration: Optional[float] = None
-) -> List:
+) -> List[dict]:
     """
-    Usa faster-whisper para extrair timestamps por palavra e cria TextClips
-    sincronizados com o áudio — efeito "karaokê TikTok".
+    Agrupa palavras {"word", "start", "end"} em blocos de legenda —
+    efeito "karaokê TikTok".
 
     ALGORITMO DE AGRUPAMENTO:
     ─────────────────────────
@@ -316,38 +448,74 @@ def generate_word_level_clips(
     Ex: ["Messi", "marcou", "um", "gol", "incrível", "hoje"]
     → Grupo 1: "Messi marcou um" (start=0.2, end=1.1)
     → Grupo 2: "gol incrível hoje" (start=1.2, end=2.5)
+    """
+    groups = []
+    for i in range(0, len(all_words), words_per_group):
+        chunk = all_words[i : i + words_per_group]
+        group_text = " ".join(w["word"] for w in chunk).upper()
+        group_start = chunk[0]["start"]
+        group_end = chunk[-1]["end"]
+
+        # Sanitiza: garante que timestamps estão dentro da duração do vídeo
+        if video_duration:
+            group_end = min(group_end, video_duration - 0.1)
+        if group_start >= group_end:
+            continue
+
+        groups.append({
+            "text": group_text,
+            "start": group_start,
+            "end": group_end,
+            "duration": group_end - group_start
+        })
+    return groups
+
+
+def transcribe_word_groups(
+    audio_path: str,
+    words_per_group: int = 3,
+    video_duration: Optional[float] = None,
+    script_text: Optional[str] = None
+) -> List[dict]:
+    """
+    Extrai timestamps por palavra e agrupa em blocos de legenda (group_words).
 
-    Cada grupo vira um TextClip com:
-    - Fonte: Montserrat-Black 72px
-    - Cor: Amarelo #FFDD00 (cor da marca Futebas)
-    - Borda stroke preta (5px) para legibilidade em qualquer fundo
-    - Posição: 75% da altura (safe zone, abaixo do logo do canal)
+    Ordem das fontes:
+    1. Sidecar {job_id}.words.json do edge-tts (WordBoundary) — gratuito,
+       gerado junto com a narração pelo AudioService.
+    2. Alinhamento forçado do `script_text` conhecido com o áudio
+       (app/services/alignment.py) — grafia exata do roteiro, sem ASR.
+    3. faster-whisper (servidor residente) — só quando não há roteiro ou
+       o alinhamento não tem confiança (áudio externo, roteiro divergente).
 
     Fallback: se faster-whisper falhar, retorna [] e o vídeo é gerado
     sem legendas (nunca trava a execução).
 
-    Args:
-        audio_path: Path do arquivo .mp3/.wav da narração.
-        words_per_group: Número de palavras por bloco de legenda.
-        font_path: Path da fonte .ttf a usar.
-        video_duration: Duração total do vídeo (para sanitizar timestamps).
-
     Returns:
-        Lista de TextClip prontos para CompositeVideoClip.
+        Lista de dicts {"text", "start", "end", "duration"} (independente
+        do backend de render).
     """
-    clips = []
-    if not font_path:
-        font_path = get_montserrat_black()
-
+    tts_words = load_word_timings(audio_path)
+    if tts_words:
+        all_words = [w for w in tts_words if w["word"].strip()]
+        logger.info("[Legendas] %d timings do TTS (WordBoundary) — Whisper dispensado.", len(all_words))
+        groups = group_words(all_words, words_per_group, video_duration)
+        logger.info("[Legendas] %d grupos de legendas criados.", len(groups))
+        return groups
+
+    if script_text and settings.SUBTITLE_FORCED_ALIGNMENT:
+        aligned = align_script(audio_path, script_text)
+        if aligned:
+            groups = group_words(aligned, words_per_group, video_duration)
+            logger.info("[Legendas] %d grupos criados por alinhamento forçado — Whisper dispensado.", len(groups))
+            return groups
+
+    groups = []
     try:
-        from faster_whisper import WhisperModel
-
         logger.info("[Whisper] Transcrevendo áudio para timestamps word-level...")
-        # Usa modelo tiny — leve, rápido e suficiente para PT-BR curto
-        # compute_type="int8" minimiza uso de RAM no container
-        model = WhisperModel("tiny", device="cpu", compute_type="int8")
-
-        segments, info = model.transcribe(
+        # Modelo residente compartilhado (app/services/transcription.py):
+        # carregado uma vez por host, tamanho/compute_type via settings
+        result = transcribe(
             audio_path,
             language="pt",
             word_timestamps=True,   # ← chave para legendas sincronizadas
@@ -355,20 +523,19 @@ def generate_word_level_clips(
             beam_size=1             # Velocidade > precisão para vídeos curtos
         )
         logger.info("[Whisper] Idioma detectado: %s (confiança %.0f%%)",
-                    info.language, info.language_probability * 100)
+                    result["language"], result["language_probability"] * 100)
 
         # ── Coleta todas as palavras com seus timestamps ──────────────────
         all_words = []
-        for segment in segments:
-            if hasattr(segment, "words") and segment.words:
-                for word_obj in segment.words:
-                    text = word_obj.word.strip()
-                    if text:
-                        all_words.append({
-                            "word": text,
-                            "start": word_obj.start,
-                            "end": word_obj.end
-                        })
+        for segment in result["segments"]:
+            for word_obj in segment["words"]:
+                text = word_obj["word"].strip()
+                if text:
+                    all_words.append({
+                        "word": text,
+                        "start": word_obj["start"],
+                        "end": word_obj["end"]
+                    })
 
         if not all_words:
             logger.warning("[Whisper] Nenhuma palavra extraída — sem legendas.")
@@ -378,75 +545,123 @@ def generate_word_level_clips(
                     len(all_words), words_per_group)
 
         # ── Agrupa as palavras em blocos de N palavras ────────────────────
-        groups = []
-        for i in range(0, len(all_words), words_per_group):
-            chunk = all_words[i : i + words_per_group]
-            group_text = " ".join(w["word"] for w in chunk).upper()
-            group_start = chunk[0]["start"]
-            group_end = chunk[-1]["end"]
-
-            # Sanitiza: garante que timestamps estão dentro da duração do vídeo
-            if video_duration:
-                group_end = min(group_end, video_duration - 0.1)
-            if group_start >= group_end:
-                continue
-
-            groups.append({
-                "text": group_text,
-                "start": group_start,
-                "end": group_end,
-                "duration": group_end - group_start
-            })
+        groups = group_words(all_words, words_per_group, video_duration)
 
         logger.info("[Whisper] %d grupos de legendas criados.", len(groups))
 
-        # ── Cria TextClips para cada grupo ───────────────────────────────
-        for group in groups:
-            try:
-                txt_clip = (
-                    TextClip(
-                        group["text"],
-                        font=font_path,
-                        fontsize=72,
-                        color="#FFDD00",          # Amarelo da marca Futebas
-                        stroke_color="black",
-                        stroke_width=5,           # Borda preta grossa para legibilidade
-                        method="caption",
-                        size=(int(TARGET_W * 0.88), None),  # 88% da largura → margens laterais
-                        align="center"
-                    )
-                    .set_start(group["start"])
-                    .set_duration(group["duration"])
-                    .set_position(("center", 0.75), relative=True)  # Safe zone inferior
-                )
-                clips.append(txt_clip)
-            except Exception as e:
-                logger.warning("[Whisper] Erro ao criar TextClip '%s': %s", group["text"], e)
-
-        logger.info("[Whisper] %d TextClips de legenda renderizados.", len(clips))
-
     except ImportError:
         logger.error("[Whisper] faster-whisper não instalado — sem legendas word-level.")
     except Exception as e:
         logger.error("[Whisper] Falha na transcrição (fallback: sem legendas): %s", e)
 
+    return groups
+
+
+def subtitle_style(font_path: Optional[str] = None) -> SubtitleStyle:
+    """
+    Estilo da marca para as legendas word-level:
+    - Fonte: Montserrat-Black 72px
+    - Cor: Amarelo #FFDD00 (cor da marca Futebas)
+    - Borda stroke preta (5px) para legibilidade em qualquer fundo
+    - Largura máxima 88% (margens laterais), topo em 75% da altura
+      (safe zone, abaixo do logo do canal)
+    """
+    return SubtitleStyle(font_path=font_path or get_montserrat_black())
+
+
+def _build_textclip_subtitles(groups: List[dict], font_path: str) -> List:
+    """Caminho legado: um TextClip (ImageMagick) por grupo de legenda."""
+    clips = []
+    for group in groups:
+        try:
+            txt_clip = (
+                TextClip(
+                    group["text"],
+                    font=font_path,
+                    fontsize=72,
+                    color="#FFDD00",          # Amarelo da marca Futebas
+                    stroke_color="black",
+                    stroke_width=5,           # Borda preta grossa para legibilidade
+                    method="caption",
+                    size=(int(TARGET_W * 0.88), None),  # 88% da largura → margens laterais
+                    align="center"
+                )
+                .set_start(group["start"])
+                .set_duration(group["duration"])
+                .set_position(("center", 0.75), relative=True)  # Safe zone inferior
+            )
+            clips.append(txt_clip)
+        except Exception as e:
+            logger.warning("[Whisper] Erro ao criar TextClip '%s': %s", group["text"], e)
+    return clips
+
+
+def build_subtitle_clips(groups: List[dict], font_path: Optional[str] = None) -> List:
+    """
+    Cria um clip por grupo de legenda com o estilo da marca (subtitle_style).
+
+    Com SUBTITLE_RENDERER="atlas" (padrão) usa o atlas de glifos Pillow
+    (app/services/subtitle_renderer.py) — sem processos do ImageMagick.
+    Com "textclip" ou se o atlas falhar, usa TextClip(method="caption").
+    """
+    if not font_path:
+        font_path = get_montserrat_black()
+
+    clips = []
+    if settings.SUBTITLE_RENDERER == "atlas":
+        try:
+            clips = subtitle_image_clips(groups, subtitle_style(font_path), (TARGET_W, TARGET_H))
+        except Exception as e:
+            logger.warning("[Subtitles] Atlas falhou, usando TextClip: %s", e)
+    if not clips:
+        clips = _build_textclip_subtitles(groups, font_path)
+
+    logger.info("[Whisper] %d clips de legenda renderizados.", len(clips))
     return clips
 
 
+def generate_word_level_clips(
+    audio_path: str,
+    words_per_group: int = 3,
+    font_path: Optional[str] = None,
+    video_duration: Optional[float] = None,
+    script_text: Optional[str] = None
+) -> List:
+    """
+    Atalho compatível: transcreve (transcribe_word_groups) e devolve os
+    TextClips prontos para CompositeVideoClip (build_subtitle_clips).
+    Com `script_text`, alinha o roteiro em vez de transcrever texto livre.
+    """
+    groups = transcribe_word_groups(audio_path, words_per_group, video_duration, script_text)
+    return build_subtitle_clips(groups, font_path) if groups else []
+
+
 # =============================================================================
 # HELPERS DE DOWNLOAD E PROCESSAMENTO
 # =============================================================================
 
-def download_file(url: str, ext: str = "jpg") -> Optional[str]:
-    """Baixa um arquivo (imagem/áudio) via requests com timeout e UA."""
+_DOWNLOAD_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
+    )
+}
+
+
+def download_file(url: str, ext: str = "jpg", timeout: float = 15) -> Optional[str]:
+    """
+    Baixa um arquivo (imagem/áudio) via requests com timeout e UA.
+
+    Passa pelo cache de mídia (app/services/media_cache.py): o mesmo
+    asset usado em vários jobs vira um hardlink local, sem rede.
+    """
     try:
-        headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
-            )
-        }
-        response = requests.get(url, headers=headers, timeout=15)
+        cache = get_media_cache()
+        if cache:
+            return cache.fetch(url, TEMP_DIR, ext=ext, headers=_DOWNLOAD_HEADERS,
+                               timeout=timeout, min_bytes=1024)
+
+        response = requests.get(url, headers=_DOWNLOAD_HEADERS, timeout=timeout)
         if response.status_code == 200 and len(response.content) > 1024:
             filename = f"asset_{uuid.uuid4().hex}.{ext}"
             filepath = os.path.join(TEMP_DIR, filename)
@@ -458,8 +673,7 @@ def download_file(url: str, ext: str = "jpg") -> Optional[str]:
     return None
 
 
-def download_video_clip(url: str) -> Optional[str]:
-    """Baixa vídeo com yt-dlp (suporta YouTube, Reddit, Twitter, etc.)."""
+def _download_video_clip_direct(url: str, socket_timeout: float = 20) -> Optional[str]:
     video_id = uuid.uuid4().hex[:8]
     template = os.path.join(TEMP_DIR, f"vid_{video_id}.%(ext)s")
     ydl_opts = {
@@ -469,7 +683,7 @@ def download_video_clip(url: str) -> Optional[str]:
         "no_warnings": True,
         "noplaylist": True,
         "duration_limit": 90,
-        "socket_timeout": 20,
+        "socket_timeout": socket_timeout,
         "retries": 3,
     }
     try:
@@ -481,9 +695,22 @@ def download_video_clip(url: str) -> Optional[str]:
     return None
 
 
-def fetch_google_images(query: str, limit: int = 3) -> List[str]:
-    """Busca imagens no Google via Serper → CSE → Brave (cascata)."""
-    assets = []
+def download_video_clip(url: str, socket_timeout: float = 20) -> Optional[str]:
+    """Baixa vídeo com yt-dlp (suporta YouTube, Reddit, Twitter, etc.), via cache de mídia."""
+    cache = get_media_cache()
+    if cache:
+        try:
+            return cache.fetch_with(
+                url, lambda u: _download_video_clip_direct(u, socket_timeout), TEMP_DIR, prefix="vid"
+            )
+        except Exception as e:
+            logger.warning("[Download] Cache indisponível para '%s': %s", url, e)
+    return _download_video_clip_direct(url, socket_timeout)
+
+
+def search_google_image_urls(query: str, limit: int = 3) -> List[str]:
+    """Busca URLs de imagens no Google via Serper → Brave (cascata), sem baixar."""
+    urls = []
 
     # 1. Serper Dev
     if settings.SERPER_API_KEY:
@@ -494,17 +721,12 @@ def fetch_google_images(query: str, limit: int = 3) -> List[str]:
                 data=json.dumps({"q": query, "num": limit}),
                 timeout=10
             )
-            for img in r.json().get("images", []):
-                path = download_file(img.get("imageUrl", ""), ext="jpg")
-                if path:
-                    assets.append(path)
-                if len(assets) >= limit:
-                    return assets
+            urls = [img.get("imageUrl", "") for img in r.json().get("images", [])]
         except Exception as e:
             logger.warning("[Serper] %s", e)
 
     # 2. Brave Fallback
-    if not assets and settings.BRAVE_API_KEY:
+    if not urls and settings.BRAVE_API_KEY:
         try:
             r = requests.get(
                 "https://api.search.brave.com/res/v1/images/search",
@@ -512,26 +734,26 @@ def fetch_google_images(query: str, limit: int = 3) -> List[str]:
                 params={"q": query, "count": limit},
                 timeout=10
             )
-            for res in r.json().get("results", []):
-                url = res.get("properties", {}).get("url") or res.get("url", "")
-                path = download_file(url, ext="jpg")
-                if path:
-                    assets.append(path)
-                if len(assets) >= limit:
-                    return assets
+            urls = [
+                res.get("properties", {}).get("url") or res.get("url", "")
+                for res in r.json().get("results", [])
+            ]
         except Exception as e:
             logger.warning("[Brave] %s", e)
 
-    return assets
+    return [u for u in urls if u]
 
 
-def fetch_external_assets(query: str, limit: int = 3) -> List[str]:
-    """Pánico Search: Google Images → Pexels → Pixabay."""
-    all_assets = []
+def search_external_asset_urls(query: str, limit: int = 3) -> List[Tuple[str, str]]:
+    """
+    Pánico Search (só a busca): Google Images → Pexels → Pixabay.
 
-    all_assets.extend(fetch_google_images(query, limit))
-    if len(all_assets) >= limit:
-        return all_assets
+    Returns:
+        Lista de (url, ext) em ordem de prioridade.
+    """
+    candidates = [(u, "jpg") for u in search_google_image_urls(query, limit)]
+    if len(candidates) >= limit:
+        return candidates
 
     if settings.PEXELS_API_KEY:
         try:
@@ -546,26 +768,173 @@ def fetch_external_assets(query: str, limit: int = 3) -> List[str]:
                     key=lambda x: x["width"]
                 )
                 if files:
-                    path = download_file(files[-1]["link"], ext="mp4")
-                    if path:
-                        all_assets.append(path)
+                    candidates.append((files[-1]["link"], "mp4"))
         except Exception as e:
             logger.warning("[Pexels] %s", e)
 
-    if len(all_assets) < limit and settings.PIXABAY_API_KEY:
+    if len(candidates) < limit and settings.PIXABAY_API_KEY:
         try:
             r = requests.get(
                 f"https://pixabay.com/api/?key={settings.PIXABAY_API_KEY}&q={query}&image_type=photo&per_page={limit}",
                 timeout=10
             )
             for h in r.json().get("hits", []):
-                path = download_file(h.get("largeImageURL", ""), ext="jpg")
-                if path:
-                    all_assets.append(path)
+                if h.get("largeImageURL"):
+                    candidates.append((h["largeImageURL"], "jpg"))
         except Exception as e:
             logger.warning("[Pixabay] %s", e)
 
-    return all_assets
+    return candidates
+
+
+def fetch_google_images(query: str, limit: int = 3) -> List[str]:
+    """Busca imagens no Google via Serper → Brave (cascata) e baixa em série."""
+    paths = (download_file(url, ext="jpg") for url in search_google_image_urls(query, limit))
+    return [p for p in paths if p][:limit]
+
+
+def fetch_external_assets(query: str, limit: int = 3) -> List[str]:
+    """Pánico Search: Google Images → Pexels → Pixabay (download em série)."""
+    paths = (download_file(url, ext=ext) for url, ext in search_external_asset_urls(query, limit))
+    return [p for p in paths if p]
+
+
+# =============================================================================
+# AQUISIÇÃO CONCORRENTE DE ASSETS
+# =============================================================================
+
+# Coverage "otimista" abaixo de total × margem → busca de pânico especulativa
+PANIC_SPECULATIVE_MARGIN = 1.5
+
+
+def _acquire_image(run: AcquisitionRun, url: str, ext: str = "jpg") -> Optional[dict]:
+    """Download (limitado ao deadline) + BlurBG/Watermark → segmento de imagem."""
+    raw_path = download_file(url, ext=ext, timeout=min(15, max(1.0, run.remaining())))
+    if not raw_path:
+        return None
+    blurred_path = prepare_image_asset(raw_path)
+    return make_image_segment(blurred_path, duration=4.0) if blurred_path else None
+
+
+def _acquire_highlight(run: AcquisitionRun, url: str) -> Optional[dict]:
+    """yt-dlp + recorte de 5s a partir de ~40% ("melhor momento"), espelhado."""
+    vid_path = download_video_clip(url, socket_timeout=min(20, max(1.0, run.remaining())))
+    if not vid_path or not os.path.exists(vid_path):
+        return None
+    return make_video_segment(vid_path, max_duration=5.0, anchor=0.4, mirror=True)
+
+
+def _acquire_panic(run: AcquisitionRun, url: str, ext: str) -> Optional[dict]:
+    """Candidato do Panic Search: vídeo de stock (mp4) ou imagem."""
+    if ext != "mp4":
+        return _acquire_image(run, url, ext)
+    path = download_file(url, ext="mp4", timeout=min(15, max(1.0, run.remaining())))
+    if not path:
+        return None
+    # Stock em 4K/1080p horizontal → trecho de 5s já em 1080x1920 (cacheado por hash)
+    mezz_path = mezzanine.prepare_stock_clip(path, "9:16", max_duration=5.0,
+                                             timeout=max(5.0, run.remaining()))
+    seg = make_video_segment(mezz_path, max_duration=5.0)
+    if seg and mezz_path != path:
+        seg["prescaled"] = True
+    return seg
+
+
+def acquire_assets(
+    image_urls: List[str],
+    video_urls: List[str],
+    panic_queries: List[str],
+    total_duration: float
+) -> List[dict]:
+    """
+    Etapa de aquisição: baixa imagens, highlights e resultados do Panic
+    Search concorrentemente (AcquisitionRun: deadline global, limite por
+    host, concorrência limitada).
+
+    A ordem de prioridade é a mesma do fluxo sequencial:
+        [imagem_capa, video_highlight, imagens..., panic search...]
+    O que não chegou até o deadline simplesmente fica de fora.
+
+    Returns:
+        Lista de segmentos declarativos (make_image_segment/make_video_segment).
+    """
+    run = AcquisitionRun()
+    try:
+        # ── Imagens do payload ───────────────────────────────────────────
+        image_keys = []
+        for idx, url in enumerate(image_urls[:12]):  # Limite de 12 imagens
+            # Ignora URLs de placeholder genéricas
+            if "dummyimage" in url or "placeholder" in url:
+                logger.info("[Assets] URL de placeholder ignorada: %s", url)
+                continue
+            ext = "png" if url.lower().endswith(".png") else "jpg"
+            image_keys.append(("img", idx))
+            run.submit(("img", idx), _acquire_image, run, url, ext, url=url)
+
+        # ── Highlights (máx. 3 em paralelo; na ordem do payload) ─────────
+        video_keys = []
+        for idx, url in enumerate(video_urls[:3]):
+            video_keys.append(("vid", idx))
+            run.submit(("vid", idx), _acquire_highlight, run, url, url=url)
+
+        # ── Panic Search especulativo (só as buscas; downloads depois) ───
+        optimistic = 4.0 * len(image_keys) + (5.0 if video_keys else 0.0)
+        search_keys = []
+
+        def start_searches():
+            for k, query in enumerate(panic_queries):
+                search_keys.append(("search", k))
+                run.submit(("search", k), search_external_asset_urls, query, 3)
+
+        if optimistic < total_duration * PANIC_SPECULATIVE_MARGIN:
+            start_searches()
+
+        # Só um highlight é usado, na ordem do payload: o 2º só entra se o 1º
+        # falhar (ou não chegar até o deadline); os de menor prioridade são cancelados
+        winner = run.wait_first(video_keys)
+        run.wait_for(image_keys)
+        found = run.results(image_keys)
+
+        assets = []
+        images = [found[k] for k in image_keys if k in found]
+        highlight = run.futures[winner].result() if winner else None
+        if images:
+            assets.append(images[0])  # Capa (1ª imagem)
+        if highlight:
+            assets.append(highlight)
+            logger.info("[Highlight] Vídeo processado: %s", os.path.basename(highlight["path"]))
+        assets.extend(images[1:])
+        logger.info("[Assets] %d imagens aceitas após filtragem, highlight: %s.",
+                    len(images), "sim" if highlight else "não")
+
+        # ── Panic Search (cobertura insuficiente) ────────────────────────
+        coverage = sum(a["duration"] for a in assets)
+        if coverage < total_duration and panic_queries:
+            logger.info("[PanicSearch] Faltam %.1fs de cobertura visual.", total_duration - coverage)
+            if not search_keys:
+                start_searches()
+            run.wait_for(search_keys)
+            searches = run.results(search_keys)
+
+            panic_keys = []
+            for skey in search_keys:
+                for j, (url, ext) in enumerate(searches.get(skey, [])):
+                    key = ("panic", skey[1], j)
+                    panic_keys.append(key)
+                    run.submit(key, _acquire_panic, run, url, ext, url=url)
+
+            run.wait_for(panic_keys)
+            panic_found = run.results(panic_keys)
+            for key in panic_keys:
+                if coverage >= total_duration:
+                    break
+                if key in panic_found:
+                    assets.append(panic_found[key])
+                    coverage += panic_found[key]["duration"]
+
+        return assets
+    finally:
+        run.close()
 
 
 # =============================================================================
@@ -592,11 +961,19 @@ def apply_copyright_protection(clip):
     return clip
 
 
-def _write_videofile_with_fallback(video, output_path: str):
+def _write_videofile_with_fallback(video, output_path: str, preview: bool = False):
     """
     Render: tenta NVENC (GPU) primeiro, fallback automático para libx264 (CPU).
     O ultrafast preset é necessário para CPU — velocidade > qualidade perfeita.
+    Preview: direto em libx264 ultrafast, PREVIEW_FPS e CRF alto.
     """
+    if preview:
+        video.write_videofile(
+            output_path, fps=settings.PREVIEW_FPS, codec="libx264", audio_codec="aac",
+            threads=4, preset="ultrafast", ffmpeg_params=["-crf", "32", "-pix_fmt", "yuv420p"],
+        )
+        logger.info("[Render] Preview finalizado com libx264 (CPU).")
+        return
     try:
         logger.info("[Render] Tentando NVENC (GPU)...")
         video.write_videofile(
@@ -642,340 +1019,872 @@ def create_stinger(duration: float = 0.6) -> Optional:
 # PASSO A — PROCESSAMENTO DE IMAGEM PARA O TIMELINE
 # =============================================================================
 
-def process_image_asset(img_path: str, duration: float = 4.0) -> Optional[ImageClip]:
+# Parâmetros das derivações em cache (derived_cache). Mudou o algoritmo de
+# watermark/BlurBG? Incremente "v" para invalidar os resultados antigos.
+WATERMARK_CACHE_PARAMS = {"v": 2, "band": WATERMARK_BAND, "bright": WATERMARK_BRIGHT_LEVEL,
+                          "width": WATERMARK_BAND_WIDTH}
+BLUR_BG_CACHE_PARAMS = {"v": 1, "radius": 40, "brightness": 0.35, "quality": 90}
+
+
+def blur_bg_cache_params() -> dict:
+    """Parâmetros do BlurBG incluindo o modo de qualidade ativo (fast/full)."""
+    params = dict(BLUR_BG_CACHE_PARAMS, mode=settings.BLUR_BG_QUALITY)
+    if settings.BLUR_BG_QUALITY != "full":
+        params["downscale"] = settings.BLUR_BG_DOWNSCALE
+    return params
+
+
+def prepare_image_asset(img_path: str) -> Optional[str]:
     """
-    Pipeline completo de processamento de um asset de imagem:
+    Passos 1-2 do pipeline de imagem (independentes do backend de render):
     1. Detecta e rejeita watermarks de stock.
     2. Aplica Blurred Background Padding.
-    3. Adiciona Ken Burns (zoom suave).
-    4. Retorna um ImageClip pronto para o timeline.
+
+    Os dois resultados são cacheados por conteúdo de origem (derived_cache):
+    imagens repetidas entre jobs pulam todo o trabalho do Pillow.
 
     Returns:
-        ImageClip pronto, ou None se a imagem for rejeitada.
+        Path do frame 1080x1920 pronto, ou None se a imagem for rejeitada.
     """
-    # Passo 1: Detecção de Watermark de Stock
-    if detect_stock_watermark(img_path):
+    cache = get_derived_cache()
+    src_sha = source_hash(img_path) if cache else None
+
+    # Passo 1: Detecção de Watermark de Stock (o SCORE vai para o cache;
+    # o veredito usa o WATERMARK_THRESHOLD atual)
+    score = None
+    if src_sha:
+        wm_key = derived_key(src_sha, "watermark_score", WATERMARK_CACHE_PARAMS)
+        score = cache.get_value(wm_key)
+    if score is None:
+        try:
+            score = watermark_score(img_path)
+            if src_sha:
+                cache.put_value(wm_key, "watermark_score", score)
+        except Exception as e:
+            logger.warning("[WatermarkDetect] Erro ao checar '%s': %s", img_path, e)
+    if score is not None and detect_stock_watermark(img_path, score=score):
         logger.info("[AssetProc] Imagem rejeitada por watermark: %s", os.path.basename(img_path))
         return None
 
     # Passo 2: Blurred Background Padding
+    if src_sha:
+        blur_key = derived_key(src_sha, "blur_bg", blur_bg_cache_params(), (TARGET_W, TARGET_H))
+        cached_path = cache.get_file(blur_key, TEMP_DIR, prefix="blur_bg")
+        if cached_path:
+            logger.info("[BlurBG] Cache hit: %s", os.path.basename(img_path))
+            return cached_path
+
     blurred_path = make_blurred_background(img_path)
+    if blurred_path and src_sha:
+        try:
+            cache.put_file(blur_key, "blur_bg", blurred_path)
+        except OSError as e:
+            logger.warning("[BlurBG] Falha ao gravar no cache: %s", e)
     if not blurred_path:
         # Fallback seguro: usa a imagem original sem distorção
         logger.warning("[AssetProc] BlurBG falhou, usando imagem sem padding: %s", img_path)
         blurred_path = img_path
+    return blurred_path
 
-    # Passo 3: Cria o clip
+
+def image_segment_clip(blurred_path: str, duration: float = 4.0,
+                       zoom_ratio: float = 0.06) -> Optional[ImageClip]:
+    """Passos 3-4: cria o ImageClip 1080x1920 com Ken Burns."""
     try:
-        clip = ImageClip(blurred_path).set_duration(duration).set_fps(24)
+        clip = ImageClip(blurred_path).set_duration(duration).set_fps(TARGET_FPS)
 
         # Garante que o clip tem exatamente 1080x1920 (segurança extra)
         if clip.size != (TARGET_W, TARGET_H):
             clip = clip.resize((TARGET_W, TARGET_H))
 
-        # Passo 4: Ken Burns (zoom 8% ao longo da duração)
-        clip = apply_ken_burns(clip, duration, zoom_ratio=0.06)
+        # Passo 4: Ken Burns (zoom suave ao longo da duração)
+        if zoom_ratio:
+            clip = apply_ken_burns(clip, duration, zoom_ratio=zoom_ratio)
         return clip
     except Exception as e:
         logger.error("[AssetProc] Erro ao criar ImageClip: %s", e)
         return None
 
 
+def process_image_asset(img_path: str, duration: float = 4.0) -> Optional[ImageClip]:
+    """
+    Pipeline completo de processamento de um asset de imagem:
+    1. Detecta e rejeita watermarks de stock.
+    2. Aplica Blurred Background Padding.
+    3. Adiciona Ken Burns (zoom suave).
+    4. Retorna um ImageClip pronto para o timeline.
+
+    Returns:
+        ImageClip pronto, ou None se a imagem for rejeitada.
+    """
+    blurred_path = prepare_image_asset(img_path)
+    if not blurred_path:
+        return None
+    return image_segment_clip(blurred_path, duration)
+
+
 # =============================================================================
-# FUNÇÃO PRINCIPAL: generate_video()
+# TIMELINE — SEGMENTOS DECLARATIVOS (compartilhados pelos backends de render)
 # =============================================================================
 
-def generate_video(job_id: str, payload: dict):
+def make_image_segment(blurred_path: str, duration: float = 4.0) -> dict:
+    """Segmento de imagem já processada (BlurBG) com Ken Burns de 6%."""
+    return {"type": "image", "path": blurred_path, "duration": duration, "ken_burns": 0.06}
+
+
+def make_video_segment(
+    vid_path: str,
+    max_duration: float = 5.0,
+    anchor: float = 0.0,
+    mirror: bool = False
+) -> Optional[dict]:
     """
-    Motor principal de renderização.
+    Segmento de vídeo recortado em até `max_duration` segundos.
 
-    Fluxo:
-        0. Geração de áudio (edge-tts via AudioService)
-        1. Download e filtragem de imagens (com BlurBG e WatermarkDetect)
-        2. Download de vídeos highlight
-        3. Panic Search (se cobertura insuficiente)
-        4. Montagem do timeline com crossfade entre clipes
-        5. Mixagem de áudio (narração + trilha)
-        6. Legendas word-level (Whisper)
-        7. Branding (logo do canal)
-        8. Render final (NVENC → libx264)
-        9. Atualização do banco de dados
+    anchor: posição relativa do centro do recorte (0.4 = "melhor momento"
+    dos highlights, 0.0 = início do clipe para stock do Pexels).
+    mirror: espelhamento horizontal (proteção de copyright).
     """
-    conn = get_db_connection()
-    try:
-        logger.info("[JobStart] Iniciando job: %s", job_id)
+    duration = ffmpeg_render.probe_duration(vid_path)
+    if duration is None:
+        try:
+            probe = VideoFileClip(vid_path)
+            duration = probe.duration
+            probe.close()
+        except Exception as e:
+            logger.warning("[Timeline] Vídeo ilegível '%s': %s", os.path.basename(vid_path), e)
+            return None
+
+    start = 0.0
+    if duration > max_duration:
+        start = max(0, duration * anchor - max_duration / 2)
+        start = min(start, duration - max_duration)
+        duration = max_duration
+
+    return {"type": "video", "path": vid_path, "start": start,
+            "duration": duration, "mirror": mirror}
+
+
+def _cover_crop(clip):
+    """Resize "cover" + crop central para 1080x1920 (sem esticar)."""
+    if clip.w / clip.h > TARGET_W / TARGET_H:
+        clip = clip.resize(height=TARGET_H)
+    else:
+        clip = clip.resize(width=TARGET_W)
+    return clip.crop(width=TARGET_W, height=TARGET_H,
+                     x_center=clip.w / 2, y_center=clip.h / 2)
+
+
+def build_segment_clip(seg: dict):
+    """Converte um segmento declarativo do timeline em clip MoviePy."""
+    kind = seg["type"]
+    duration = seg["duration"]
+
+    if kind == "image":
+        return image_segment_clip(seg["path"], duration, seg.get("ken_burns", 0.06))
+
+    if kind == "video":
+        clip = VideoFileClip(seg["path"]).without_audio()
+        if seg.get("mirror"):
+            clip = apply_copyright_protection(clip)
+        start = seg.get("start", 0.0)
+        if clip.duration > duration:
+            clip = clip.subclip(start, start + duration)
+        return clip if seg.get("prescaled") else _cover_crop(clip)
+
+    if kind == "loop":
+        try:
+            clip = VideoFileClip(seg["path"]).without_audio()
+            if not seg.get("prescaled"):
+                clip = _cover_crop(clip)
+            return clip.loop(duration=duration)
+        except Exception as e:
+            logger.warning("[Fallback] Loop ilegível, usando cor sólida: %s", e)
 
-        # ── 0. PARSE DO PAYLOAD ──────────────────────────────────────────
-        title = payload.get("title", "Notícia de Futebol")
+    return ColorClip(size=(TARGET_W, TARGET_H),
+                     color=tuple(seg.get("color", (10, 10, 10))), duration=duration)
 
-        script = payload.get("script", "")
-        if isinstance(script, dict):
-            script_text = " ".join(
-                b.get("text", "") for b in script.get("blocks", [])
-            ) or str(script)
-            search_terms = script.get("search_terms", [])
-        else:
-            script_text = script
-            search_terms = []
 
-        assets = payload.get("assets", {})
-        video_type = payload.get("type", "Noticia")
+def resolve_render_backend(payload: dict) -> str:
+    """Backend de render do job: config.render_backend > settings.RENDER_BACKEND."""
+    backend = ((payload.get("config") or {}).get("render_backend")
+               or settings.RENDER_BACKEND or "moviepy").lower()
+    if backend not in RENDER_BACKENDS:
+        logger.warning("[Render] Backend desconhecido '%s', usando moviepy.", backend)
+        return "moviepy"
+    return backend
 
-        # Mood: determina a pasta de música
-        mood_map = {"Highlight": "Epic", "Gol": "Rock", "Noticia": "Happy", "Analise": "Sad"}
-        mood = mood_map.get(video_type, "Epic")
 
-        logger.info("[Parse] Título: '%s' | Tipo: %s | Mood: %s", title, video_type, mood)
+def is_preview(payload: dict) -> bool:
+    """Job de preview (config.preview): render reduzido para revisão editorial."""
+    return bool((payload.get("config") or {}).get("preview"))
 
-        # ── 0. GERAÇÃO DE ÁUDIO ──────────────────────────────────────────
-        audio_path = os.path.join(AUDIO_DIR, f"{job_id}.mp3")
-        if not os.path.exists(audio_path):
-            if script_text and len(script_text) > 5:
-                logger.info("[Audio] Gerando narração com edge-tts...")
-                asyncio.run(audio_service.generate(script_text, job_id))
 
-        if not os.path.exists(audio_path):
-            raise RuntimeError("Falha crítica: áudio não gerado ou script vazio.")
+def preview_size() -> Tuple[int, int]:
+    """Resolução do preview (PREVIEW_SCALE de 1080x1920, dimensões pares)."""
+    return (int(TARGET_W * settings.PREVIEW_SCALE) // 2 * 2,
+            int(TARGET_H * settings.PREVIEW_SCALE) // 2 * 2)
 
-        main_audio = AudioFileClip(audio_path)
-        total_duration = main_audio.duration + 1.5  # Buffer de fim
-        logger.info("[Audio] Duração da narração: %.2fs | Total do vídeo: %.2fs",
-                    main_audio.duration, total_duration)
 
-        # ── 1. DOWNLOAD E FILTRAGEM DE IMAGENS ──────────────────────────
-        raw_images = assets.get("all_images", [])
-        logger.info("[Assets] Processando %d imagens do payload...", len(raw_images))
+# Saídas extras (config.outputs): aspecto → resolução do topo da escada
+OUTPUT_ASPECTS = {"9:16": (TARGET_W, TARGET_H), "16:9": (TARGET_H, TARGET_W)}
 
-        image_clips = []
-        for url in raw_images[:12]:  # Limite de 12 imagens para não travar
-            # Ignora URLs de placeholder genéricas
-            if "dummyimage" in url or "placeholder" in url:
-                logger.info("[Assets] URL de placeholder ignorada: %s", url)
-                continue
 
-            ext = "png" if url.lower().endswith(".png") else "jpg"
-            raw_path = download_file(url, ext=ext)
-            if not raw_path:
-                continue
+def output_targets(job_id: str, payload: dict) -> List[dict]:
+    """
+    Saídas extras do job (config.outputs) com paths resolvidos, no formato
+    de ffmpeg_render.build_output_branches. Cada alvo:
+      {"name": "youtube", "aspect": "16:9",
+       "ladder": [{"height": 1080, "kbps": 6000}, {"height": 720, "kbps": 3000}],
+       "posters": [1.5, 8.0]}
+    Escada vazia → uma saída na resolução do aspecto, com o perfil padrão.
+    Preview não gera saídas extras (só o promote).
+    """
+    if is_preview(payload):
+        return []
+    outputs = []
+    for i, target in enumerate((payload.get("config") or {}).get("outputs") or []):
+        aspect = target.get("aspect") or "9:16"
+        if aspect not in OUTPUT_ASPECTS:
+            logger.warning("[Outputs] Aspecto '%s' não suportado, saída ignorada.", aspect)
+            continue
+        base_w, base_h = OUTPUT_ASPECTS[aspect]
+        name = re.sub(r"[^A-Za-z0-9_-]", "", str(target.get("name") or "")) or f"out{i}"
+        videos = {}
+        for rung in target.get("ladder") or [{}]:
+            height = min(base_h, int(rung.get("height") or base_h)) // 2 * 2
+            width = int(round(height * base_w / base_h / 2)) * 2
+            videos[height] = {"path": os.path.join(OUTPUT_DIR, f"video_{job_id}_{name}_{height}p.mp4"),
+                              "width": width, "height": height, "kbps": rung.get("kbps")}
+        top = max(videos.values(), key=lambda v: v["height"])
+        outputs.append({
+            "name": name, "aspect": aspect, "width": top["width"], "height": top["height"],
+            "videos": sorted(videos.values(), key=lambda v: -v["height"]),
+            "posters": [{"t": float(t), "path": os.path.join(OUTPUT_DIR, f"video_{job_id}_{name}_poster{k}.jpg")}
+                        for k, t in enumerate(target.get("posters") or [])],
+        })
+    return outputs
+
+
+def _output_paths(outputs: List[dict]) -> List[str]:
+    return [f["path"] for out in outputs for f in out["videos"] + out["posters"]]
+
+
+def _preview_timeline(timeline: List[dict]) -> List[dict]:
+    """Sem Ken Burns e sem atalho "prescaled" (o mezzanine é 1080x1920)."""
+    return [dict(seg, ken_burns=0.0, prescaled=False) for seg in timeline]
 
-            clip = process_image_asset(raw_path, duration=4.0)
-            if clip:
-                image_clips.append({"type": "image", "clip": clip})
 
-        logger.info("[Assets] %d imagens aceitas após filtragem.", len(image_clips))
+# =============================================================================
+# BACKENDS DE RENDER
+# =============================================================================
 
-        # ── 2. DOWNLOAD DE VÍDEOS HIGHLIGHT ─────────────────────────────
-        video_clips = []
-        video_urls = assets.get("all_videos", [])
-        for vid_url in video_urls[:3]:  # Máximo 3 highlights
-            vid_path = download_video_clip(vid_url)
-            if vid_path and os.path.exists(vid_path):
-                try:
-                    clip = VideoFileClip(vid_path).without_audio()
-                    clip = apply_copyright_protection(clip)
-
-                    # Recorta 5 segundos do meio do vídeo (parte mais dinâmica)
-                    dur = 5.0
-                    if clip.duration > dur:
-                        # Começa a 40% do vídeo para pegar o "melhor momento"
-                        start = max(0, clip.duration * 0.4 - dur / 2)
-                        start = min(start, clip.duration - dur)
-                        clip = clip.subclip(start, start + dur)
-
-                    # Redimensiona para 9:16 sem esticar: crop central
-                    clip = (clip
-                           .resize(height=TARGET_H)
-                           .crop(width=TARGET_W, height=TARGET_H,
-                                 x_center=clip.w / 2, y_center=TARGET_H / 2))
-                    video_clips.append({"type": "video", "clip": clip})
-                    logger.info("[Highlight] Vídeo processado: %s", os.path.basename(vid_path))
-                    break  # Um highlight é suficiente para o primeiro slot
-                except Exception as e:
-                    logger.warning("[Highlight] Erro ao processar vídeo: %s", e)
-
-        # ── 3. MONTAGEM DA LISTA DE ASSETS ──────────────────────────────
-        # Intercala: [imagem_capa, video_highlight, imagem, imagem, ...]
-        downloaded_assets = []
-        if image_clips:
-            downloaded_assets.append(image_clips[0])  # Capa (1ª imagem)
-        downloaded_assets.extend(video_clips)
-        if len(image_clips) > 1:
-            downloaded_assets.extend(image_clips[1:])
-
-        # ── 3b. PANIC SEARCH (cobertura insuficiente) ───────────────────
-        current_coverage = sum(
-            4.0 if a["type"] == "image" else a["clip"].duration
-            for a in downloaded_assets
-        )
-        if current_coverage < total_duration:
-            missing = total_duration - current_coverage
-            logger.info("[PanicSearch] Faltam %.1fs de cobertura visual.", missing)
-            search_q = search_terms[:1] or [f"{title} futebol"]
-            for term in search_q + ["futebol brasil torcida", "soccer highlights"]:
-                if current_coverage >= total_duration:
-                    break
-                new_files = fetch_external_assets(term, limit=3)
-                for fpath in new_files:
-                    if fpath.endswith(".mp4"):
-                        try:
-                            c = (VideoFileClip(fpath).without_audio()
-                                 .resize(height=TARGET_H)
-                                 .crop(width=TARGET_W, height=TARGET_H,
-                                       x_center=TARGET_W / 2, y_center=TARGET_H / 2))
-                            if c.duration > 5:
-                                c = c.subclip(0, 5)
-                            downloaded_assets.append({"type": "video", "clip": c})
-                            current_coverage += c.duration
-                        except Exception:
-                            pass
-                    else:
-                        clip = process_image_asset(fpath, duration=4.0)
-                        if clip:
-                            downloaded_assets.append({"type": "image", "clip": clip})
-                            current_coverage += 4.0
-
-        # ── 4. MONTAGEM DO TIMELINE COM CROSSFADE ────────────────────────
-        stinger = create_stinger(0.6)
-        fallback_loop = get_fallback_loop()
-        visual_clips = []
-        curr_time = 0.0
-        asset_idx = 0
-
-        while curr_time < total_duration:
-            clip = None
-
-            if asset_idx < len(downloaded_assets):
-                item = downloaded_assets[asset_idx]
-                clip = item["clip"]
-                asset_idx += 1
-            else:
-                # Esgotou assets → usa loop padrão de futebol
-                if fallback_loop:
-                    rem = total_duration - curr_time
-                    try:
-                        loop_clip = (VideoFileClip(fallback_loop)
-                                     .resize(height=TARGET_H)
-                                     .crop(width=TARGET_W, height=TARGET_H,
-                                           x_center=TARGET_W / 2, y_center=TARGET_H / 2)
-                                     .without_audio()
-                                     .loop(duration=rem))
-                        clip = loop_clip
-                    except Exception:
-                        clip = ColorClip(
-                            size=(TARGET_W, TARGET_H),
-                            color=(10, 10, 10),
-                            duration=total_duration - curr_time
-                        )
-                else:
-                    clip = ColorClip(
-                        size=(TARGET_W, TARGET_H),
-                        color=(10, 10, 10),
-                        duration=total_duration - curr_time
-                    )
+def _render_with_moviepy(
+    timeline: List[dict],
+    main_audio,
+    bg_music_path: Optional[str],
+    subtitle_groups: List[dict],
+    font_path: str,
+    logo_path: Optional[str],
+    total_duration: float,
+    output_path: str,
+    preview: bool = False
+):
+    """
+    Composição frame a frame via MoviePy (backend original).
+    Preview: sem crossfade/Ken Burns, reduzido para preview_size() na escrita.
+    """
+    crossfade = 0.0 if preview else CROSSFADE_S
+    if preview:
+        timeline = _preview_timeline(timeline)
+    visual_clips = []
+    for seg in timeline:
+        clip = build_segment_clip(seg)
+        if clip is None:
+            continue
+        # Aplica crossfade em todos os clips exceto o primeiro
+        # O crossfadein(0.5) faz o clip aparecer suavemente em 0.5s
+        # eliminando o corte seco que causa queda na retenção
+        if visual_clips and crossfade:
+            clip = clip.crossfadein(crossfade)
+        visual_clips.append(clip)
+
+    if not visual_clips:
+        raise RuntimeError("Nenhum clip visual foi gerado — abortando job.")
+
+    logger.info("[Timeline] Concatenando %d clipes...", len(visual_clips))
+    video = concatenate_videoclips(visual_clips, method="compose", padding=-crossfade)
+    video = video.subclip(0, min(total_duration, video.duration))
+
+    # ── MIXAGEM DE ÁUDIO (narração + trilha sonora) ──────────────────────
+    if bg_music_path:
+        try:
+            bg_music = AudioFileClip(bg_music_path)
+
+            # Loop robusto: calcula quantas repetições são necessárias
+            # e concatena para cobrir toda a duração do vídeo.
+            # Motivo: audio_loop() pode ter bugs em versões antigas do moviepy.
+            if bg_music.duration < total_duration:
+                loops_needed = int(total_duration / bg_music.duration) + 2
+                bg_music = concatenate_audioclips([bg_music] * loops_needed)
+
+            bg_music = (bg_music
+                        .subclip(0, total_duration)
+                        .volumex(0.10)          # Ducking: 10% do volume original
+                        .audio_fadeout(2.0))    # Fade out nos últimos 2s
+
+            final_audio = CompositeAudioClip([main_audio, bg_music])
+            video = video.set_audio(final_audio)
+            logger.info("[Audio] Trilha mixada: %s @10%% volume", os.path.basename(bg_music_path))
+        except Exception as e:
+            logger.error("[Audio] Erro ao mixar trilha, usando só narração: %s", e)
+            video = video.set_audio(main_audio)
+    else:
+        video = video.set_audio(main_audio)
+
+    # ── LEGENDAS WORD-LEVEL ──────────────────────────────────────────────
+    subtitle_clips = build_subtitle_clips(subtitle_groups, font_path) if subtitle_groups else []
+    if subtitle_clips:
+        logger.info("[Subtitles] Aplicando %d clips de legenda word-level.", len(subtitle_clips))
+        video = CompositeVideoClip([video] + subtitle_clips)
+    else:
+        logger.warning("[Subtitles] Nenhuma legenda gerada — vídeo sem legenda word-level.")
+
+    # ── BRANDING (Logo do canal) ─────────────────────────────────────────
+    if logo_path:
+        try:
+            logo = (ImageClip(logo_path)
+                    .set_duration(total_duration)
+                    .resize(width=140)
+                    .set_opacity(0.88)
+                    .set_pos(("right", 48)))  # Canto superior direito
+            video = CompositeVideoClip([video, logo])
+            logger.info("[Branding] Logo aplicado do canal.")
+        except Exception as e:
+            logger.warning("[Branding] Erro ao aplicar logo: %s", e)
 
-            if clip:
-                # Aplica crossfade em todos os clips exceto o primeiro
-                # O crossfadein(0.5) faz o clip aparecer suavemente em 0.5s
-                # eliminando o corte seco que causa queda na retenção
-                if visual_clips:
-                    clip = clip.crossfadein(0.5)
+    if preview:
+        video = video.resize(newsize=preview_size())
+    logger.info("[Render] Iniciando render final → %s", output_path)
+    _write_videofile_with_fallback(video, output_path, preview=preview)
 
-                visual_clips.append(clip)
-                curr_time += clip.duration
 
-            if curr_time >= total_duration:
-                break
+def export_subtitle_overlays(subtitle_groups: List[dict], font_path: str, work_dir: str) -> List[dict]:
+    """
+    Rasteriza as legendas (mesmo estilo do MoviePy) em PNGs RGBA para o
+    backend ffmpeg, com posição absoluta e janela de exibição.
+    """
+    if settings.SUBTITLE_RENDERER == "atlas":
+        try:
+            return export_overlay_pngs(subtitle_groups, subtitle_style(font_path), (TARGET_W, TARGET_H), work_dir)
+        except Exception as e:
+            logger.warning("[Subtitles] Atlas falhou, exportando via TextClip: %s", e)
+
+    overlays = []
+    os.makedirs(work_dir, exist_ok=True)
+    for k, clip in enumerate(_build_textclip_subtitles(subtitle_groups, font_path)):
+        png_path = os.path.join(work_dir, f"sub_{k:03d}.png")
+        clip.save_frame(png_path, t=0, withmask=True)
+        overlays.append({
+            "path": png_path,
+            "x": (TARGET_W - clip.w) // 2,
+            "y": int(TARGET_H * 0.75),
+            "start": clip.start,
+            "end": clip.end,
+        })
+    return overlays
+
+
+def _render_with_ffmpeg(
+    job_id: str,
+    timeline: List[dict],
+    audio_path: str,
+    bg_music_path: Optional[str],
+    subtitle_groups: List[dict],
+    font_path: str,
+    logo_path: Optional[str],
+    total_duration: float,
+    output_path: str,
+    segmented: bool = False,
+    preview: bool = False,
+    outputs: Optional[List[dict]] = None
+) -> bool:
+    """
+    Compila o timeline em um único filter_complex do ffmpeg ou, com
+    segmented=True, renderiza os pedaços do timeline em paralelo e junta
+    com o concat demuxer (-c copy). preview=True: grafo único em
+    preview_size() @ PREVIEW_FPS, sem crossfade/Ken Burns, encoder barato.
+    outputs (output_targets): saídas extras no mesmo grafo (split).
+
+    Returns:
+        True se renderizou; False para o caller cair no backend MoviePy.
+    """
+    work_dir = os.path.join(TEMP_DIR, f"ffmpeg_{job_id}")
+    try:
+        overlays = export_subtitle_overlays(subtitle_groups, font_path, work_dir)
+        logger.info("[Render] Backend %s: %d segmentos, %d legendas → %s",
+                    "preview" if preview else "segmented" if segmented else "ffmpeg",
+                    len(timeline), len(overlays), output_path)
+        graph_kwargs = dict(
+            width=TARGET_W, height=TARGET_H, fps=TARGET_FPS,
+            crossfade=CROSSFADE_S, total_duration=total_duration,
+            narration_path=audio_path, music_path=bg_music_path,
+            subtitle_overlays=overlays, logo_path=logo_path,
+        )
+        if preview:
+            width, height = preview_size()
+            graph_kwargs.update(width=width, height=height, fps=settings.PREVIEW_FPS, crossfade=0.0,
+                                overlay_scale=width / TARGET_W)
+            ffmpeg_render.render_timeline(
+                _preview_timeline(timeline), output_path, work_dir,
+                encoder_profiles=ffmpeg_render.PREVIEW_ENCODER_PROFILES,
+                audio_args=ffmpeg_render.PREVIEW_AUDIO_ARGS, **graph_kwargs
+            )
+        elif segmented:
+            ffmpeg_render.render_timeline_segmented(
+                timeline, output_path, work_dir,
+                workers=settings.RENDER_SEGMENT_WORKERS, **graph_kwargs
+            )
+        else:
+            ffmpeg_render.render_timeline(timeline, output_path, work_dir, outputs=outputs, **graph_kwargs)
+        return True
+    except Exception as e:
+        logger.warning("[Render] Backend ffmpeg falhou (%s) — fallback para MoviePy.", e)
+        return False
 
-        if not visual_clips:
-            raise RuntimeError("Nenhum clip visual foi gerado — abortando job.")
 
-        logger.info("[Timeline] Concatenando %d clipes...", len(visual_clips))
-        video = concatenate_videoclips(visual_clips, method="compose", padding=-0.5)
-        video = video.subclip(0, min(total_duration, video.duration))
+# =============================================================================
+# ESTÁGIOS DO JOB (retomáveis — ver app/services/pipeline.py)
+# =============================================================================
 
-        # ── 5. MIXAGEM DE ÁUDIO (narração + trilha sonora) ───────────────
-        bg_music_path = get_background_music(mood)
-        if bg_music_path:
-            try:
-                bg_music = AudioFileClip(bg_music_path)
-
-                # Loop robusto: calcula quantas repetições são necessárias
-                # e concatena para cobrir toda a duração do vídeo.
-                # Motivo: audio_loop() pode ter bugs em versões antigas do moviepy.
-                if bg_music.duration < total_duration:
-                    loops_needed = int(total_duration / bg_music.duration) + 2
-                    bg_music = concatenate_audioclips([bg_music] * loops_needed)
-
-                bg_music = (bg_music
-                            .subclip(0, total_duration)
-                            .volumex(0.10)          # Ducking: 10% do volume original
-                            .audio_fadeout(2.0))    # Fade out nos últimos 2s
-
-                final_audio = CompositeAudioClip([main_audio, bg_music])
-                video = video.set_audio(final_audio)
-                logger.info("[Audio] Trilha mixada: %s @10%% volume", os.path.basename(bg_music_path))
-            except Exception as e:
-                logger.error("[Audio] Erro ao mixar trilha, usando só narração: %s", e)
-                video = video.set_audio(main_audio)
+def _stage_audio(job_id: str, script_text: str) -> dict:
+    """Narração com edge-tts (reaproveita o mp3 se já existir)."""
+    audio_path = os.path.join(AUDIO_DIR, f"{job_id}.mp3")
+    if not os.path.exists(audio_path):
+        if script_text and len(script_text) > 5:
+            logger.info("[Audio] Gerando narração com edge-tts...")
+            asyncio.run(audio_service.generate(script_text, job_id))
+
+    if not os.path.exists(audio_path):
+        raise RuntimeError("Falha crítica: áudio não gerado ou script vazio.")
+
+    narration_s = ffmpeg_render.probe_duration(audio_path)
+    if narration_s is None:
+        clip = AudioFileClip(audio_path)
+        narration_s = clip.duration
+        clip.close()
+    total_duration = narration_s + 1.5  # Buffer de fim
+    logger.info("[Audio] Duração da narração: %.2fs | Total do vídeo: %.2fs",
+                narration_s, total_duration)
+    return {"audio_path": audio_path, "narration_s": narration_s, "total_duration": total_duration}
+
+
+def choice_seed(script_text: str, mood: str) -> int:
+    """Semente das escolhas aleatórias (loop, trilha): mesmo roteiro → mesmas escolhas."""
+    return int(hashlib.sha256(f"{(script_text or '').strip()}|{mood}".encode()).hexdigest()[:12], 16)
+
+
+def _stage_timeline(segments: List[dict], total_duration: float, mood: str,
+                    seed: Optional[int] = None) -> dict:
+    """Segmentos declarativos cobrindo a narração + trilha sonora escolhida."""
+    rng = random.Random(seed)
+    fallback_loop = get_fallback_loop(rng)
+    timeline = []
+    curr_time = 0.0
+    asset_idx = 0
+
+    while curr_time < total_duration:
+        if asset_idx < len(segments):
+            seg = segments[asset_idx]
+            asset_idx += 1
         else:
-            video = video.set_audio(main_audio)
+            # Esgotou assets → usa loop padrão de futebol (ou cor sólida)
+            rem = total_duration - curr_time
+            if fallback_loop:
+                seg = {"type": "loop", "path": fallback_loop, "duration": rem,
+                       "prescaled": mezzanine.is_mezzanine(fallback_loop, "9:16")}
+            else:
+                seg = {"type": "color", "color": [10, 10, 10], "duration": rem}
 
-        # ── 6. LEGENDAS WORD-LEVEL (Whisper) ─────────────────────────────
-        font_path = get_montserrat_black()
-        subtitle_clips = generate_word_level_clips(
-            audio_path=audio_path,
-            words_per_group=3,
-            font_path=font_path,
-            video_duration=total_duration
-        )
+        timeline.append(seg)
+        curr_time += seg["duration"]
 
-        if subtitle_clips:
-            logger.info("[Subtitles] Aplicando %d clips de legenda word-level.", len(subtitle_clips))
-            video = CompositeVideoClip([video] + subtitle_clips)
-        else:
-            logger.warning("[Subtitles] Nenhuma legenda gerada — vídeo sem legenda word-level.")
+    if not timeline:
+        raise RuntimeError("Nenhum clip visual foi gerado — abortando job.")
 
-        # ── 7. BRANDING (Logo do canal) ───────────────────────────────────
-        logo_path = get_watermark_path()
-        if logo_path:
+    # A escolha (aleatória) da música fica gravada: retomar não troca a trilha
+    return {"timeline": timeline, "music_path": get_background_music(mood, min_duration=total_duration, rng=rng)}
+
+
+def _stage_mix(job_id: str, audio_path: str, music_path: Optional[str], total_duration: float) -> dict:
+    """
+    Narração + trilha mixadas em NumPy (audio_mix) num WAV único.
+    mix_path None → o render mixa como antes (AUDIO_MIX_ENABLED=false ou falha).
+    """
+    if not settings.AUDIO_MIX_ENABLED:
+        return {"mix_path": None}
+    mix_path = os.path.join(AUDIO_DIR, f"{job_id}_mix.wav")
+    try:
+        library = get_media_library()
+        bed = None
+        if music_path:
+            bed = library.music_bed(music_path) if library else None
+            if bed is None:
+                # Sem índice: decodifica e normaliza só o trecho usado
+                bed = audio_mix.decode_pcm(music_path, duration=total_duration)
+                bed *= audio_mix.gain_to(audio_mix.level_db(bed), settings.MIX_BED_DB)
+        audio_mix.mix_tracks(audio_path, bed, total_duration, mix_path)
+        logger.info("[Audio] Mixagem pronta (%s): %s", os.path.basename(music_path) if music_path else "sem trilha",
+                    os.path.basename(mix_path))
+        return {"mix_path": mix_path}
+    except Exception as e:
+        logger.error("[Audio] Erro na mixagem, o render mixa a trilha: %s", e)
+        return {"mix_path": None}
+
+
+def render_target(job_id: str, payload: dict) -> dict:
+    """
+    Formato efetivo do render do job: preview, backend, saídas extras e
+    canvas. Saídas extras forçam o backend "ffmpeg" (grafo único com split).
+    """
+    preview = is_preview(payload)
+    backend = "ffmpeg" if preview else resolve_render_backend(payload)
+    outputs = output_targets(job_id, payload)
+    if outputs and backend != "ffmpeg":
+        logger.info("[Outputs] %d saídas extras: backend %s → ffmpeg (grafo único com split).",
+                    len(outputs), backend)
+        backend = "ffmpeg"
+    width, height = preview_size() if preview else (TARGET_W, TARGET_H)
+    return {"preview": preview, "backend": backend, "outputs": outputs, "width": width, "height": height,
+            "fps": settings.PREVIEW_FPS if preview else TARGET_FPS,
+            "crossfade": 0.0 if preview else CROSSFADE_S}
+
+
+def _build_plan(target: dict, timeline: List[dict], music_path: Optional[str], mixed: bool,
+                subtitle_groups: List[dict], total_duration: float, script_text: str) -> dict:
+    return render_plan.build_plan(
+        _preview_timeline(timeline) if target["preview"] else timeline,
+        duration=total_duration, width=target["width"], height=target["height"], fps=target["fps"],
+        crossfade=target["crossfade"], backend=target["backend"], preview=target["preview"],
+        # Narração pela origem (roteiro + voz): o MP3 do TTS muda de bytes a cada síntese
+        narration={"script": hashlib.sha256((script_text or "").strip().encode()).hexdigest()[:16],
+                   "voice": audio_service.voice},
+        music_path=music_path,
+        mix=[settings.MIX_NARRATION_DB, settings.MIX_BED_DB, settings.MIX_MUSIC_DB,
+             settings.MIX_DUCK_DB] if mixed else None,
+        subtitle_groups=subtitle_groups, subtitle_renderer=settings.SUBTITLE_RENDERER,
+        logo_path=get_watermark_path(), outputs=target["outputs"],
+    )
+
+
+def _stage_plan(job_id: str, payload: dict, timeline: List[dict], music_path: Optional[str], mixed: bool,
+                subtitle_groups: List[dict], total_duration: float, script_text: str) -> dict:
+    """
+    Plano declarativo do render (render_plan) + estimativa de tempo e pico
+    de memória. Preview também estima o render completo (o que o promote
+    vai custar).
+    """
+    target = render_target(job_id, payload)
+    plan = _build_plan(target, timeline, music_path, mixed, subtitle_groups, total_duration, script_text)
+    estimate = render_plan.estimate(plan)
+    logger.info("[Plan] %d segmentos, %.1fs, %dx%d@%d (%s) → estimativa %.1fs / %.0f MB (%s, %d amostras).",
+                len(plan["tracks"]["video"]), plan["duration"], target["width"], target["height"], target["fps"],
+                target["backend"], estimate["render_s"], estimate["peak_mb"], estimate["basis"], estimate["samples"])
+    out = {"plan": plan, "plan_hash": render_plan.plan_hash(plan), "estimate": estimate}
+    if target["preview"]:
+        config = dict(payload.get("config") or {}, preview=False)
+        full = render_target(job_id, dict(payload, config=config))
+        out["estimate_full"] = render_plan.estimate(
+            _build_plan(full, timeline, music_path, mixed, subtitle_groups, total_duration, script_text))
+    return out
+
+
+def _stage_render(job_id: str, payload: dict, timeline: List[dict], audio_path: str,
+                  bg_music_path: Optional[str], subtitle_groups: List[dict],
+                  total_duration: float, plan: Optional[dict] = None) -> dict:
+    """
+    Branding + render final (ffmpeg/segmented com fallback para MoviePy).
+    Preview: sempre pelo grafo ffmpeg reduzido (MoviePy reduzido se falhar),
+    em video_{job_id}_preview.mp4 — o render completo não é sobrescrito.
+
+    Antes de renderizar consulta o cache de render (render_cache), com a
+    chave derivada do plano do estágio "plan": um job concluído com o mesmo
+    plano tem o MP4 ligado no path deste job. Renders reais registram tempo
+    e pico de memória no histórico do estimador (render_plan).
+
+    Saídas extras (config.outputs: outros aspectos, escada de bitrate,
+    poster frames) saem do mesmo grafo ffmpeg — sem cache de render e sem
+    "segmented"; se o ffmpeg falhar, o MoviePy gera só a saída principal.
+    """
+    font_path = get_montserrat_black()
+    logo_path = get_watermark_path()
+
+    target = render_target(job_id, payload)
+    preview, backend, outputs = target["preview"], target["backend"], target["outputs"]
+    output_path = os.path.join(OUTPUT_DIR, f"video_{job_id}{'_preview' if preview else ''}.mp4")
+
+    cache_info = {"key": None, "hit": False}
+    if settings.RENDER_CACHE_ENABLED and not outputs and plan:
+        cache_info["key"] = render_cache.render_key(plan)
+        hit = render_cache.find(cache_info["key"], exclude_job=job_id)
+        if hit:
+            render_cache.link(hit["video_path"], output_path)
+            logger.info("[RenderCache] Hit: job %s já renderizou este vídeo → %s (render pulado).",
+                        hit["job_id"], output_path)
+            cache_info.update(hit=True, source_job_id=hit["job_id"])
+            return {"video_path": output_path, "backend": "cache", "preview": preview,
+                    "render_cache": cache_info}
+        logger.info("[RenderCache] Miss (%s...).", cache_info["key"][:12])
+
+    # Render novo cria um arquivo novo: o path antigo pode ser hardlink de outro job
+    for path in [output_path] + _output_paths(outputs):
+        if os.path.exists(path):
+            os.remove(path)
+
+    rendered = False
+    t0 = time.monotonic()
+    with render_plan.PeakMemory() as memory:
+        if backend in ("ffmpeg", "segmented"):
+            rendered = _render_with_ffmpeg(
+                job_id, timeline, audio_path, bg_music_path, subtitle_groups,
+                font_path, logo_path, total_duration, output_path,
+                segmented=(backend == "segmented"), preview=preview, outputs=outputs
+            )
+        if not rendered:
+            backend = "moviepy"
+            main_audio = AudioFileClip(audio_path)
             try:
-                logo = (ImageClip(logo_path)
-                        .set_duration(total_duration)
-                        .resize(width=140)
-                        .set_opacity(0.88)
-                        .set_pos(("right", 48)))  # Canto superior direito
-                video = CompositeVideoClip([video, logo])
-                logger.info("[Branding] Logo aplicado do canal.")
-            except Exception as e:
-                logger.warning("[Branding] Erro ao aplicar logo: %s", e)
-
-        # ── 8. RENDER FINAL ───────────────────────────────────────────────
-        output_filename = f"video_{job_id}.mp4"
-        output_path = os.path.join(OUTPUT_DIR, output_filename)
-        logger.info("[Render] Iniciando render final → %s", output_path)
-        _write_videofile_with_fallback(video, output_path)
-
-        # ── 9. ATUALIZAÇÃO DO BANCO ──────────────────────────────────────
-        if conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """UPDATE video_jobs
-                       SET status = 'completed',
-                           published = false,
-                           video_path = %s,
-                           updated_at = CURRENT_TIMESTAMP
-                       WHERE id = %s""",
-                    (output_path, job_id)
+                _render_with_moviepy(
+                    timeline, main_audio, bg_music_path, subtitle_groups,
+                    font_path, logo_path, total_duration, output_path, preview=preview
                 )
-                conn.commit()
+            finally:
+                main_audio.close()
+    measured = {"backend": backend, "render_s": round(time.monotonic() - t0, 2), "peak_mb": memory.peak_mb}
+    if plan:
+        # Fallback para o MoviePy entra no histórico do MoviePy (não no do plano)
+        render_plan.record(plan, backend, measured["render_s"], measured["peak_mb"])
+    logger.info("[Render] Medido: %.1fs, pico %s MB (%s).", measured["render_s"], measured["peak_mb"], backend)
+    if not rendered:
+        if outputs:
+            logger.warning("[Outputs] Render caiu para o MoviePy: %d saídas extras não geradas.", len(outputs))
+
+    # Só o que chegou ao disco (fallback MoviePy não gera as extras)
+    produced = [dict(out, videos=[v for v in out["videos"] if os.path.exists(v["path"])],
+                     posters=[p for p in out["posters"] if os.path.exists(p["path"])]) for out in outputs]
+    return {"video_path": output_path, "backend": backend, "preview": preview, "render_cache": cache_info,
+            "outputs": [out for out in produced if out["videos"] or out["posters"]], "measured": measured}
+
+
+def _stage_finalize(conn, job_id: str, output_path: str, preview: bool = False,
+                    cache_info: Optional[dict] = None, outputs: Optional[List[dict]] = None,
+                    plan: Optional[dict] = None, measured: Optional[dict] = None,
+                    features: Optional[dict] = None) -> dict:
+    """
+    Marca o job como concluído (e enfileira o webhook 'completed').
+    Preview: status 'preview_ready' (não entra na publicação) até o
+    POST /jobs/{id}/promote pedir o render completo.
+    Grava render_hash (chave do cache de render), metadata["render_cache"],
+    metadata["outputs"] (saídas extras e posters gerados) e
+    metadata["render_plan"] (plan_hash, estimativa e medição).
+    `features` (só em execuções sem estágio retomado) vira uma amostra do
+    job_predict: processing_s = tempo desde o claim + metadata["prediction"].
+    """
+    status = STATUS_PREVIEW_READY if preview else "completed"
+    patch = {"render_cache": cache_info or {"key": None, "hit": False}}
+    if plan:
+        patch["render_plan"] = {k: plan.get(k) for k in ("plan_hash", "estimate", "estimate_full") if plan.get(k)}
+        patch["render_plan"]["measured"] = measured
+    if preview:
+        patch["preview_path"] = output_path
+    if outputs is not None:
+        patch["outputs"] = outputs
+    if features:
+        patch["prediction"] = {"features": features}
+    if conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """UPDATE video_jobs
+                   SET status = %s,
+                       published = false,
+                       video_path = %s,
+                       render_hash = %s,
+                       processing_s = CASE WHEN %s THEN EXTRACT(EPOCH FROM NOW() - started_at)
+                                           ELSE processing_s END,
+                       metadata = COALESCE(metadata, '{}'::jsonb) || %s::jsonb,
+                       updated_at = CURRENT_TIMESTAMP
+                   WHERE id = %s""",
+                (status, output_path, patch["render_cache"].get("key"), bool(features),
+                 json.dumps(patch), job_id)
+            )
+            job_events.record_event(cur, job_id, status)
+            conn.commit()
+    return {"video_path": output_path, "status": status}
+
+
+def _segment_paths(segments: List[dict]) -> List[str]:
+    return [seg["path"] for seg in segments if seg.get("path")]
+
+
+# =============================================================================
+# FUNÇÃO PRINCIPAL: generate_video()
+# =============================================================================
+
+def generate_video(job_id: str, payload: dict):
+    """
+    Motor principal de renderização, em estágios retomáveis (JobPipeline):
+
+        audio      Narração (edge-tts via AudioService)
+        assets     Aquisição concorrente (acquire_assets): imagens com BlurBG
+                   e WatermarkDetect, highlights e Panic Search, com deadline
+                   global e limite de conexões por host
+        alignment  Legendas word-level (TTS → alinhamento → Whisper)
+        timeline   Segmentos declarativos + trilha sonora
+        mix        Narração + trilha (normalização, ducking, fade) em NumPy
+        plan       Plano declarativo do render (render_plan) + estimativa
+                   de tempo e memória pelo histórico de renders
+        render     Branding + render final: backend "ffmpeg" (filter_complex),
+                   "segmented" (pedaços em paralelo + concat) ou "moviepy"
+                   (crossfade + mixagem + composição; NVENC → libx264)
+        finalize   Atualização do banco de dados
+
+    Os estágios rodam como grafo de dependências: audio e assets em
+    paralelo, alignment assim que o áudio existe, timeline/mix/plan/render/
+    finalize em sequência. Cada estágio concluído fica em metadata["pipeline"] com
+    paths, hashes e duração; uma nova tentativa do mesmo job pula o que já
+    está pronto.
+    """
+    conn = get_db_connection()
+    pipe = JobPipeline(job_id, conn)
+    try:
+        logger.info("[JobStart] Iniciando job: %s", job_id)
+
+        # ── PARSE DO PAYLOAD ─────────────────────────────────────────────
+        title = payload.get("title", "Notícia de Futebol")
+
+        script_text, search_terms = parse_script(payload)
+
+        assets = payload.get("assets", {})
+        video_type = payload.get("type", "Noticia")
+
+        # Mood: determina a pasta de música
+        mood_map = {"Highlight": "Epic", "Gol": "Rock", "Noticia": "Happy", "Analise": "Sad"}
+        mood = mood_map.get(video_type, "Epic")
+
+        logger.info("[Parse] Título: '%s' | Tipo: %s | Mood: %s", title, video_type, mood)
+        # Loop/trilha sorteados com semente do roteiro: duplicatas batem no cache de render
+        seed = choice_seed(script_text, mood)
+
+        raw_images = assets.get("all_images", [])
+        video_urls = assets.get("all_videos", [])
+        panic_queries = (search_terms[:1] or [f"{title} futebol"]) + ["futebol brasil torcida", "soccer highlights"]
+        # Os downloads não esperam o TTS: a cobertura do Panic Search usa a
+        # duração estimada pelo roteiro (o timeline completa com loop se faltar)
+        estimated_duration = estimate_narration_s(script_text) + 1.5
+
+        def run_assets(_deps):
+            logger.info("[Assets] Adquirindo %d imagens e %d vídeos do payload (duração estimada %.1fs)...",
+                        len(raw_images), len(video_urls), estimated_duration)
+            return {"segments": acquire_assets(raw_images, video_urls, panic_queries, estimated_duration)}
+
+        def prediction_sample(deps):
+            # Retomada/promote/hit de cache não medem o tempo de um job inteiro
+            if pipe.resumed or (deps["render"].get("render_cache") or {}).get("hit"):
+                return None
+            return job_features(payload, deps["audio"]["narration_s"])
+
+        # Grafo: audio ∥ assets → alignment (após audio) → timeline → mix → plan → render → finalize
+        stages = [
+            # ── ÁUDIO ────────────────────────────────────────────────────
+            Stage("audio", lambda _deps: _stage_audio(job_id, script_text),
+                  inputs={"script": script_text},
+                  artifacts=lambda out: [out["audio_path"], word_timings_path(out["audio_path"])]),
+
+            # ── AQUISIÇÃO CONCORRENTE DE ASSETS ─────────────────────────
+            # Imagens (BlurBG + WatermarkDetect), highlights e Panic Search
+            # em paralelo, com deadline global — ver acquire_assets()
+            Stage("assets", run_assets,
+                  inputs={"images": raw_images, "videos": video_urls, "panic": panic_queries,
+                          "estimated_duration": round(estimated_duration, 1)},
+                  artifacts=lambda out: _segment_paths(out["segments"])),
+
+            # ── LEGENDAS WORD-LEVEL (TTS → alinhamento → Whisper) ────────
+            Stage("alignment",
+                  lambda deps: {"groups": transcribe_word_groups(
+                      audio_path=deps["audio"]["audio_path"],
+                      words_per_group=3,
+                      video_duration=deps["audio"]["total_duration"],
+                      script_text=script_text
+                  )},
+                  deps=("audio",),
+                  inputs={"script": script_text, "words_per_group": 3}),
+
+            # ── TIMELINE + TRILHA SONORA ─────────────────────────────────
+            Stage("timeline",
+                  lambda deps: _stage_timeline(deps["assets"]["segments"],
+                                               deps["audio"]["total_duration"], mood, seed),
+                  deps=("audio", "assets"),
+                  inputs={"mood": mood, "seed": seed}),
+
+            # ── MIXAGEM (narração + trilha → WAV único) ─────────────────
+            Stage("mix",
+                  lambda deps: _stage_mix(job_id, deps["audio"]["audio_path"], deps["timeline"]["music_path"],
+                                          deps["audio"]["total_duration"]),
+                  deps=("audio", "timeline"),
+                  inputs={"enabled": settings.AUDIO_MIX_ENABLED,
+                          "levels": [settings.MIX_NARRATION_DB, settings.MIX_BED_DB,
+                                     settings.MIX_MUSIC_DB, settings.MIX_DUCK_DB]},
+                  artifacts=lambda out: [out["mix_path"]]),
+
+            # ── PLANO DO RENDER + ESTIMATIVA ─────────────────────────────
+            Stage("plan",
+                  lambda deps: _stage_plan(job_id, payload, deps["timeline"]["timeline"],
+                                           deps["timeline"]["music_path"], bool(deps["mix"]["mix_path"]),
+                                           deps["alignment"]["groups"], deps["audio"]["total_duration"],
+                                           script_text),
+                  deps=("audio", "alignment", "timeline", "mix"),
+                  inputs={"backend": resolve_render_backend(payload), "preview": is_preview(payload),
+                          "outputs": (payload.get("config") or {}).get("outputs"),
+                          "version": render_plan.PLAN_VERSION}),
+
+            # ── RENDER FINAL ─────────────────────────────────────────────
+            # Com a mixagem pronta, o render só usa o WAV (sem trilha separada)
+            Stage("render",
+                  lambda deps: _stage_render(job_id, payload, deps["timeline"]["timeline"],
+                                             deps["mix"]["mix_path"] or deps["audio"]["audio_path"],
+                                             None if deps["mix"]["mix_path"] else deps["timeline"]["music_path"],
+                                             deps["alignment"]["groups"], deps["audio"]["total_duration"],
+                                             plan=deps["plan"]["plan"]),
+                  deps=("audio", "alignment", "timeline", "mix", "plan"),
+                  inputs={"backend": resolve_render_backend(payload), "preview": is_preview(payload),
+                          "outputs": (payload.get("config") or {}).get("outputs")},
+                  artifacts=lambda out: [out["video_path"]] + _output_paths(out.get("outputs") or [])),
+
+            # ── ATUALIZAÇÃO DO BANCO ─────────────────────────────────────
+            # Nunca retomado: status + webhook precisam rodar em todo retry
+            Stage("finalize",
+                  lambda deps: _stage_finalize(conn, job_id, deps["render"]["video_path"],
+                                               deps["render"].get("preview", False),
+                                               deps["render"].get("render_cache"),
+                                               deps["render"].get("outputs"),
+                                               deps["plan"], deps["render"].get("measured"),
+                                               prediction_sample(deps)),
+                  deps=("audio", "plan", "render"),
+                  inputs={"preview": is_preview(payload)},
+                  resume=False),
+        ]
+        output_path = pipe.run_graph(stages)["finalize"]["video_path"]
         logger.info("[JobDone] Job %s concluído com sucesso! Vídeo: %s", job_id, output_path)
+        logger.info("[Pipeline] Tempos do job %s: %s", job_id, pipe.summary())
 
     except Exception as e:
         logger.error("[JobError] Erro no job %s: %s", job_id, e)
+        logger.info("[Pipeline] Estágios concluídos antes do erro: %s", pipe.summary() or "nenhum")
         import traceback
         traceback.print_exc()
         if conn:
             try:
+                conn.rollback()  # a falha pode ter sido no meio de uma transação (finalize)
                 with conn.cursor() as cur:
                     cur.execute(
                         """UPDATE video_jobs
@@ -985,6 +1894,7 @@ def generate_video(job_id: str, payload: dict):
                            WHERE id = %s""",
                         (str(e)[:500], job_id)
                     )
+                    job_events.record_event(cur, job_id, "error")
                     conn.commit()
             except Exception:
                 pass
@@ -71,7 +71,34 @@ def init_db():
                 "ALTER TABLE video_jobs ADD COLUMN IF NOT EXISTS tiktok_id TEXT GENERATED ALWAYS AS ((metadata_post->>'tiktok_id')) STORED;",
                 "ALTER TABLE video_jobs ADD COLUMN IF NOT EXISTS platform_id TEXT;",
                 "ALTER TABLE video_jobs ADD COLUMN IF NOT EXISTS metrics JSONB DEFAULT '{}';",
-                "ALTER TABLE video_jobs ADD COLUMN IF NOT EXISTS error_message TEXT;"
+                "ALTER TABLE video_jobs ADD COLUMN IF NOT EXISTS error_message TEXT;",
+                # Fila de render (app/services/job_queue.py)
+                "ALTER TABLE video_jobs ADD COLUMN IF NOT EXISTS lease_owner TEXT;",
+                "ALTER TABLE video_jobs ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP WITH TIME ZONE;",
+                "ALTER TABLE video_jobs ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMP WITH TIME ZONE;",
+                "ALTER TABLE video_jobs ADD COLUMN IF NOT EXISTS started_at TIMESTAMP WITH TIME ZONE;",
+                "CREATE INDEX IF NOT EXISTS idx_video_jobs_queue ON video_jobs (status, created_at);",
+                # Previsão de custo + ordem SJF da fila (app/services/job_predict.py)
+                "ALTER TABLE video_jobs ADD COLUMN IF NOT EXISTS predicted_s DOUBLE PRECISION;",
+                "ALTER TABLE video_jobs ADD COLUMN IF NOT EXISTS processing_s DOUBLE PRECISION;",
+                # Cache de render (app/services/render_cache.py)
+                "ALTER TABLE video_jobs ADD COLUMN IF NOT EXISTS render_hash TEXT;",
+                "CREATE INDEX IF NOT EXISTS idx_video_jobs_render_hash ON video_jobs (render_hash) WHERE render_hash IS NOT NULL;",
+                # Outbox dos webhooks de status (app/services/job_events.py)
+                """CREATE TABLE IF NOT EXISTS job_events_outbox (
+                    id BIGSERIAL PRIMARY KEY,
+                    job_id UUID NOT NULL,
+                    event TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    payload JSONB NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    delivered_at TIMESTAMP WITH TIME ZONE,
+                    failed_at TIMESTAMP WITH TIME ZONE,
+                    last_error TEXT,
+                    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+                );""",
+                "CREATE INDEX IF NOT EXISTS idx_job_events_due ON job_events_outbox (next_attempt_at) WHERE delivered_at IS NULL AND failed_at IS NULL;"
             ]
             
             for cmd in alter_commands:
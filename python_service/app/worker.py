@@ -0,0 +1,110 @@
+# =============================================================================
+# app/worker.py — Worker de render (consome a fila de video_jobs)
+# =============================================================================
+# Uso:
+#   python -m app.worker                  # RENDER_WORKER_SLOTS processos
+#   python -m app.worker --slots 2
+#
+# Cada slot é um processo separado (o render do MoviePy/ffmpeg não disputa
+# GIL nem memória com os outros) que faz claim → generate_video → release.
+# O supervisor recria slots que morrerem; o job do slot morto volta para
+# a fila quando o lease expirar. Para escalar, suba mais workers — em
+# outros hosts também, desde que montem o mesmo /data_midia.
+# O supervisor também entrega os webhooks de status (job_events).
+# =============================================================================
+import sys
+import time
+import signal
+import logging
+import argparse
+import multiprocessing
+
+from app.config import settings
+
+logger = logging.getLogger("worker")
+
+
+def _slot_main(slot: int, stop_event) -> None:
+    """Loop de um slot: pega um job por vez até o supervisor pedir parada."""
+    # SIGTERM/SIGINT são do supervisor: o slot termina o job atual e sai
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(name)s] %(levelname)s %(message)s")
+
+    from app.services import job_queue, media_library, video_engine
+
+    media_library.warmup()
+    owner = job_queue.worker_id(slot)
+    logger.info("[Worker] Slot %d pronto (%s).", slot, owner)
+    while not stop_event.is_set():
+        job = job_queue.claim_next(owner)
+        if not job:
+            stop_event.wait(settings.QUEUE_POLL_S)
+            continue
+
+        job_id = str(job["id"])
+        payload = job["metadata"] or {}
+        logger.info("[Worker] Slot %d pegou o job %s (tentativa %d/%d, prioridade %s, previsto %ss, %.0fs na fila).",
+                    slot, job_id, job["retry_count"], settings.QUEUE_MAX_ATTEMPTS,
+                    job.get("priority"), job.get("predicted_s"), float(job.get("waited_s") or 0))
+        t0 = time.monotonic()
+        with job_queue.Lease(job_id, owner) as lease:
+            video_engine.generate_video(job_id, payload)
+        job_queue.release(job_id, owner)
+        if lease.lost:
+            logger.warning("[Worker] Job %s terminou sem o lease; o resultado pode ter sido refeito por outro worker.", job_id)
+        logger.info("[Worker] Slot %d terminou o job %s em %.1fs.", slot, job_id, time.monotonic() - t0)
+    logger.info("[Worker] Slot %d encerrado.", slot)
+
+
+def run(slots: int) -> None:
+    """Supervisor: mantém `slots` processos vivos até SIGTERM/SIGINT."""
+    from app.utils.database import init_db
+
+    init_db()
+    ctx = multiprocessing.get_context("spawn")
+    stop_event = ctx.Event()
+
+    def _shutdown(signum, _frame):
+        logger.info("[Worker] Sinal %d recebido: terminando jobs em andamento.", signum)
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+
+    # Webhooks de status: o outbox é entregue por qualquer worker vivo
+    from app.services.job_events import start_dispatcher
+    start_dispatcher(stop_event)
+
+    # Biblioteca mezzanine: ingestão inicial + varredura incremental
+    from app.services.mezzanine import start_watcher
+    start_watcher(stop_event)
+
+    procs = {}
+    while not stop_event.is_set():
+        for slot in range(slots):
+            proc = procs.get(slot)
+            if proc is None or not proc.is_alive():
+                if proc is not None:
+                    logger.warning("[Worker] Slot %d morreu (exit %s); recriando.", slot, proc.exitcode)
+                proc = ctx.Process(target=_slot_main, args=(slot, stop_event), name=f"render-slot-{slot}")
+                proc.start()
+                procs[slot] = proc
+        stop_event.wait(5)
+
+    for proc in procs.values():
+        proc.join()
+    logger.info("[Worker] Encerrado.")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Worker de render da fila video_jobs")
+    parser.add_argument("--slots", type=int, default=settings.RENDER_WORKER_SLOTS,
+                        help="processos de render simultâneos (default: RENDER_WORKER_SLOTS)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(name)s] %(levelname)s %(message)s")
+    run(max(1, args.slots))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
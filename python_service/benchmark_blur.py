@@ -0,0 +1,80 @@
+"""
+benchmark_blur.py — BlurBG: caminho "full" vs "fast" (resolução reduzida)
+=========================================================================
+Mede o tempo por imagem de make_blurred_background nos dois modos de
+BLUR_BG_QUALITY e a diferença visual entre as saídas 1080x1920 (PSNR e
+erro médio absoluto por canal).
+
+Uso (dentro do container):
+    python benchmark_blur.py [imagem ...]
+Sem argumentos, gera imagens sintéticas 16:9, 4:3 e 1:1.
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+from app.config import settings
+from app.services import video_engine
+
+
+def synthetic_images(tmp_dir: str):
+    rng = np.random.default_rng(0)
+    paths = []
+    for w, h in [(1920, 1080), (1280, 960), (1200, 1200)]:
+        # Ruído suavizado + gradiente: textura parecida com foto
+        noise = (rng.random((h // 8, w // 8, 3)) * 255).astype(np.uint8)
+        img = Image.fromarray(noise).resize((w, h), Image.BICUBIC).filter(ImageFilter.GaussianBlur(3))
+        path = os.path.join(tmp_dir, f"synth_{w}x{h}.jpg")
+        img.save(path, quality=92)
+        paths.append(path)
+    return paths
+
+
+def run(mode: str, path: str, repeat: int = 3):
+    settings.BLUR_BG_QUALITY = mode
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = video_engine.make_blurred_background(path)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def run_layer(fast: bool, path: str, repeat: int = 3) -> float:
+    """Só a camada de fundo (resize + blur + brightness)."""
+    img = Image.open(path).convert("RGB")
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        video_engine._blurred_cover_layer(img, fast=fast)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    tmp_dir = tempfile.mkdtemp(prefix="bench_blur_")
+    paths = sys.argv[1:] or synthetic_images(tmp_dir)
+
+    print(f"\n{'imagem':<24} {'full (ms)':>10} {'fast (ms)':>10} {'speedup':>8} "
+          f"{'fundo full':>11} {'fundo fast':>11} {'PSNR dB':>8} {'MAE':>6}")
+    for path in paths:
+        full_s, full_out = run("full", path)
+        fast_s, fast_out = run("fast", path)
+        a = np.asarray(Image.open(full_out), dtype=np.float32)
+        b = np.asarray(Image.open(fast_out), dtype=np.float32)
+        mse = float(np.mean((a - b) ** 2))
+        psnr = 10 * np.log10(255 ** 2 / mse) if mse else float("inf")
+        mae = float(np.mean(np.abs(a - b)))
+        layer_full, layer_fast = run_layer(False, path), run_layer(True, path)
+        print(f"{os.path.basename(path)[:24]:<24} {full_s * 1000:>10.0f} {fast_s * 1000:>10.0f} "
+              f"{full_s / fast_s:>7.1f}x {layer_full * 1000:>9.0f}ms {layer_fast * 1000:>9.0f}ms "
+              f"{psnr:>8.1f} {mae:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
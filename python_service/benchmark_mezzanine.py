@@ -0,0 +1,79 @@
+"""
+benchmark_mezzanine.py — Loop/B-roll original vs mezzanine (1080x1920 pré-escalado)
+===================================================================================
+Ingere a biblioteca (app/assets/defaults + /data_midia/broll) e compara o
+custo de usar um loop padrão no render nos dois caminhos:
+
+  - MoviePy: _cover_crop (resize + crop por frame) vs clip mezzanine direto
+  - ffmpeg:  scale/crop no filter_complex vs segmento "prescaled"
+
+Uso (dentro do container):
+    python benchmark_mezzanine.py [segundos]
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+from app.services import ffmpeg_render, mezzanine, video_engine
+
+
+def bench_moviepy(seg: dict, seconds: float) -> float:
+    clip = video_engine.build_segment_clip(seg)
+    t0 = time.perf_counter()
+    n = int(seconds * video_engine.TARGET_FPS)
+    for k in range(n):
+        clip.get_frame(k / video_engine.TARGET_FPS)
+    elapsed = time.perf_counter() - t0
+    clip.close()
+    return elapsed / n * 1000
+
+
+def bench_ffmpeg(seg: dict, seconds: float, work_dir: str) -> float:
+    out = os.path.join(work_dir, f"out_{int(seg.get('prescaled', False))}.mp4")
+    inputs, graph, maps = ffmpeg_render.build_render_command(
+        [seg], out, width=video_engine.TARGET_W, height=video_engine.TARGET_H,
+        fps=video_engine.TARGET_FPS, crossfade=0.0, total_duration=seconds,
+        narration_path=NARRATION, music_path=None,
+    )
+    graph_path = os.path.join(work_dir, "graph.txt")
+    with open(graph_path, "w") as f:
+        f.write(graph)
+    t0 = time.perf_counter()
+    ffmpeg_render._run_ffmpeg(inputs + ["-filter_complex_script", graph_path] + maps
+                              + ffmpeg_render._encoder_args("libx264", 4) + ffmpeg_render.AUDIO_ARGS + [out])
+    return time.perf_counter() - t0
+
+
+def main():
+    global NARRATION
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 6.0
+    work_dir = tempfile.mkdtemp(prefix="bench_mezz_")
+    NARRATION = os.path.join(work_dir, "silence.mp3")
+    ffmpeg_render._run_ffmpeg(["-f", "lavfi", "-i", "anullsrc=r=44100:cl=mono", "-t", str(seconds), NARRATION])
+
+    t0 = time.perf_counter()
+    stats = mezzanine.ingest_library()
+    print(f"\nIngestão: {stats} em {time.perf_counter() - t0:.1f}s")
+
+    sources = mezzanine.library_sources()
+    src = next((s for s in sources if mezzanine.lookup(s, "9:16")), None)
+    if not src:
+        print("Nenhum clipe ingerido (MEZZANINE_ENABLED=false ou biblioteca vazia).")
+        return
+    mezz = mezzanine.lookup(src, "9:16")
+    print(f"Clipe: {os.path.basename(src)} → {os.path.basename(mezz['path'])} ({mezz['duration']}s)\n")
+
+    original = {"type": "loop", "path": src, "duration": seconds}
+    prescaled = {"type": "loop", "path": mezz["path"], "duration": seconds, "prescaled": True}
+
+    print(f"{'caminho':<10} {'original':>12} {'mezzanine':>12}")
+    mp = (bench_moviepy(original, seconds), bench_moviepy(prescaled, seconds))
+    print(f"{'moviepy':<10} {mp[0]:>9.1f} ms {mp[1]:>9.1f} ms   (por frame)")
+    ff = (bench_ffmpeg(original, seconds, work_dir), bench_ffmpeg(prescaled, seconds, work_dir))
+    print(f"{'ffmpeg':<10} {ff[0]:>10.2f} s {ff[1]:>10.2f} s   (render de {seconds:.0f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+benchmark_subtitles.py — Atlas de glifos (Pillow) vs TextClip (ImageMagick)
+===========================================================================
+Mede o custo de gerar as legendas word-level de um short de ~45s (grupos
+de 3 palavras) nos dois caminhos de build_subtitle_clips, e o custo de
+compor os frames com as legendas por cima.
+
+Uso (dentro do container):
+    python benchmark_subtitles.py [n_grupos]
+"""
+
+import sys
+import time
+import random
+
+from app.config import settings
+from app.services import video_engine
+from app.services.subtitle_renderer import get_atlas
+
+WORDS = ("MESSI MARCOU UM GOL INCRÍVEL HOJE NO CLÁSSICO CONTRA O REAL MADRID "
+         "E A TORCIDA DO BARCELONA COMEMOROU MUITO NO ESTÁDIO").split()
+
+
+def make_groups(n: int, group_s: float = 0.9):
+    random.seed(0)
+    return [
+        {"text": " ".join(random.sample(WORDS, 3)), "start": k * group_s,
+         "end": (k + 1) * group_s, "duration": group_s}
+        for k in range(n)
+    ]
+
+
+def bench(renderer: str, groups):
+    settings.SUBTITLE_RENDERER = renderer
+    get_atlas.cache_clear()
+
+    t0 = time.perf_counter()
+    clips = video_engine.build_subtitle_clips(groups)
+    build_s = time.perf_counter() - t0
+    if not clips:
+        return None
+
+    # Composição: 1 frame por grupo sobre um fundo cheio (custo por frame)
+    from moviepy.editor import ColorClip, CompositeVideoClip
+    duration = groups[-1]["end"]
+    base = ColorClip((video_engine.TARGET_W, video_engine.TARGET_H), color=(40, 40, 40), duration=duration)
+    comp = CompositeVideoClip([base] + clips)
+    t0 = time.perf_counter()
+    for g in groups:
+        comp.get_frame(g["start"] + g["duration"] / 2)
+    frame_ms = (time.perf_counter() - t0) / len(groups) * 1000
+    return build_s, frame_ms
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    groups = make_groups(n)
+    print(f"\n{n} grupos de legenda ({groups[-1]['end']:.0f}s de vídeo)\n")
+    print(f"{'renderer':<10} {'build (s)':>10} {'ms/frame':>10}")
+
+    for renderer in ("atlas", "textclip"):
+        try:
+            result = bench(renderer, groups)
+        except Exception as e:
+            result = None
+            print(f"{renderer:<10} falhou: {e}")
+            continue
+        if result is None:
+            print(f"{renderer:<10} {'—':>10} {'—':>10}  (nenhum clip gerado; ImageMagick instalado?)")
+        else:
+            print(f"{renderer:<10} {result[0]:>10.3f} {result[1]:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
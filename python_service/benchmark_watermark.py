@@ -0,0 +1,110 @@
+"""
+benchmark_watermark.py — Detector de watermark: lista Python vs numpy (lote)
+============================================================================
+Compara, sobre uma pasta de imagens, o detector antigo
+(`list(band.getdata())` + contagem em Python) com o vetorizado
+(`watermark_score`, JPEG em draft + faixa reduzida) e com a avaliação em
+lote (`score_stock_watermarks`). Mostra tempo total, concordância dos
+vereditos e grava os scores em CSV para calibrar WATERMARK_THRESHOLD.
+
+Uso (dentro do container):
+    python benchmark_watermark.py <pasta_de_imagens> [scores.csv]
+Sem pasta, gera imagens sintéticas (com e sem faixa clara na base).
+"""
+
+import os
+import sys
+import csv
+import time
+import tempfile
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from app.config import settings
+from app.services import video_engine
+
+EXTS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def legacy_ratio(img_path: str) -> float:
+    """Detector original (antes da vetorização)."""
+    img = Image.open(img_path).convert("L")
+    w, h = img.size
+    pixels = list(img.crop((0, int(h * 0.85), w, h)).getdata())
+    return sum(1 for p in pixels if p > 200) / len(pixels) if pixels else 0
+
+
+def safe_score(fn, img_path: str):
+    """Score por arquivo; None se a imagem estiver corrompida/ilegível."""
+    try:
+        return fn(img_path)
+    except Exception as e:
+        print(f"  [aviso] {os.path.basename(img_path)}: {e}")
+        return None
+
+
+def fmt(score) -> str:
+    return "" if score is None else f"{score:.4f}"
+
+
+def synthetic_images(tmp_dir: str, n: int = 24):
+    rng = np.random.default_rng(0)
+    paths = []
+    for k in range(n):
+        w, h = (4000, 2667) if k % 3 == 0 else (1920, 1080)
+        base = (rng.random((h // 16, w // 16, 3)) * 160).astype(np.uint8)
+        img = Image.fromarray(base).resize((w, h), Image.BILINEAR)
+        if k % 2:  # faixa de "watermark" clara na base
+            ImageDraw.Draw(img).rectangle((0, int(h * 0.88), w, int(h * 0.97)), fill=(235, 235, 235))
+        path = os.path.join(tmp_dir, f"synth_{k:02d}.jpg")
+        img.save(path, quality=90)
+        paths.append(path)
+    return paths
+
+
+def main():
+    if len(sys.argv) > 1:
+        folder = sys.argv[1]
+        paths = sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(EXTS))
+    else:
+        paths = synthetic_images(tempfile.mkdtemp(prefix="bench_wm_"))
+    csv_path = sys.argv[2] if len(sys.argv) > 2 else None
+    threshold = settings.WATERMARK_THRESHOLD
+    print(f"\n{len(paths)} imagens | limiar {threshold:.2f}\n")
+
+    t0 = time.perf_counter()
+    legacy = [safe_score(legacy_ratio, p) for p in paths]
+    legacy_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    single = [safe_score(video_engine.watermark_score, p) for p in paths]
+    single_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batch = video_engine.score_stock_watermarks(paths, workers=os.cpu_count() or 4)
+    batch_s = time.perf_counter() - t0
+
+    # Imagens ilegíveis (score None) ficam fora da comparação
+    pairs = [(a, b) for a, b in zip(legacy, single) if a is not None and b is not None]
+    agree = sum((a > threshold) == (b > threshold) for a, b in pairs)
+    max_diff = max((abs(a - b) for a, b in pairs), default=0.0)
+
+    print(f"{'detector':<22} {'total (s)':>10} {'ms/imagem':>10}")
+    for name, secs in [("lista Python (antigo)", legacy_s), ("numpy", single_s), ("numpy em lote", batch_s)]:
+        print(f"{name:<22} {secs:>10.2f} {secs / len(paths) * 1000:>10.1f}")
+    print(f"\nVereditos iguais ao antigo: {agree}/{len(pairs)} | maior diferença de score: {max_diff:.3f}")
+    if len(pairs) < len(paths):
+        print(f"Imagens ilegíveis: {len(paths) - len(pairs)}")
+
+    if csv_path:
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["arquivo", "score_antigo", "score", "veredito"])
+            for path, old, (score, verdict) in zip(paths, legacy, batch):
+                writer.writerow([os.path.basename(path), fmt(old), fmt(score), int(verdict)])
+        print(f"Scores gravados em {csv_path}")
+
+
+if __name__ == "__main__":
+    main()
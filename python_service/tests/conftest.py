@@ -67,3 +67,31 @@ def mock_fs():
             "makedirs": mkdirs_mock,
             "listdir": listdir_mock
         }
+
+@pytest.fixture(scope="session")
+def pg_url(tmp_path_factory):
+    # Postgres de verdade (SKIP LOCKED, leases): TEST_DATABASE_URL ou pgserver local
+    url = os.environ.get("TEST_DATABASE_URL")
+    server = None
+    if not url:
+        pgserver = pytest.importorskip("pgserver", reason="sem TEST_DATABASE_URL nem pgserver")
+        server = pgserver.get_server(str(tmp_path_factory.mktemp("pg")), cleanup_mode="stop")
+        url = server.get_uri()
+    from app.config import settings
+    from app.utils.database import init_db
+    with patch.object(settings, "DATABASE_URL", url):
+        init_db()
+        yield url
+    if server is not None:
+        server.cleanup()
+
+@pytest.fixture
+def pg(pg_url):
+    # Tabelas vazias a cada teste; conexões de get_db_connection apontam para o banco de teste
+    from app.utils.database import get_db_connection
+    conn = get_db_connection()
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE video_jobs, job_events_outbox")
+    conn.commit()
+    yield conn
+    conn.close()
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from app.services import alignment
+from app.services.alignment import SAMPLE_RATE, _match_breaks_to_pauses, _SpeechClock, align_script
+
+
+def _speech(pattern):
+    """PCM sintético: [(segundos, fala?)] → ruído onde há fala, quase silêncio nas pausas."""
+    rng = np.random.default_rng(0)
+    parts = [(rng.standard_normal(int(s * SAMPLE_RATE)) * (0.3 if voiced else 0.001)).astype(np.float32)
+             for s, voiced in pattern]
+    return np.concatenate(parts)
+
+
+SCRIPT = "O Flamengo venceu o clássico no Maracanã. Gabigol marcou duas vezes no segundo tempo, " \
+         "e a torcida fez a festa. O time segue líder do campeonato."
+# Três frases → três blocos de fala (proporcionais às sílabas) separados por pausas
+PATTERN = [(0.2, False), (3.0, True), (0.5, False), (4.6, True), (0.4, False), (2.4, True), (0.3, False)]
+
+
+@pytest.fixture
+def fake_audio(monkeypatch):
+    def use(pattern):
+        monkeypatch.setattr(alignment, "decode_pcm", lambda _path: _speech(pattern))
+    return use
+
+
+def test_matches_are_monotonic():
+    breaks = [0.1, 0.35, 0.36, 0.6, 0.9]
+    pauses = [0.12, 0.4, 0.58, 0.7, 0.88]
+    pairs = _match_breaks_to_pauses(breaks, pauses)
+
+    assert pairs
+    assert all(b1 < b2 and p1 < p2 for (b1, p1), (b2, p2) in zip(pairs, pairs[1:]))
+    assert all(abs(breaks[b] - pauses[p]) <= alignment.MATCH_TOLERANCE for b, p in pairs)
+
+
+def test_matcher_skips_unmatched_breaks_and_pauses():
+    assert _match_breaks_to_pauses([0.5], [0.1, 0.9]) == []
+    assert _match_breaks_to_pauses([], [0.5]) == []
+    assert _match_breaks_to_pauses([0.5], []) == []
+    assert _match_breaks_to_pauses([0.2, 0.8], [0.21, 0.5, 0.79]) == [(0, 0), (1, 2)]
+
+
+def test_speech_clock_skips_pauses():
+    clock = _SpeechClock([(1.0, 2.0), (3.0, 5.0)])
+    assert clock.total == pytest.approx(3.0)
+    assert clock.to_real(0.5) == pytest.approx(1.5)
+    # Limite entre regiões: "start" vai para a próxima, "end" fica na anterior
+    assert clock.to_real(1.0, "start") == pytest.approx(3.0)
+    assert clock.to_real(1.0, "end") == pytest.approx(2.0)
+    assert clock.to_real(2.5) == pytest.approx(4.5)
+    assert clock.to_real(10.0) == pytest.approx(5.0)
+
+
+def test_speech_clock_is_monotonic():
+    clock = _SpeechClock([(0.2, 1.0), (1.3, 2.0), (2.6, 4.0)])
+    ts = np.linspace(0, clock.total, 200)
+    for side in ("start", "end"):
+        real = [clock.to_real(t, side) for t in ts]
+        assert all(a <= b + 1e-9 for a, b in zip(real, real[1:]))
+
+
+def test_align_script_words_are_ordered_and_inside_audio(fake_audio):
+    fake_audio(PATTERN)
+    words = align_script("narracao.mp3", SCRIPT)
+
+    assert [w["word"] for w in words] == alignment.script_words(SCRIPT)
+    starts = [w["start"] for w in words]
+    ends = [w["end"] for w in words]
+    assert all(a <= b for a, b in zip(starts, starts[1:]))
+    assert all(a <= b for a, b in zip(ends, ends[1:]))
+    assert all(w["start"] <= w["end"] for w in words)
+    assert starts[0] >= 0.15 and ends[-1] <= sum(s for s, _ in PATTERN)
+
+
+def test_align_script_anchors_sentences_on_pauses(fake_audio):
+    fake_audio(PATTERN)
+    words = align_script("narracao.mp3", SCRIPT)
+
+    # 1ª palavra de cada frase começa logo depois de uma pausa
+    firsts = [words[i + 1]["start"] for i, w in enumerate(words[:-1]) if w["word"].endswith(".")]
+    assert firsts == [pytest.approx(3.7, abs=0.1), pytest.approx(8.7, abs=0.1)]
+
+
+@pytest.mark.parametrize("pattern", [
+    [(0.2, False), (1.0, True), (0.2, False)],    # fala curta demais para o roteiro
+    [(0.2, False), (60.0, True), (0.2, False)],   # fala longa demais para o roteiro
+])
+def test_mismatched_audio_falls_back(fake_audio, pattern):
+    fake_audio(pattern)
+    assert align_script("narracao.mp3", SCRIPT) is None
+
+
+def test_silence_falls_back(fake_audio):
+    fake_audio([(3.0, False)])
+    assert align_script("narracao.mp3", SCRIPT) is None
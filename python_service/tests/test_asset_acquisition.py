@@ -0,0 +1,65 @@
+import threading
+import time
+
+from app.services.asset_acquisition import AcquisitionRun
+
+
+def _after(delay, result=None, error=None):
+    def task():
+        time.sleep(delay)
+        if error:
+            raise error
+        return result
+    return task
+
+
+def _run(tasks, deadline_s=5.0, max_workers=4):
+    run = AcquisitionRun(deadline_s=deadline_s, max_workers=max_workers, per_host=4)
+    for key, fn in tasks.items():
+        run.submit(key, fn)
+    return run
+
+
+def test_wait_first_prefers_priority_over_arrival():
+    run = _run({0: _after(0.3, "primeiro"), 1: _after(0.0, "rápido")})
+    try:
+        assert run.wait_first([0, 1]) == 0
+    finally:
+        run.close()
+
+
+def test_wait_first_falls_back_when_higher_priority_fails():
+    run = _run({0: _after(0.1, error=RuntimeError("yt-dlp")), 1: _after(0.2, None), 2: _after(0.0, "terceiro")})
+    try:
+        assert run.wait_first([0, 1, 2]) == 2
+    finally:
+        run.close()
+
+
+def test_wait_first_after_deadline_takes_best_arrived():
+    gate = threading.Event()
+    run = _run({0: lambda: gate.wait(5) and "lento", 1: _after(0.0, "chegou")}, deadline_s=0.3)
+    try:
+        assert run.wait_first([0, 1]) == 1
+    finally:
+        gate.set()
+        run.close()
+
+
+def test_wait_first_cancels_only_lower_priority_pending():
+    run = _run({0: _after(0.1, "ok"), 1: _after(0.5, "x"), 2: _after(0.0, "y")}, max_workers=1)
+    try:
+        assert run.wait_first([0, 1, 2]) == 0
+        # 1 já pode ter começado no worker livre; 2 ainda está na fila
+        assert run.futures[2].cancelled()
+        assert not run.futures[0].cancelled()
+    finally:
+        run.close()
+
+
+def test_wait_first_none_when_all_fail():
+    run = _run({0: _after(0.0, error=OSError("404")), 1: _after(0.0, None)})
+    try:
+        assert run.wait_first([0, 1]) is None
+    finally:
+        run.close()
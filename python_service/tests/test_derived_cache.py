@@ -0,0 +1,56 @@
+import os
+
+from app.services.derived_cache import DerivedCache, derived_key
+
+
+def _artifact(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(name.encode()[:1] * size)
+    return str(path)
+
+
+def test_key_depends_on_every_part():
+    base = derived_key("abc", "blur_bg", {"sigma": 30, "v": 1}, (1080, 1920))
+    assert base == derived_key("abc", "blur_bg", {"v": 1, "sigma": 30}, (1080, 1920))
+    assert base != derived_key("abd", "blur_bg", {"sigma": 30, "v": 1}, (1080, 1920))
+    assert base != derived_key("abc", "blur_bg", {"sigma": 31, "v": 1}, (1080, 1920))
+    assert base != derived_key("abc", "blur_bg", {"sigma": 30, "v": 1}, (720, 1280))
+
+
+def test_values_round_trip(tmp_path):
+    cache = DerivedCache(root=str(tmp_path / "c"), max_bytes=10_000)
+    assert cache.get_value("k", default="miss") == "miss"
+    cache.put_value("k", "watermark_score", 0.42)
+    assert cache.get_value("k") == 0.42
+
+
+def test_file_put_near_limit_survives_its_own_eviction(tmp_path):
+    cache = DerivedCache(root=str(tmp_path / "c"), max_bytes=1000)
+    cache.put_file("old", "blur_bg", _artifact(tmp_path, "o.jpg", 500))
+
+    cache.put_file("new", "blur_bg", _artifact(tmp_path, "n.jpg", 850))
+
+    hit = cache.get_file("new", str(tmp_path / "job"))
+    assert hit and open(hit, "rb").read() == b"n" * 850
+    assert cache.get_file("old", str(tmp_path / "job")) is None
+
+
+def test_oversize_file_is_not_cached(tmp_path):
+    cache = DerivedCache(root=str(tmp_path / "c"), max_bytes=1000)
+    cache.put_file("small", "blur_bg", _artifact(tmp_path, "s.jpg", 100))
+
+    cache.put_file("huge", "mezzanine", _artifact(tmp_path, "h.mp4", 950))
+
+    assert cache.get_file("huge", str(tmp_path / "job")) is None
+    assert cache.get_file("small", str(tmp_path / "job")) is not None
+
+
+def test_blob_evicted_between_lookup_and_link_is_a_miss(tmp_path):
+    cache = DerivedCache(root=str(tmp_path / "c"), max_bytes=10_000)
+    cache.put_file("k", "blur_bg", _artifact(tmp_path, "a.jpg", 100))
+    for dirpath, _, names in os.walk(cache.blob_dir):
+        for name in names:
+            os.remove(os.path.join(dirpath, name))  # outro processo evictou o blob
+
+    assert cache.get_file("k", str(tmp_path / "job")) is None
+    assert cache._execute("SELECT key FROM derived") == []
@@ -0,0 +1,60 @@
+import pytest
+
+from app.services.ffmpeg_render import plan_timeline_pieces
+
+FPS = 30
+
+
+def _segments(*durations):
+    return [{"type": "image", "path": f"/tmp/{i}.jpg", "duration": d} for i, d in enumerate(durations)]
+
+
+# (durações, crossfade, total_duration, [(kind, seg, frame inicial, frames, offset)])
+CASES = {
+    "segmento único": (
+        (4.0,), 0.5, 4.0,
+        [("body", 0, 0, 120, 0.0)]),
+    "timeline menor que um pedaço": (
+        (4.0, 4.0), 0.5, 2.0,
+        [("body", 0, 0, 60, 0.0)]),
+    "corte no meio do crossfade": (
+        (4.0, 4.0), 0.5, 3.8,
+        [("body", 0, 0, 105, 0.0), ("xfade", 0, 105, 9, 0.0)]),
+    "crossfade entre dois pedaços": (
+        (4.0, 4.0), 0.5, 7.5,
+        [("body", 0, 0, 105, 0.0), ("xfade", 0, 105, 15, 0.0), ("body", 1, 120, 105, 0.5)]),
+    "três segmentos": (
+        (4.0, 4.0, 4.0), 0.5, 11.0,
+        [("body", 0, 0, 105, 0.0), ("xfade", 0, 105, 15, 0.0), ("body", 1, 120, 90, 0.5),
+         ("xfade", 1, 210, 15, 0.0), ("body", 2, 225, 105, 0.5)]),
+    "segmento curto vira só crossfades": (
+        (4.0, 0.3, 4.0), 0.5, 7.5,
+        [("body", 0, 0, 105, 0.0), ("xfade", 0, 105, 15, 0.0), ("xfade", 1, 120, 15, 0.0),
+         ("body", 2, 135, 90, 0.5)]),
+    "sem crossfade": (
+        (4.0, 4.0), 0.0, 8.0,
+        [("body", 0, 0, 120, 0.0), ("body", 1, 120, 120, 0.0)]),
+}
+
+
+@pytest.mark.parametrize("durations, crossfade, total, expected", CASES.values(), ids=CASES.keys())
+def test_plan_timeline_pieces(durations, crossfade, total, expected):
+    pieces = plan_timeline_pieces(_segments(*durations), crossfade, total, FPS)
+
+    got = [(p["kind"], p["seg"], round(p["start"] * FPS), p["frames"], round(p["offset"], 3)) for p in pieces]
+    assert got == expected
+
+
+@pytest.mark.parametrize("durations, crossfade, total, expected", CASES.values(), ids=CASES.keys())
+def test_pieces_tile_the_timeline_in_concat_order(durations, crossfade, total, expected):
+    pieces = plan_timeline_pieces(_segments(*durations), crossfade, total, FPS)
+
+    frame = 0
+    for piece in pieces:
+        assert round(piece["start"] * FPS) == frame  # sem buraco nem sobreposição no concat
+        assert piece["frames"] > 0
+        frame += piece["frames"]
+    # Segmentos menores que 2x o crossfade são esticados (_pad_short_segments)
+    padded = durations[:1] + tuple(max(d, 2 * crossfade) for d in durations[1:])
+    covered = sum(padded) - crossfade * (len(durations) - 1)
+    assert frame == round(min(total, covered) * FPS)
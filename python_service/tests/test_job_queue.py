@@ -0,0 +1,109 @@
+import json
+import threading
+
+from app.services import job_queue
+from app.utils.database import get_db_connection
+
+
+def _insert(pg, n=1, **cols):
+    ids = []
+    with pg.cursor() as cur:
+        for i in range(n):
+            fields = {"source_url": f"test://{len(ids)}-{i}-{id(cols)}", "status": "queued",
+                      "metadata": json.dumps({"title": "t"}), **cols}
+            cur.execute(
+                f"INSERT INTO video_jobs ({', '.join(fields)}) VALUES ({', '.join(['%s'] * len(fields))}) RETURNING id",
+                tuple(fields.values()))
+            ids.append(str(cur.fetchone()["id"]))
+    pg.commit()
+    return ids
+
+
+def _job(pg, job_id):
+    with pg.cursor() as cur:
+        cur.execute("SELECT * FROM video_jobs WHERE id = %s", (job_id,))
+        row = cur.fetchone()
+    pg.commit()
+    return row
+
+
+def test_concurrent_claims_never_return_same_row(pg):
+    ids = _insert(pg, n=6)
+    claimed, lock = [], threading.Lock()
+    barrier = threading.Barrier(10)
+
+    def worker(slot):
+        barrier.wait()
+        while True:
+            job = job_queue.claim_next(f"test:{slot}")
+            if not job:
+                return
+            with lock:
+                claimed.append(str(job["id"]))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(claimed) == sorted(ids)
+    assert len(set(claimed)) == len(claimed)
+    for job_id in ids:
+        assert _job(pg, job_id)["retry_count"] == 1
+
+
+def test_expired_lease_is_reclaimed_with_retry_count_incremented(pg):
+    (job_id,) = _insert(pg)
+    assert str(job_queue.claim_next("dead:0")["id"]) == job_id
+    assert job_queue.claim_next("other:0") is None  # lease ainda válido
+
+    with pg.cursor() as cur:
+        cur.execute("UPDATE video_jobs SET lease_expires_at = NOW() - INTERVAL '1 second' WHERE id = %s", (job_id,))
+    pg.commit()
+
+    job = job_queue.claim_next("other:0")
+    assert str(job["id"]) == job_id
+    row = _job(pg, job_id)
+    assert row["retry_count"] == 2
+    assert row["lease_owner"] == "other:0"
+    assert row["status"] == "processing"
+
+
+def test_expired_lease_out_of_attempts_is_reaped(pg, monkeypatch):
+    monkeypatch.setattr(job_queue.settings, "QUEUE_MAX_ATTEMPTS", 2)
+    (job_id,) = _insert(pg, status="processing", lease_owner="dead:0", retry_count=2)
+    with pg.cursor() as cur:
+        cur.execute("UPDATE video_jobs SET lease_expires_at = NOW() - INTERVAL '1 second' WHERE id = %s", (job_id,))
+    pg.commit()
+
+    assert job_queue.claim_next("other:0") is None
+    row = _job(pg, job_id)
+    assert row["status"] == "error"
+    assert row["lease_owner"] is None
+    assert "lease expirado" in row["error_message"]
+
+
+def test_release_with_wrong_owner_is_noop(pg):
+    (job_id,) = _insert(pg)
+    job_queue.claim_next("owner:0")
+
+    job_queue.release(job_id, "intruder:0")
+    assert _job(pg, job_id)["lease_owner"] == "owner:0"
+
+    job_queue.release(job_id, "owner:0")
+    row = _job(pg, job_id)
+    assert row["lease_owner"] is None
+    assert row["lease_expires_at"] is None
+
+
+def test_heartbeat_from_wrong_owner_does_not_renew(pg):
+    (job_id,) = _insert(pg)
+    job_queue.claim_next("owner:0")
+
+    conn = get_db_connection()
+    try:
+        assert job_queue.Lease(job_id, "intruder:0")._beat(conn) is False
+        assert job_queue.Lease(job_id, "owner:0")._beat(conn) is True
+    finally:
+        conn.close()
@@ -0,0 +1,128 @@
+import os
+import time
+
+import pytest
+
+from app.services import media_cache
+from app.services.media_cache import MediaCache, normalize_url
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("HTTPS://Example.COM/a.jpg", "https://example.com/a.jpg"),
+    ("https://example.com:443/a.jpg", "https://example.com/a.jpg"),
+    ("http://example.com:80/a.jpg", "http://example.com/a.jpg"),
+    ("https://example.com:8443/a.jpg", "https://example.com:8443/a.jpg"),
+    ("https://example.com/a.jpg#frag", "https://example.com/a.jpg"),
+    ("https://example.com", "https://example.com/"),
+    ("https://example.com/a.jpg?b=2&a=1", "https://example.com/a.jpg?a=1&b=2"),
+    ("https://example.com/a.jpg?utm_source=x&w=640&fbclid=y&gclid=z", "https://example.com/a.jpg?w=640"),
+    ("  https://example.com/a.jpg?flag=  ", "https://example.com/a.jpg?flag="),
+])
+def test_normalize_url(url, expected):
+    assert normalize_url(url) == expected
+
+
+class FakeResponse:
+    def __init__(self, body: bytes, status: int = 200, headers=None):
+        self.body, self.status_code, self.headers = body, status, headers or {}
+
+    def iter_content(self, size):
+        for i in range(0, len(self.body), size):
+            yield self.body[i:i + size]
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    # URL → bytes servidos pelo requests.get falso; conta as chamadas
+    bodies, calls = {}, []
+
+    def fake_get(url, headers=None, timeout=None, stream=False):
+        calls.append(url)
+        return FakeResponse(bodies[url])
+
+    monkeypatch.setattr(media_cache.requests, "get", fake_get)
+    return bodies, calls
+
+
+def _blobs(cache):
+    return {sha: path for sha, path in cache._execute("SELECT sha256, path FROM blobs")}
+
+
+def test_fresh_hit_skips_network_and_links(tmp_path, serve):
+    bodies, calls = serve
+    bodies["https://a.com/x.jpg"] = b"x" * 100
+    cache = MediaCache(root=str(tmp_path / "c"), max_bytes=10_000, fresh_s=60)
+
+    first = cache.fetch("https://a.com/x.jpg", str(tmp_path / "job1"))
+    second = cache.fetch("https://A.com/x.jpg?utm_source=rss", str(tmp_path / "job2"))
+
+    assert calls == ["https://a.com/x.jpg"]
+    assert open(first, "rb").read() == open(second, "rb").read() == b"x" * 100
+    assert os.stat(first).st_ino == os.stat(second).st_ino
+
+
+def test_lru_eviction_removes_least_recently_used(tmp_path, serve):
+    bodies, _ = serve
+    for name in "abc":
+        bodies[f"https://a.com/{name}"] = name.encode() * 400
+    cache = MediaCache(root=str(tmp_path / "c"), max_bytes=1000, fresh_s=60)
+
+    cache.fetch("https://a.com/a", str(tmp_path / "job"))
+    time.sleep(0.01)
+    cache.fetch("https://a.com/b", str(tmp_path / "job"))
+    time.sleep(0.01)
+    cache.fetch("https://a.com/a", str(tmp_path / "job"))  # hit: a passa a ser o mais recente
+    time.sleep(0.01)
+    cache.fetch("https://a.com/c", str(tmp_path / "job"))  # 1200 > 1000 → evicta b
+
+    assert cache._lookup(normalize_url("https://a.com/b")) is None
+    assert cache._lookup(normalize_url("https://a.com/a")) is not None
+    assert cache._lookup(normalize_url("https://a.com/c")) is not None
+
+
+def test_oversize_blob_is_delivered_but_not_cached(tmp_path, serve):
+    bodies, calls = serve
+    bodies["https://a.com/small"] = b"s" * 100
+    bodies["https://a.com/huge"] = b"h" * 950
+    cache = MediaCache(root=str(tmp_path / "c"), max_bytes=1000, fresh_s=60)
+    cache.fetch("https://a.com/small", str(tmp_path / "job"))
+
+    path = cache.fetch("https://a.com/huge", str(tmp_path / "job"))
+
+    assert open(path, "rb").read() == b"h" * 950
+    assert cache._lookup(normalize_url("https://a.com/huge")) is None
+    assert cache._lookup(normalize_url("https://a.com/small")) is not None
+    assert os.listdir(cache.tmp_dir) == []
+
+
+def test_just_ingested_blob_survives_eviction(tmp_path, serve):
+    bodies, _ = serve
+    bodies["https://a.com/old"] = b"o" * 500
+    bodies["https://a.com/new"] = b"n" * 850
+    cache = MediaCache(root=str(tmp_path / "c"), max_bytes=1000, fresh_s=60)
+    cache.fetch("https://a.com/old", str(tmp_path / "job"))
+
+    path = cache.fetch("https://a.com/new", str(tmp_path / "job"))
+
+    assert open(path, "rb").read() == b"n" * 850
+    assert cache._lookup(normalize_url("https://a.com/new")) is not None
+    assert cache._lookup(normalize_url("https://a.com/old")) is None
+
+
+def test_same_content_other_ext_keeps_single_tracked_blob(tmp_path, serve):
+    bodies, _ = serve
+    bodies["https://a.com/logo.png"] = b"same-bytes" * 10
+    bodies["https://b.com/logo"] = b"same-bytes" * 10
+    cache = MediaCache(root=str(tmp_path / "c"), max_bytes=10_000, fresh_s=60)
+
+    cache.fetch("https://a.com/logo.png", str(tmp_path / "job"), ext="png")
+    cache.fetch("https://b.com/logo", str(tmp_path / "job"), ext="jpg")
+
+    blobs = _blobs(cache)
+    files = [os.path.join(d, f) for d, _, names in os.walk(cache.blob_dir) for f in names]
+    assert len(blobs) == 1
+    assert files == list(blobs.values())
+    assert files[0].endswith(".png")
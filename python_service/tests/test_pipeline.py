@@ -0,0 +1,168 @@
+import asyncio
+import copy
+import json
+
+import pytest
+
+from app.routes import jobs
+from app.services import job_queue, pipeline, video_engine
+from app.services.pipeline import JobPipeline, Stage
+
+
+def _graph(tmp_path, calls, version):
+    """a (arquivo) → b (arquivo) → c; `version` muda o conteúdo gerado por a."""
+    a_path, b_path = str(tmp_path / "a.txt"), str(tmp_path / "b.txt")
+
+    def run_a(_deps):
+        calls.append("a")
+        with open(a_path, "w") as f:
+            f.write(version["a"])
+        return {"path": a_path}
+
+    def run_b(deps):
+        calls.append("b")
+        with open(b_path, "w") as f:
+            f.write(open(deps["a"]["path"]).read().upper())
+        return {"path": b_path}
+
+    def run_c(deps):
+        calls.append("c")
+        return {"text": open(deps["b"]["path"]).read()}
+
+    return [
+        Stage("a", run_a, inputs={"v": 1}, artifacts=lambda out: [out["path"]]),
+        Stage("b", run_b, deps=("a",), artifacts=lambda out: [out["path"]]),
+        Stage("c", run_c, deps=("b",)),
+    ]
+
+
+def _resume(pipe):
+    # Nova tentativa do mesmo job: estado carregado de metadata["pipeline"]
+    again = JobPipeline(pipe.job_id)
+    again.state = copy.deepcopy(json.loads(json.dumps(pipe.state)))
+    return again
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_completed_stages_with_artifacts_are_skipped(tmp_path, parallel):
+    calls, version = [], {"a": "x"}
+    first = JobPipeline("job")
+    assert first.run_graph(_graph(tmp_path, calls, version), parallel=parallel)["c"] == {"text": "X"}
+    assert calls == ["a", "b", "c"]
+
+    calls.clear()
+    again = _resume(first)
+    assert again.run_graph(_graph(tmp_path, calls, version), parallel=parallel)["c"] == {"text": "X"}
+    assert calls == []
+    assert again.resumed == {"a", "b", "c"}
+
+
+def test_missing_artifact_reruns_stage_and_downstream(tmp_path):
+    calls, version = [], {"a": "x"}
+    first = JobPipeline("job")
+    first.run_graph(_graph(tmp_path, calls, version), parallel=False)
+
+    (tmp_path / "a.txt").unlink()
+    version["a"] = "y"  # refeito com outro resultado → fingerprint de a muda
+    calls.clear()
+    again = _resume(first)
+    assert again.run_graph(_graph(tmp_path, calls, version), parallel=False)["c"] == {"text": "Y"}
+    assert calls == ["a", "b", "c"]
+
+
+def test_changed_artifact_reruns_stage(tmp_path):
+    calls, version = [], {"a": "x"}
+    first = JobPipeline("job")
+    first.run_graph(_graph(tmp_path, calls, version), parallel=False)
+
+    (tmp_path / "b.txt").write_text("Z")  # mesmo tamanho, sha256 diferente
+    calls.clear()
+    _resume(first).run_graph(_graph(tmp_path, calls, version), parallel=False)
+    assert calls == ["b"]  # b refeito com o mesmo resultado: c continua válido
+
+
+def test_stages_from():
+    assert pipeline.stages_from("mix") == ["mix", "plan", "render", "finalize"]
+    assert pipeline.stages_from("audio") == list(pipeline.STAGES)
+    assert pipeline.stages_from("finalize") == ["finalize"]
+    with pytest.raises(ValueError):
+        pipeline.stages_from("upload")
+
+
+def test_invalidate_sql_rejects_unknown_stage():
+    with pytest.raises(ValueError):
+        pipeline.invalidate_sql(["render", "x'; DROP TABLE video_jobs; --"])
+
+
+def test_invalidate_sql_removes_only_given_stages(pg):
+    stages = {name: {"key": name} for name in pipeline.STAGES}
+    with pg.cursor() as cur:
+        cur.execute("INSERT INTO video_jobs (source_url, metadata) VALUES ('test://inv', %s) RETURNING id",
+                    (json.dumps({"title": "t", "pipeline": {"stages": stages}}),))
+        job_id = cur.fetchone()["id"]
+        cur.execute(f"UPDATE video_jobs SET metadata = {pipeline.invalidate_sql(pipeline.stages_from('mix'))} "
+                    "WHERE id = %s RETURNING metadata", (job_id,))
+        metadata = cur.fetchone()["metadata"]
+    pg.commit()
+
+    assert sorted(metadata["pipeline"]["stages"]) == ["alignment", "assets", "audio", "timeline"]
+    assert metadata["title"] == "t"
+
+
+def _worker_graph(tmp_path, conn, job_id, calls):
+    """render (arquivo) → finalize de verdade (status + evento no banco)."""
+    video = str(tmp_path / "out.mp4")
+
+    def run_render(_deps):
+        calls.append("render")
+        with open(video, "wb") as f:
+            f.write(b"video")
+        return {"video_path": video}
+
+    def run_finalize(deps):
+        calls.append("finalize")
+        return video_engine._stage_finalize(conn, job_id, deps["render"]["video_path"])
+
+    return [
+        Stage("render", run_render, artifacts=lambda out: [out["video_path"]]),
+        Stage("finalize", run_finalize, deps=("render",), resume=False),
+    ]
+
+
+def _work_once(tmp_path, pg, calls):
+    # O que o worker faz: claim → generate_video (pipeline) → release
+    job = job_queue.claim_next("test:worker")
+    assert job is not None
+    JobPipeline(str(job["id"]), pg).run_graph(_worker_graph(tmp_path, pg, str(job["id"]), calls))
+    job_queue.release(job["id"], "test:worker")
+    return str(job["id"])
+
+
+@pytest.mark.parametrize("last_status", ["completed", "error"])
+def test_retry_of_finished_job_runs_finalize_again(tmp_path, pg, last_status):
+    with pg.cursor() as cur:
+        cur.execute("INSERT INTO video_jobs (source_url, status, metadata) VALUES ('test://retry', 'queued', %s)",
+                    (json.dumps({"title": "t", "callback_url": "http://hook.test/jobs"}),))
+    pg.commit()
+    calls = []
+    job_id = _work_once(tmp_path, pg, calls)
+    assert calls == ["render", "finalize"]
+    if last_status == "error":
+        with pg.cursor() as cur:
+            cur.execute("UPDATE video_jobs SET status = 'error' WHERE id = %s", (job_id,))
+        pg.commit()
+
+    assert asyncio.run(jobs.retry_job(job_id))["status"] == "queued"
+    calls.clear()
+    _work_once(tmp_path, pg, calls)
+
+    assert calls == ["finalize"]  # render retomado, finalize sempre roda
+    with pg.cursor() as cur:
+        cur.execute("SELECT status, lease_expires_at FROM video_jobs WHERE id = %s", (job_id,))
+        row = cur.fetchone()
+        cur.execute("SELECT count(*) AS n FROM job_events_outbox WHERE job_id = %s AND event = 'completed'",
+                    (job_id,))
+        completed_events = cur.fetchone()["n"]
+    pg.commit()
+    assert row["status"] == "completed" and row["lease_expires_at"] is None
+    assert completed_events == 2
@@ -0,0 +1,60 @@
+import os
+import subprocess
+import time
+
+import pytest
+
+from app.services.render_pool import RenderPool, RenderTimeout
+
+
+# Tarefas de nível de módulo: vão para o processo do slot por pickle (spawn)
+def _slot_pid():
+    return os.getpid()
+
+
+def _hang_with_child(pid_file):
+    # Simula o ffmpeg filho do MoviePy: neto no mesmo grupo do slot
+    child = subprocess.Popen(["sleep", "60"])
+    with open(pid_file, "w") as f:
+        f.write(str(child.pid))
+    time.sleep(60)
+
+
+def _gone(pid, wait_s=5.0):
+    """Processo morto: sumiu do /proc ou é zumbi esperando o reaper."""
+    deadline = time.time() + wait_s
+    while time.time() < deadline:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                if f.read().rsplit(")", 1)[1].split()[0] == "Z":
+                    return True
+        except FileNotFoundError:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.fixture
+def pool():
+    pool = RenderPool(1, 1, 0)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="precisa de /proc")
+def test_timeout_kills_slot_group_and_next_task_gets_fresh_slot(pool, tmp_path):
+    pid_file = str(tmp_path / "child.pid")
+    first_pid = pool.run(_slot_pid, timeout=30)
+
+    with pytest.raises(RenderTimeout):
+        pool.run(_hang_with_child, pid_file, timeout=1, label="trava")
+
+    assert _gone(first_pid)
+    assert _gone(int(open(pid_file).read()))
+    status = pool.status()
+    assert status["stats"]["timeouts"] == 1 and status["stats"]["restarts"] == 1
+    assert status["slots"][0]["pid"] not in (None, first_pid)
+    assert not status["slots"][0]["busy"]
+
+    assert pool.run(_slot_pid, timeout=30) == status["slots"][0]["pid"]
+    assert pool.status()["stats"]["completed"] == 2
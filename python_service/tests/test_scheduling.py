@@ -0,0 +1,125 @@
+import json
+
+import pytest
+
+from app.services import job_predict, job_queue
+from app.services.job_predict import DurationModel
+
+
+def _enqueue(pg, name, predicted_s, waited_s, priority="normal"):
+    with pg.cursor() as cur:
+        cur.execute(
+            """INSERT INTO video_jobs (source_url, title, status, metadata, priority, predicted_s, created_at)
+               VALUES (%s, %s, 'queued', %s, %s, %s, NOW() - make_interval(secs => %s))""",
+            (f"test://{name}", name, json.dumps({"title": name}), priority, predicted_s, waited_s))
+    pg.commit()
+
+
+def _claim_order(n):
+    return [job_queue.claim_next(f"test:{i}")["metadata"]["title"] for i in range(n)]
+
+
+def test_short_jobs_go_first_when_waits_are_similar(pg, monkeypatch):
+    monkeypatch.setattr(job_queue.settings, "QUEUE_AGING", 0.5)
+    _enqueue(pg, "long", 600, waited_s=30)
+    _enqueue(pg, "short-1", 40, waited_s=10)
+    _enqueue(pg, "short-2", 60, waited_s=0)
+
+    assert _claim_order(3) == ["short-1", "short-2", "long"]
+
+
+def test_long_job_overtakes_after_enough_wait(pg, monkeypatch):
+    monkeypatch.setattr(job_queue.settings, "QUEUE_AGING", 0.5)
+    # score(long) = 600 - 0.5 * 1200 = 0 < score(short) = 40
+    _enqueue(pg, "long", 600, waited_s=1200)
+    _enqueue(pg, "short-1", 40, waited_s=0)
+    _enqueue(pg, "short-2", 40, waited_s=0)
+
+    assert _claim_order(3)[0] == "long"
+
+
+def test_priority_divides_predicted_cost(pg, monkeypatch):
+    monkeypatch.setattr(job_queue.settings, "QUEUE_AGING", 0.0)
+    _enqueue(pg, "normal", 100, waited_s=0)
+    _enqueue(pg, "urgent", 300, waited_s=0, priority="urgent")  # 300 / 4 = 75
+    _enqueue(pg, "low", 40, waited_s=0, priority="low")         # 40 / 0.5 = 80
+
+    assert _claim_order(3) == ["urgent", "low", "normal"]
+    assert [r["title"] for r in job_queue.queue_order()] == []
+
+
+def test_jobs_without_prediction_use_default_cost(pg, monkeypatch):
+    monkeypatch.setattr(job_queue.settings, "QUEUE_AGING", 0.0)
+    monkeypatch.setattr(job_queue.settings, "QUEUE_DEFAULT_COST_S", 60.0)
+    _enqueue(pg, "legacy", None, waited_s=0)
+    _enqueue(pg, "short", 30, waited_s=0)
+    _enqueue(pg, "long", 90, waited_s=0)
+
+    assert [r["title"] for r in job_queue.queue_order()] == ["short", "legacy", "long"]
+
+
+PAYLOAD = {"script": "palavra " * 130, "assets": {"all_images": ["i"] * 4, "all_videos": ["v"]},
+           "config": {"preview": False}, "formato": "shorts"}
+
+
+def _fresh_model(monkeypatch, history):
+    model = DurationModel()
+    monkeypatch.setattr(model, "_history", lambda: history)
+    return model
+
+
+def test_model_without_history_uses_default_weights(monkeypatch):
+    model = _fresh_model(monkeypatch, [])
+    features = job_predict.job_features(PAYLOAD)
+
+    predicted = model.predict(features)
+
+    assert model.basis == "default" and model.samples == 0
+    assert predicted == pytest.approx(float(sum(w * x for w, x in zip(
+        job_predict.DEFAULT_WEIGHTS, [1.0] + [features[k] for k in job_predict.FEATURES]))), abs=0.1)
+    # Mais narração, mais imagens ou vídeo longo → mais tempo; preview → menos
+    bigger = dict(features, audio_s=features["audio_s"] * 2, long_s=features["audio_s"] * 2)
+    assert model.predict(bigger) > predicted
+    assert model.predict(dict(features, preview_s=features["audio_s"])) < predicted
+    assert model.predict({k: 0 for k in job_predict.FEATURES}) >= job_predict.MIN_PREDICTED_S
+
+
+def test_model_with_too_little_history_keeps_defaults(monkeypatch):
+    monkeypatch.setattr(job_predict.settings, "PREDICT_MIN_SAMPLES", 20)
+    rows = [{"features": job_predict.job_features(PAYLOAD), "processing_s": 999.0}] * 5
+    model = _fresh_model(monkeypatch, rows)
+
+    model.predict(job_predict.job_features(PAYLOAD))
+
+    assert model.basis == "default" and model.samples == 5
+
+
+def test_model_learns_from_history(monkeypatch):
+    monkeypatch.setattr(job_predict.settings, "PREDICT_MIN_SAMPLES", 20)
+    rows = []
+    for n in range(40):
+        features = {"audio_s": 20.0 + 5 * n, "images": n % 6, "videos": n % 2, "outputs": 0,
+                    "long_s": 0.0, "preview_s": 0.0}
+        rows.append({"features": features, "processing_s": 10 + 3 * features["audio_s"] + 4 * features["images"]})
+    model = _fresh_model(monkeypatch, rows)
+
+    predicted = model.predict({"audio_s": 100.0, "images": 3, "videos": 0, "outputs": 0,
+                               "long_s": 0.0, "preview_s": 0.0})
+
+    assert model.basis == "history"
+    assert predicted == pytest.approx(10 + 300 + 12, rel=0.05)
+
+
+def test_features_from_payload():
+    features = job_predict.job_features(dict(PAYLOAD, formato="video_longo",
+                                             config={"outputs": [{"ladder": [{}, {}]}, {"ladder": []}]}))
+    assert features["audio_s"] == pytest.approx(130 / job_predict.NARRATION_WORDS_PER_S, abs=0.01)
+    assert features["images"] == 4 and features["videos"] == 1
+    assert features["outputs"] == 3
+    assert features["long_s"] == features["audio_s"]
+    assert job_predict.job_features(PAYLOAD, narration_s=12.5)["audio_s"] == 12.5
+
+
+def test_promote_prediction_uses_full_render_estimate():
+    metadata = {"render_plan": {"estimate": {"render_s": 2.0}, "estimate_full": {"render_s": 20.0}}}
+    assert job_predict.predict_promote(metadata) == pytest.approx(20.0 + job_predict.PROMOTE_OVERHEAD_S)
@@ -27,6 +27,7 @@ def reset_stuck_jobs():
                 error_message = 'Job marked as stuck (stalled in processing/pending for > 1h)', 
                 updated_at = NOW()
             WHERE status IN ('processing', 'pending') 
+            AND (lease_expires_at IS NULL OR lease_expires_at < NOW())
             AND (
                 (updated_at IS NOT NULL AND updated_at < NOW() - INTERVAL '1 hour')
                 OR 